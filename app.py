@@ -1,15 +1,24 @@
 from flask import Flask, render_template, request, jsonify, session, send_from_directory
-import pandas as pd
-from openpyxl import load_workbook
 import hashlib
 import datetime
+import functools
 import time
 import os
+import json
+import shutil
+import queue
+import threading
+import uuid
+from concurrent.futures import ProcessPoolExecutor
 import pytz
 from werkzeug.utils import secure_filename
 import tempfile
-from database import db
+from config.settings import Config
+from database import db, clean_employee_name
 from utils.auth import EmployeeDatabase
+from utils.time_parser import parse_time, SHIFT_FORMATS, STORED_PUNCH_FORMATS
+from utils.excel_ingest import (iter_sheet_results, extract_file_results, pool_source, POOL_CONTEXT,
+                                file_content_hash, sheet_content_hashes)
 import gmail_config  # This will set up Gmail credentials
 from email_service import email_service
 
@@ -17,6 +26,19 @@ app = Flask(__name__)
 app.secret_key = 'your-secret-key-change-this'
 app.config['UPLOAD_FOLDER'] = 'uploads'
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+# Worker processes for sheet parsing during uploads (0 or 1 = serial)
+app.config['INGEST_WORKERS'] = Config.INGEST_WORKERS
+# Default upload write mode: 'delta' writes only changed rows, 'replace' rewrites the file
+app.config['UPLOAD_WRITE_MODE'] = Config.UPLOAD_WRITE_MODE
+# Process pool size for parsing the files of a multi-file upload concurrently (0 or 1 = one file at a time)
+app.config['UPLOAD_FILE_WORKERS'] = Config.UPLOAD_FILE_WORKERS
+# Streaming ingestion feeds records to the database as they are parsed instead of building one list
+app.config['INGEST_STREAMING'] = Config.INGEST_STREAMING
+# Upload storage: 'spooled' keeps files in memory up to UPLOAD_SPOOL_MAX_SIZE, 'disk' saves to UPLOAD_FOLDER
+app.config['UPLOAD_STORAGE'] = Config.UPLOAD_STORAGE
+app.config['UPLOAD_SPOOL_MAX_SIZE'] = Config.UPLOAD_SPOOL_MAX_SIZE
+# Largest page /api/attendance returns for one request with ?limit=
+app.config['ATTENDANCE_MAX_LIMIT'] = Config.ATTENDANCE_MAX_LIMIT
 
 # Maintenance mode configuration
 MAINTENANCE_FLAG_FILE = 'maintenance_mode.flag'
@@ -83,10 +105,8 @@ class EmployeeDatabase:
     
     def clean_employee_name(self, full_name):
         """Clean employee name by removing suffixes like (T), (TC), etc."""
-        import re
-        cleaned_name = full_name.strip()
-        cleaned_name = re.sub(r'\s*\([^)]*\)$', '', cleaned_name)
-        return cleaned_name.lower().replace(' ', '').replace('.', '').replace('-', '')
+        # Shared with the employees table so logins look up the same key
+        return clean_employee_name(full_name)
     
     def is_t_employee(self, full_name):
         """Check if employee has (T) suffix - these are not eligible for PL/SL"""
@@ -152,37 +172,33 @@ class EmployeeDatabase:
         # Extract employee name from email (reverse of create_employee_email)
         if email.endswith('@gmail.com'):
             email_name = email.replace('@gmail.com', '')
-            # Try to find employee in database
-            employees = db.get_employees()
-            for emp_name in employees:
-                # Clean the employee name the same way as in create_employee_email
-                cleaned_emp_name = self.clean_employee_name(emp_name)
+            # Try to find employee in database (keyed the same way as create_employee_email)
+            emp_name = db.get_employee_by_email_key(email_name)
+            if emp_name:
+                # Check if user has changed their password before
+                has_ever_changed_password = db.has_user_changed_password(email)
                 
-                if email_name == cleaned_emp_name:
-                    # Check if user has changed their password before
-                    has_ever_changed_password = db.has_user_changed_password(email)
-                    
-                    if has_ever_changed_password:
-                        # User has changed password, only check against stored password in EMPLOYEE_DB
-                        if email in self.EMPLOYEE_DB:
-                            hashed_password = hashlib.sha256(password.encode()).hexdigest()
-                            if self.EMPLOYEE_DB[email]["password"] == hashed_password:
-                                return True, {
-                                    "password": hashed_password,
-                                    "name": emp_name,
-                                    "role": "Employee",
-                                    "is_admin": False
-                                }
-                    else:
-                        # User still has default password, check against default
-                        hashed_password = hashlib.sha256("Balar123".encode()).hexdigest()
-                        if hashlib.sha256(password.encode()).hexdigest() == hashed_password:
+                if has_ever_changed_password:
+                    # User has changed password, only check against stored password in EMPLOYEE_DB
+                    if email in self.EMPLOYEE_DB:
+                        hashed_password = hashlib.sha256(password.encode()).hexdigest()
+                        if self.EMPLOYEE_DB[email]["password"] == hashed_password:
                             return True, {
                                 "password": hashed_password,
                                 "name": emp_name,
                                 "role": "Employee",
                                 "is_admin": False
                             }
+                else:
+                    # User still has default password, check against default
+                    hashed_password = hashlib.sha256("Balar123".encode()).hexdigest()
+                    if hashlib.sha256(password.encode()).hexdigest() == hashed_password:
+                        return True, {
+                            "password": hashed_password,
+                            "name": emp_name,
+                            "role": "Employee",
+                            "is_admin": False
+                        }
         
         return False, None
 
@@ -200,13 +216,8 @@ class EmployeeDatabase:
         # Check database for employee accounts
         if email.endswith('@gmail.com'):
             email_name = email.replace('@gmail.com', '')
-            employees = db.get_employees()
-            for emp_name in employees:
-                # Clean the employee name the same way as in create_employee_email
-                cleaned_emp_name = self.clean_employee_name(emp_name)
-                
-                if email_name == cleaned_emp_name:
-                    return True
+            if db.get_employee_by_email_key(email_name):
+                return True
         
         return False
 
@@ -262,13 +273,7 @@ class EmployeeDatabase:
                 email_name = email.replace('@gmail.com', '')
                 
                 # Try to find matching employee name from database first
-                employees = db.get_employees()
-                employee_name = None
-                for emp_name in employees:
-                    cleaned_emp_name = self.clean_employee_name(emp_name)
-                    if email_name == cleaned_emp_name:
-                        employee_name = emp_name
-                        break
+                employee_name = db.get_employee_by_email_key(email_name)
                 
                 # If not found in database (first-time password change), create a generic name
                 if not employee_name:
@@ -360,57 +365,6 @@ def authenticate_user(email, password):
     """Use the centralized authentication"""
     return employee_db.authenticate_user(email, password)
 
-def is_font_red(cell):
-    """Check if font color is specifically red or red-like"""
-    if cell is None or cell.font is None:
-        return False
-    
-    color = cell.font.color
-    if color is None:
-        return False
-    
-    # Handle RGB colors - check for red shades
-    if color.type == "rgb" and color.rgb is not None:
-        rgb_val = color.rgb.upper()
-        red_colors = [
-            "FFFF0000", "FF0000", "FFDC143C", "FFB22222", "FF8B0000",
-            "FFCD5C5C", "FFF08080", "FFFA8072", "FFFF6347", "FFFF1493"
-        ]
-        return rgb_val in red_colors
-    elif color.type == "indexed" and color.indexed is not None:
-        red_indices = [3, 5, 10, 53]
-        return color.indexed in red_indices
-    elif color.type == "theme" and color.theme is not None:
-        return color.theme == 2
-    
-    return False
-
-def extract_employee_time_range(sheet):
-    """Extract time range from employee sheet (e.g., '08:30 AM to 07:00 PM')"""
-    try:
-        # Look for time range in cell A2 (common location for time range)
-        time_cell = sheet.cell(2, 1)  # Row 2, Column A
-        if time_cell.value and isinstance(time_cell.value, str):
-            time_value = str(time_cell.value).strip()
-            # Check if it contains time pattern (AM/PM or 24-hour format)
-            if ('AM' in time_value.upper() or 'PM' in time_value.upper() or 
-                ':' in time_value or 'to' in time_value.lower()):
-                return time_value
-        
-        # Also check other common locations
-        for row in range(1, 6):  # Check first 5 rows
-            for col in range(1, 4):  # Check first 3 columns
-                cell = sheet.cell(row, col)
-                if cell.value and isinstance(cell.value, str):
-                    time_value = str(cell.value).strip()
-                    if ('AM' in time_value.upper() or 'PM' in time_value.upper() or 
-                        ':' in time_value or 'to' in time_value.lower()):
-                        return time_value
-    except Exception:
-        pass
-    
-    return None
-
 def get_ordinal_number(n):
     """Convert number to ordinal (1st, 2nd, 3rd, etc.)"""
     if 10 <= n % 100 <= 20:
@@ -419,132 +373,115 @@ def get_ordinal_number(n):
         suffix = {1: 'st', 2: 'nd', 3: 'rd'}.get(n % 10, 'th')
     return f"{n}{suffix}"
 
-def calculate_late_statistics(employee_name, time_range):
-    """Calculate late statistics for an employee based on their time range"""
+# Columns the late statistics read; the other attendance fields are never fetched
+LATE_STATISTICS_FIELDS = ['Employee', 'Date', 'Punch-In', 'Punch-Out', 'Status', 'time_range']
+LATE_GRACE_PERIOD = datetime.timedelta(minutes=2)
+
+def parse_record_date(value):
+    """Date of an attendance record: ISO text as stored, DD/MM/YYYY, or a datetime"""
+    if isinstance(value, str):
+        try:
+            return datetime.date.fromisoformat(value)
+        except ValueError:
+            pass
+        for date_format in ('%Y-%m-%d', '%d/%m/%Y'):
+            try:
+                return datetime.datetime.strptime(value, date_format).date()
+            except ValueError:
+                continue
+        return None
+    if hasattr(value, 'date'):
+        return value.date()
+    return None
+
+def shift_start_time(time_range):
+    """Start of a shift time range ("08:30 AM to 07:00 PM" -> 08:30), 9:00 AM if it has none"""
+    if time_range:
+        start_time = parse_time(time_range.split(' to ')[0].strip(), SHIFT_FORMATS)
+        if start_time:
+            return start_time
+    return datetime.time(9, 0)
+
+def late_deadline(start_time):
+    """Latest punch-in (a datetime on date.min) still on time for a shift starting at start_time"""
+    return datetime.datetime.combine(datetime.date.min, start_time) + LATE_GRACE_PERIOD
+
+@functools.lru_cache(maxsize=4096)
+def punch_late_minutes(punch_in_str, deadline):
+    """Whole minutes a punch-in text is past deadline; None when on time or not a time"""
+    # Handle different time formats (cached across records and employees)
+    punch_in_time = parse_time(punch_in_str, STORED_PUNCH_FORMATS)
+    if punch_in_time:
+        late_seconds = (datetime.datetime.combine(datetime.date.min, punch_in_time) - deadline).total_seconds()
+        if late_seconds > 0:
+            return int(late_seconds / 60)
+    return None
+
+def summarize_late_records(employee_name, time_range, records):
+    """Late statistics for one employee from their attendance records, in one pass"""
+    start_time = shift_start_time(time_range)
+    # Lateness only depends on the time of day, so the deadline is worked out once
+    deadline = late_deadline(start_time)
+    expected_punch_in = deadline.strftime("%I:%M %p")
+    
+    late_records = []
+    total_late_minutes = 0
+    for record in records:
+        punch_in_str = record.get('Punch-In')
+        if not punch_in_str or not record.get('Date') or not isinstance(punch_in_str, str):
+            continue
+        try:
+            # Punch-in texts repeat across days; each is parsed and compared once
+            late_minutes = punch_late_minutes(punch_in_str, deadline)
+            if late_minutes is None:
+                continue
+            record_date = parse_record_date(record['Date'])
+            if not record_date:
+                continue
+            
+            total_late_minutes += late_minutes
+            late_records.append({
+                'date': record['Date'],
+                'punch_in': punch_in_str,
+                'expected_punch_in': expected_punch_in,
+                'late_minutes': late_minutes,
+                'late_hours': round(late_minutes / 60, 2),
+                'record_id': f"{employee_name}_{record['Date']}_{punch_in_str}",
+                'status': record.get('Status', 'P'),
+                'punch_out': record.get('Punch-Out', ''),
+                'is_weekend': record_date.weekday() >= 5  # Saturday = 5, Sunday = 6
+            })
+        except Exception as e:
+            print(f"Error processing record for {employee_name}: {e}")
+            continue
+    
+    # Sort late records by date (oldest first)
+    late_records.sort(key=lambda x: x['date'])
+    
+    # Add sequence numbers to late records
+    for i, record in enumerate(late_records):
+        record['sequence'] = i + 1
+        record['sequence_text'] = get_ordinal_number(i + 1) + " late"
+    
+    late_count = len(late_records)
+    return {
+        'total_late_count': late_count,
+        'total_late_minutes': total_late_minutes,
+        'late_records': late_records,
+        'start_time': start_time.strftime("%I:%M %p"),
+        'average_late_minutes': round(total_late_minutes / late_count, 2) if late_count > 0 else 0
+    }
+
+def calculate_late_statistics(employee_name, time_range=None, records=None):
+    """Calculate late statistics for an employee based on their time range.
+    records are the employee's attendance records (fetched when not given); without a
+    time_range the first one found in them is used."""
     try:
-        # Parse the time range to get start time
-        start_time = None
-        if time_range:
-            # Extract start time from time range (e.g., "08:30 AM to 07:00 PM" -> "08:30 AM")
-            time_parts = time_range.split(' to ')
-            if len(time_parts) >= 1:
-                start_time_str = time_parts[0].strip()
-                try:
-                    # Parse different time formats
-                    time_formats = [
-                        "%I:%M %p",      # 8:30 AM
-                        "%H:%M",         # 08:30
-                        "%I.%M %p",      # 8.30 AM
-                        "%H.%M",         # 08.30
-                    ]
-                    for fmt in time_formats:
-                        try:
-                            start_time = datetime.datetime.strptime(start_time_str, fmt).time()
-                            break
-                        except ValueError:
-                            continue
-                except Exception:
-                    pass
-        
-        # Default to 9:00 AM if no time range found
-        if not start_time:
-            start_time = datetime.time(9, 0)
-        
-        # Get attendance records for this employee
-        records = db.get_attendance_records(employee_filter=employee_name)
-        
-        late_count = 0
-        total_late_minutes = 0
-        late_records = []
-        
-        for record in records:
-            if record.get('Punch-In') and record.get('Date'):
-                try:
-                    # Parse punch-in time
-                    punch_in_str = record['Punch-In']
-                    if isinstance(punch_in_str, str):
-                        # Handle different time formats
-                        time_formats = [
-                            "%H:%M:%S",     # 09:30:00
-                            "%H:%M",        # 09:30
-                            "%I:%M:%S %p",  # 9:30:00 AM
-                            "%I:%M %p",     # 9:30 AM
-                        ]
-                        punch_in_time = None
-                        for fmt in time_formats:
-                            try:
-                                punch_in_time = datetime.datetime.strptime(punch_in_str, fmt).time()
-                                break
-                            except ValueError:
-                                continue
-                        
-                        if punch_in_time:
-                            # Parse the record date
-                            record_date = None
-                            if isinstance(record['Date'], str):
-                                try:
-                                    record_date = datetime.datetime.strptime(record['Date'], '%Y-%m-%d').date()
-                                except ValueError:
-                                    try:
-                                        record_date = datetime.datetime.strptime(record['Date'], '%d/%m/%Y').date()
-                                    except ValueError:
-                                        continue
-                            elif hasattr(record['Date'], 'date'):
-                                record_date = record['Date'].date()
-                            
-                            if record_date:
-                                # Calculate late minutes (allowing 2 minutes grace period)
-                                grace_period = datetime.timedelta(minutes=2)
-                                start_datetime = datetime.datetime.combine(record_date, start_time)
-                                punch_in_datetime = datetime.datetime.combine(record_date, punch_in_time)
-                                
-                                late_datetime = punch_in_datetime - start_datetime - grace_period
-                                
-                                if late_datetime.total_seconds() > 0:
-                                    late_minutes = int(late_datetime.total_seconds() / 60)
-                                    late_count += 1
-                                    total_late_minutes += late_minutes
-                                    
-                                    # Calculate expected punch-in time
-                                    expected_punch_in = start_datetime + grace_period
-                                    
-                                    late_records.append({
-                                        'date': record['Date'],
-                                        'punch_in': punch_in_str,
-                                        'expected_punch_in': expected_punch_in.strftime("%I:%M %p"),
-                                        'late_minutes': late_minutes,
-                                        'late_hours': round(late_minutes / 60, 2),
-                                        'record_id': f"{employee_name}_{record['Date']}_{punch_in_str}",
-                                        'status': record.get('Status', 'P'),
-                                        'punch_out': record.get('Punch-Out', ''),
-                                        'is_weekend': record_date.weekday() >= 5  # Saturday = 5, Sunday = 6
-                                    })
-                except Exception as e:
-                    print(f"Error processing record for {employee_name}: {e}")
-                    continue
-        
-        # Sort late records by date (oldest first)
-        late_records.sort(key=lambda x: x['date'], reverse=False)
-        
-        # Add sequence numbers to late records
-        for i, record in enumerate(late_records):
-            record['sequence'] = i + 1
-            record['sequence_text'] = get_ordinal_number(i + 1) + " late"
-        
-        print(f"Late statistics for {employee_name}:")
-        print(f"  Total late count: {late_count}")
-        print(f"  Total late minutes: {total_late_minutes}")
-        print(f"  Late records: {len(late_records)}")
-        for i, record in enumerate(late_records[:3]):  # Show first 3 records
-            print(f"    Record {i+1}: {record}")
-        
-        return {
-            'total_late_count': late_count,
-            'total_late_minutes': total_late_minutes,
-            'late_records': late_records,
-            'start_time': start_time.strftime("%I:%M %p"),
-            'average_late_minutes': round(total_late_minutes / late_count, 2) if late_count > 0 else 0
-        }
+        if records is None:
+            records = db.get_attendance_records(employee_filter=employee_name, fields=LATE_STATISTICS_FIELDS)
+        if not time_range:
+            time_range = next((record['time_range'] for record in records if record.get('time_range')), None)
+        return summarize_late_records(employee_name, time_range, records)
     except Exception as e:
         print(f"Error calculating late statistics for {employee_name}: {e}")
         return {
@@ -554,349 +491,82 @@ def calculate_late_statistics(employee_name, time_range):
             'start_time': '09:00 AM'
         }
 
-def process_attendance_file(file_path, selected_date=None):
-    """Process attendance data from Excel file"""
+def calculate_all_late_statistics():
+    """Late statistics for every employee from one read of the stored punch-ins.
+    Only the days found late are then read for their status and punch-out."""
+    employees = db.get_punch_ins()
+    late_days = []
+    for employee in employees:
+        deadline = late_deadline(shift_start_time(employee['time_range']))
+        late_days.append([(row_id, date, punch_in) for row_id, date, punch_in in employee['punches']
+                          if punch_in and date and isinstance(punch_in, str)
+                          and punch_late_minutes(punch_in, deadline) is not None])
+    details = db.get_attendance_details(row_id for days in late_days for row_id, _, _ in days)
+    
+    all_employee_stats = []
+    for employee, days in zip(employees, late_days):
+        records = [{'Date': date, 'Punch-In': punch_in, 'Status': details[row_id][0], 'Punch-Out': details[row_id][1]}
+                   for row_id, date, punch_in in days]
+        late_stats = calculate_late_statistics(employee['employee'], employee['time_range'], records)
+        late_stats['employee_name'] = employee['employee']
+        all_employee_stats.append(late_stats)
+    return all_employee_stats
+
+def apply_leave_eligibility(employee_name, totals):
+    """For T employees, set PL and SL to "FL" (Festival Leave) - they are not eligible for PL/SL"""
+    if employee_db.is_t_employee(employee_name):
+        totals["PL"] = "FL"
+        totals["SL"] = "FL"
+        print(f"T Employee '{employee_name}' - PL/SL set to 'FL'")
+    return totals
+
+def iter_attendance_records(file_path, leave_totals, selected_date=None, workers=None, progress=None, skip_sheets=None,
+                            start_date=None):
+    """Yield attendance records sheet by sheet from one pass over the Excel file.
+    Leave totals come from the same pass and are stored in leave_totals by sheet title,
+    so the dict is complete once the generator is exhausted. Only one sheet is held in
+    memory at a time (serial path), letting callers stream records into the database.
+    With workers > 1 (default: INGEST_WORKERS) sheets are parsed in a process pool;
+    records are merged in workbook order, so the output matches the serial path.
+    progress, if given, is called as progress(sheets_done, sheet_title) after each sheet.
+    Sheets named in skip_sheets are not parsed at all.
+    With start_date, every month block from start_date through selected_date is
+    ingested in the same pass (selected_date's month only otherwise).
+    """
     if selected_date is None:
         selected_date = datetime.date.today()
+    if workers is None:
+        workers = app.config['INGEST_WORKERS']
     
-    wb = load_workbook(file_path, data_only=False)
-    visible_sheets = [sheet for sheet in wb.worksheets if sheet.sheet_state == "visible"]
-    
-    print(f"DEBUG: Found {len(visible_sheets)} visible sheets in Excel file")
-    for sheet in visible_sheets:
-        print(f"DEBUG: Sheet name: '{sheet.title}'")
-    
-    month_abbr = selected_date.strftime("%b").upper()
-    year = selected_date.year
-    month_num = selected_date.month
-    day_limit = selected_date.day
-    
-    print(f"DEBUG: Processing for month '{month_abbr}' and year '{year}', day limit: {day_limit}")
-    print(f"DEBUG: Selected date: {selected_date}")
+    print(f"DEBUG: Processing for month '{selected_date.strftime('%b').upper()}' and year '{selected_date.year}', day limit: {selected_date.day}")
+    print(f"DEBUG: Selected date: {selected_date}, start date: {start_date}, ingest workers: {workers}")
     
-    # Your 5 blank employees
-    blank_employees = [
-        "Bhavin Patel",
-        "Pramod Dubey",
-        "Shrikant Talekar",
-        "Jitendra Patolia",
-        "Lalit Dobariya"
-    ]
-    
-    def to_ts(x):
-        if x is None or (isinstance(x, float) and pd.isna(x)):
-            return pd.NaT
-        
-        # Handle datetime.time objects directly
-        if isinstance(x, datetime.time):
-            return datetime.datetime.combine(datetime.date.today(), x)
-        
-        # Handle string time formats that might be manually entered
-        if isinstance(x, str):
-            x = x.strip()
-            # Try common time formats first
-            time_formats = [
-                "%H:%M",      # 09:30
-                "%H:%M:%S",   # 09:30:00
-                "%I:%M %p",   # 9:30 AM
-                "%I:%M:%S %p", # 9:30:00 AM
-                "%H.%M",      # 09.30
-                "%I.%M %p",   # 9.30 AM
-            ]
-            
-            for fmt in time_formats:
-                try:
-                    # Parse as time and convert to datetime
-                    time_obj = datetime.datetime.strptime(x, fmt).time()
-                    # Create a datetime with today's date and the parsed time
-                    return datetime.datetime.combine(datetime.date.today(), time_obj)
-                except ValueError:
-                    continue
-        
-        try:
-            return pd.to_datetime(x, errors="coerce")
-        except Exception:
-            return pd.NaT
-    
-    records = []
-    
-    ignore_statuses = {"A", "W/O", "PL", "SL", "FL", "HL", "PAT", "MAT"}
-    # Note: "P", "HF", "PHF", "SHF" are NOT in ignore_statuses, so they will always show punches
-
-    # Extract time ranges for each employee
-    employee_time_ranges = {}
-    for sheet in visible_sheets:
-        time_range = extract_employee_time_range(sheet)
-        if time_range:
-            employee_time_ranges[sheet.title] = time_range
+    yield from collect_sheet_records(
+        iter_sheet_results(file_path, selected_date, workers, skip_sheets, start_date), leave_totals, progress)
 
+def collect_sheet_records(sheet_results, leave_totals, progress=None):
+    """Yield the records of (title, records, totals) sheet results, storing each sheet's
+    leave totals (with T-employee eligibility applied) in leave_totals."""
+    record_count = 0
     processed_sheets = 0
     skipped_sheets = 0
     
-    for sheet in visible_sheets:
-        df = pd.read_excel(file_path, sheet_name=sheet.title, header=None)
+    for title, sheet_records, totals in sheet_results:
+        if totals is not None:
+            leave_totals[title] = apply_leave_eligibility(title, totals)
         
-        if df.dropna(how="all").empty:
-            print(f"DEBUG: Skipping sheet '{sheet.title}' - empty data")
-            skipped_sheets += 1
-            continue
+        if progress:
+            progress(processed_sheets + skipped_sheets + 1, title)
         
-        # Updated logic to handle both old format (JAN, MAY, etc.) and new format (NOV-24, DEC-24, JAN-25, etc.)
-        month_rows = []
-        print(f"DEBUG: Looking for month '{month_abbr}' in sheet '{sheet.title}'")
-        
-        for i in range(len(df)):
-            cell_value = str(df.iloc[i, 0]).upper()
-            print(f"DEBUG: Row {i}: '{cell_value}'")
-            
-            # Check for old format (JAN, MAY, etc.)
-            if cell_value == month_abbr and len(cell_value) == 3:
-                print(f"DEBUG: Found old format match '{cell_value}' at row {i}")
-                month_rows.append(i)
-            # Check for new format (NOV-24, DEC-24, JAN-25, etc.)
-            elif cell_value.startswith(month_abbr) and len(cell_value) == 6 and '-' in cell_value and cell_value[3] == '-':
-                # Extract year from Excel (e.g., "24" from "NOV-24")
-                excel_year_str = cell_value[4:6]
-                try:
-                    excel_year = int(excel_year_str)
-                    # Convert to full year (24 -> 2024, 25 -> 2025, etc.)
-                    excel_full_year = 2000 + excel_year
-                    print(f"DEBUG: Found new format '{cell_value}', Excel year: {excel_full_year}, Selected year: {year}")
-                    
-                    # Check if the year matches the selected date year (allow ±1 year flexibility)
-                    if excel_full_year == year or excel_full_year == year - 1 or excel_full_year == year + 1:
-                        print(f"DEBUG: Year match (flexible)! Adding row {i}")
-                        month_rows.append(i)
-                    else:
-                        print(f"DEBUG: Year too far apart, skipping row {i}")
-                except ValueError:
-                    # If year parsing fails, skip this row
-                    print(f"DEBUG: Invalid year format in '{cell_value}', skipping row {i}")
-                    continue
-            # Check for date format (like "2025-09-01 00:00:00")
-            elif len(cell_value) >= 10 and cell_value.startswith(str(year)) and '-' in cell_value:
-                try:
-                    # Parse the date to extract month
-                    date_part = cell_value.split(' ')[0]  # Get "2025-09-01" part
-                    date_obj = datetime.datetime.strptime(date_part, '%Y-%m-%d')
-                    if date_obj.month == month_num:
-                        print(f"DEBUG: Found date format '{cell_value}', month matches! Adding row {i}")
-                        month_rows.append(i)
-                    else:
-                        print(f"DEBUG: Date format '{cell_value}' month {date_obj.month} doesn't match {month_num}, skipping row {i}")
-                except ValueError:
-                    print(f"DEBUG: Invalid date format '{cell_value}', skipping row {i}")
-                    continue
-        
-        print(f"DEBUG: Found {len(month_rows)} matching month rows: {month_rows}")
-        
-        if not month_rows:
-            print(f"DEBUG: Skipping sheet '{sheet.title}' - no matching month rows found")
+        if sheet_records is None:
             skipped_sheets += 1
             continue
-            
         processed_sheets += 1
-        
-        i = month_rows[0]
-        
-        for d in range(1, day_limit + 1):
-            col = d + 2
-            
-            if col >= df.shape[1]:
-                continue
-            
-            date_val = datetime.date(year, selected_date.month, d).strftime('%Y-%m-%d')
-            status_row = i + 2
-            status = ""
-            
-            if status_row < len(df):
-                s = df.iloc[status_row, col]
-                if pd.notna(s):
-                    status = str(s).upper().strip()
-            
-            # Get cells for formatting info
-            pin_cell = wb[sheet.title].cell(i + 1, col + 1)
-            pout_cell = wb[sheet.title].cell(i + 2, col + 1) if i + 1 < len(df) else None
-            status_cell = wb[sheet.title].cell(status_row + 1, col + 1) if status_row < len(df) else None
-            
-            # Comments logic
-            pin_comment, pout_comment, status_comment = "", "", ""
-            try:
-                if pin_cell and pin_cell.comment:
-                    pin_comment = pin_cell.comment.text
-                if pout_cell and pout_cell.comment:
-                    pout_comment = pout_cell.comment.text
-                if status_cell and status_cell.comment:
-                    status_comment = status_cell.comment.text
-            except:
-                pass
-            
-            # RED font color detection
-            pin_highlight = is_font_red(pin_cell) if pin_cell else False
-            pout_highlight = is_font_red(pout_cell) if pout_cell else False
-            status_highlight = is_font_red(status_cell) if status_cell else False
-            
-            # **Rules for special statuses**
-            if status in ["A", "W/O", "PL", "SL", "FL", "HL", "PAT", "MAT"]:
-                # Show no punches for off/leave/paid statuses
-                pin, pout = "", ""
-            elif sheet.title.strip() in blank_employees:
-                pin, pout = "", ""  # Keep blank for exception employees
-            else:
-                # Read timing data directly from openpyxl cells to preserve data types
-                pin_cell_value = pin_cell.value if pin_cell else None
-                pout_cell_value = pout_cell.value if pout_cell else None
-                
-                # Also try pandas data as fallback
-                raw1 = df.iloc[i, col] if pd.notna(df.iloc[i, col]) else None
-                raw2 = df.iloc[i + 1, col] if i + 1 < len(df) and pd.notna(df.iloc[i + 1, col]) else None
-                
-                # Use openpyxl values first, fallback to pandas
-                t1 = to_ts(pin_cell_value) if pin_cell_value is not None else to_ts(raw1)
-                t2 = to_ts(pout_cell_value) if pout_cell_value is not None else to_ts(raw2)
-                
-                if pd.notna(t1) and pd.notna(t2):
-                    pin, pout = t1.strftime("%H:%M"), t2.strftime("%H:%M")
-                    if status in ["HF", "PHF", "SHF"]:
-                        print(f"DEBUG: {status} status with both times: {sheet.title} on {date_val} - {pin} to {pout}")
-                elif pd.notna(t1) and pd.isna(t2):
-                    # Show punches for P, HF, SHF, PHF statuses even when one is missing
-                    if status in ["P", "HF", "PHF", "SHF"]:
-                        if t1.hour >= 12:
-                            pin, pout = "MISSING", t1.strftime("%H:%M")
-                        else:
-                            pin, pout = t1.strftime("%H:%M"), "MISSING"
-                        if status in ["HF", "PHF", "SHF"]:
-                            print(f"DEBUG: {status} status with missing time: {sheet.title} on {date_val} - {pin} to {pout}")
-                    elif status not in ignore_statuses:
-                        if t1.hour >= 12:
-                            pin, pout = "MISSING", t1.strftime("%H:%M")
-                        else:
-                            pin, pout = t1.strftime("%H:%M"), "MISSING"
-                        if status in ["HF", "PHF", "SHF"]:
-                            print(f"DEBUG: {status} status with missing time: {sheet.title} on {date_val} - {pin} to {pout}")
-                    else:
-                        # Ignore missing, hide punches for leave/off
-                        pin, pout = "", ""
-                elif pd.isna(t1) and pd.notna(t2):
-                    # Show punches for P, HF, SHF, PHF statuses even when one is missing
-                    if status in ["P", "HF", "PHF", "SHF"]:
-                        if t2.hour >= 12:
-                            pin, pout = "⚠️ MISSING", t2.strftime("%H:%M")
-                        else:
-                            pin, pout = t2.strftime("%H:%M"), "⚠️ MISSING"
-                        if status in ["HF", "PHF", "SHF"]:
-                            print(f"DEBUG: {status} status with missing time: {sheet.title} on {date_val} - {pin} to {pout}")
-                    elif status not in ignore_statuses:
-                        if t2.hour >= 12:
-                            pin, pout = "⚠️ MISSING", t2.strftime("%H:%M")
-                        else:
-                            pin, pout = t2.strftime("%H:%M"), "⚠️ MISSING"
-                        if status in ["HF", "PHF", "SHF"]:
-                            print(f"DEBUG: {status} status with missing time: {sheet.title} on {date_val} - {pin} to {pout}")
-                    else:
-                        pin, pout = "", ""
-                else:
-                    # Both punches missing
-                    # Show punches for P, HF, SHF, PHF statuses even when both are missing
-                    if status in ["P", "HF", "PHF", "SHF"]:
-                        pin, pout = "MISSING", "MISSING"
-                        if status in ["HF", "PHF", "SHF"]:
-                            print(f"DEBUG: {status} status with both times missing: {sheet.title} on {date_val}")
-                    elif status not in ignore_statuses:
-                        pin, pout = "MISSING", "MISSING"
-                        if status in ["HF", "PHF", "SHF"]:
-                            print(f"DEBUG: {status} status with both times missing: {sheet.title} on {date_val}")
-                    else:
-                        pin, pout = "", ""
-
-
-            records.append({
-                "Employee": sheet.title,
-                "Date": date_val,
-                "Punch-In": pin,
-                "Punch-Out": pout,
-                "Status": status,
-                "pin_comment": pin_comment,
-                "pout_comment": pout_comment,
-                "status_comment": status_comment,
-                "pin_highlight": pin_highlight,
-                "pout_highlight": pout_highlight,
-                "status_highlight": status_highlight,
-                "time_range": employee_time_ranges.get(sheet.title, "")
-            })
+        record_count += len(sheet_records)
+        yield from sheet_records
     
-    print(f"DEBUG: Generated {len(records)} total records from all sheets")
+    print(f"DEBUG: Generated {record_count} total records from all sheets")
     print(f"DEBUG: Processed {processed_sheets} sheets, skipped {skipped_sheets} sheets")
-    return records
-
-
-def extract_leave_totals(file_path):
-    """Parse cumulative W/O, PL, SL, FL totals per employee sheet from the Excel.
-    Strategy: find header row containing these labels, then take the last numeric value
-    in each corresponding column as the sheet's cumulative total.
-    TC employees are not eligible for PL/SL.
-    """
-    wb = load_workbook(file_path, data_only=True)
-    visible_sheets = [sheet for sheet in wb.worksheets if sheet.sheet_state == "visible"]
-
-    per_employee = {}
-
-    target_labels = {
-        "W/O": ["W/O", "W O", "W-0", "W-O"],
-        "PL": ["PL"],
-        "SL": ["SL"],
-        "FL": ["FL"],
-    }
-
-    for sheet in visible_sheets:
-        ws = wb[sheet.title]
-        employee_name = sheet.title
-        
-        # Check if this employee is T (not eligible for PL/SL)
-        is_t_employee = employee_db.is_t_employee(employee_name)
-
-        # Search header rows (first 10 rows) for our labels
-        label_to_col = {}
-        max_header_rows = min(10, ws.max_row)
-        for r in range(1, max_header_rows + 1):
-            for c in range(1, ws.max_column + 1):
-                val = ws.cell(row=r, column=c).value
-                if not isinstance(val, str):
-                    continue
-                text = val.strip().upper()
-                for key, variants in target_labels.items():
-                    if text in [v.upper() for v in variants]:
-                        label_to_col[key] = c
-            # Small optimization: if all found, stop searching
-            if len(label_to_col) == len(target_labels):
-                break
-
-        if not label_to_col:
-            continue
-
-        # Walk from bottom up to locate last numeric value for each label
-        totals = {"W/O": 0, "PL": 0, "SL": 0, "FL": 0}
-        for key, col in label_to_col.items():
-            for r in range(ws.max_row, 0, -1):
-                cell = ws.cell(row=r, column=col)
-                val = cell.value
-                if isinstance(val, (int, float)):
-                    try:
-                        totals[key] = float(val)
-                    except Exception:
-                        totals[key] = 0
-                    break
-
-        # For T employees, set PL and SL to "FL" (Festival Leave)
-        if is_t_employee:
-            totals["PL"] = "FL"
-            totals["SL"] = "FL"
-            print(f"T Employee '{employee_name}' - PL/SL set to 'FL'")
-
-        per_employee[sheet.title] = totals
-
-    return per_employee
 
 # Routes
 @app.route('/')
@@ -1270,13 +940,8 @@ def get_current_password():
         employee_name = user_data.get('name', 'Unknown')
     else:
         # Try to get employee name from attendance records
-        employees = db.get_employees()
         email_name = email.replace('@gmail.com', '')
-        for emp_name in employees:
-            cleaned_emp_name = employee_db.clean_employee_name(emp_name)
-            if email_name == cleaned_emp_name:
-                employee_name = emp_name
-                break
+        employee_name = db.get_employee_by_email_key(email_name) or employee_name
     
     # Check if user has changed their password
     has_changed_password = db.has_user_changed_password(email)
@@ -1307,8 +972,230 @@ def get_current_password():
 
 
 
+def run_upload_job(job_id, saved_files, selected_date, write_mode='replace', start_date=None):
+    """Process saved upload files for a background job, reporting progress per file and sheet.
+    write_mode 'replace' rewrites every row of each file; 'delta' writes only the changed rows;
+    'staged' writes every file to staging tables and swaps them all in with one transaction,
+    so a failure in any file leaves the live data untouched. Replace uploads whose files are
+    parsed in a pool (UPLOAD_FILE_WORKERS > 1) are staged the same way.
+    With start_date, every month from start_date through selected_date is ingested.
+    """
+    # Content hashes only match uploads of the same period
+    period = selected_date.isoformat() if start_date is None else f"{start_date.isoformat()}/{selected_date.isoformat()}"
+    total_records = 0
+    changes = {'inserted': 0, 'updated': 0, 'deleted': 0, 'unchanged': 0}
+    skipped_files = []
+    skipped_sheets = 0
+    created_accounts = []
+    existing_accounts = []
+    staged_uploads = []
+    staged_employees = []
+    
+    try:
+        db.update_upload_job(job_id, status='running')
+        
+        # Plan each file: skip byte-identical re-uploads and (in delta mode) unchanged sheets
+        plans = []
+        for filename, source in saved_files:
+            # Byte-identical re-upload for the same date: nothing to do
+            content_hash = file_content_hash(source)
+            if db.is_upload_unchanged(filename, content_hash, period):
+                print(f"DEBUG: Skipping unchanged file {filename}")
+                skipped_files.append(filename)
+                continue
+            
+            # In delta mode, sheets whose content is unchanged keep their stored rows
+            sheet_hashes = sheet_content_hashes(source)
+            unchanged_sheets = set()
+            if write_mode == 'delta':
+                stored_hashes = db.get_sheet_hashes(filename, period)
+                unchanged_sheets = {title for title, sheet_hash in sheet_hashes.items()
+                                    if stored_hashes.get(title) == sheet_hash}
+                skipped_sheets += len(unchanged_sheets)
+                print(f"DEBUG: {len(unchanged_sheets)} unchanged sheets skipped in {filename}")
+            plans.append((filename, source, content_hash, sheet_hashes, unchanged_sheets))
+        files_done = len(skipped_files)
+        db.update_upload_job(job_id, files_done=files_done)
+        
+        # Several files: parse them all in a worker pool before anything is written,
+        # so a workbook that fails to parse leaves the database untouched
+        parsed_files = None
+        file_workers = min(app.config['UPLOAD_FILE_WORKERS'], len(plans))
+        if file_workers > 1:
+            db.update_upload_job(job_id, current_file=f"Parsing {len(plans)} files")
+            with ProcessPoolExecutor(max_workers=file_workers, mp_context=POOL_CONTEXT) as pool:
+                futures = [pool.submit(extract_file_results, pool_source(source), selected_date, unchanged_sheets, start_date)
+                           for _, source, _, _, unchanged_sheets in plans]
+                parsed_files = [future.result() for future in futures]
+            print(f"DEBUG: Parsed {len(plans)} files with {file_workers} workers")
+            # A replace of several files is written with the staged commit, so a write that
+            # fails on a later file doesn't leave the earlier ones saved. Delta syncs still
+            # commit file by file.
+            if write_mode == 'replace':
+                write_mode = 'staged'
+        
+        # Write phase: one file at a time, in upload order
+        for file_index, (filename, source, content_hash, sheet_hashes, unchanged_sheets) in enumerate(plans):
+            db.update_upload_job(job_id, current_file=filename)
+            
+            def report_sheet(sheets_done, sheet_title):
+                db.update_upload_job(job_id, sheets_done=sheets_done, current_sheet=sheet_title)
+            
+            # Process attendance data and leave totals in one pass over the workbook
+            sheet_totals = {}
+            employee_record_counts = {}
+            
+            def track_records(records):
+                for record in records:
+                    employee = record['Employee']
+                    employee_record_counts[employee] = employee_record_counts.get(employee, 0) + 1
+                    yield record
+            
+            # Streamed records are parsed while they are staged, outside any write lock
+            streaming = app.config['INGEST_STREAMING']
+            if parsed_files is not None:
+                file_records = track_records(collect_sheet_records(
+                    parsed_files[file_index], sheet_totals, progress=report_sheet))
+            else:
+                file_records = track_records(iter_attendance_records(
+                    source, sheet_totals, selected_date, progress=report_sheet, skip_sheets=unchanged_sheets,
+                    start_date=start_date))
+            if not streaming:
+                file_records = list(file_records)
+                print(f"DEBUG: Generated {len(file_records)} records from file processing")
+            
+            if write_mode == 'staged':
+                # Nothing is visible until every file is staged and the job is committed below
+                records_saved = db.stage_attendance_records(job_id, file_records, filename)
+                db.stage_leave_totals(job_id, sheet_totals, filename)
+                staged_uploads.append({'file_name': filename, 'content_hash': content_hash,
+                                       'selected_date': period, 'sheet_hashes': sheet_hashes})
+                staged_employees.extend(employee_record_counts)
+                print(f"DEBUG: Staged {records_saved} records from {filename}")
+                total_records += records_saved
+                files_done += 1
+                db.update_upload_job(job_id, files_done=files_done)
+                continue
+            
+            # Leave totals and content hashes commit with the rows, so a failed upload
+            # never leaves hashes that would skip the file or its sheets next time
+            upload = {'content_hash': content_hash, 'selected_date': period, 'sheet_hashes': sheet_hashes}
+            if write_mode == 'delta':
+                # Upsert only the rows that differ from what is stored for this file
+                file_changes = db.sync_attendance_records(file_records, filename, keep_employees=unchanged_sheets,
+                                                          leave_totals=sheet_totals, upload=upload)
+                print(f"DEBUG: Delta sync for {filename}: {file_changes}")
+                for key in changes:
+                    changes[key] += file_changes[key]
+                # Rows skipped with unchanged sheets are still stored for the file
+                records_saved = file_changes['stored']
+            else:
+                # Save to database (this will overwrite existing data for this file)
+                records_saved = db.save_attendance_records(file_records, filename,
+                                                           leave_totals=sheet_totals, upload=upload)
+                print(f"DEBUG: Successfully saved {records_saved} records to database")
+            total_records += records_saved
+
+            # Auto-create employee accounts from this file's data
+            unique_employees = list(employee_record_counts)
+            print(f"DEBUG: Found {len(unique_employees)} unique employees in file: {unique_employees}")
+            file_created, file_existing = employee_db.process_excel_employees(unique_employees)
+            print(f"DEBUG: Created {len(file_created)} new accounts, {len(file_existing)} existing accounts")
+            created_accounts.extend(file_created)
+            existing_accounts.extend(file_existing)
+            
+            files_done += 1
+            db.update_upload_job(job_id, files_done=files_done)
+
+        if staged_uploads:
+            # Swap every staged file into place at once
+            db.commit_staged_upload(job_id, staged_uploads)
+            print(f"DEBUG: Committed {len(staged_uploads)} staged files for job {job_id}")
+            
+            unique_employees = list(dict.fromkeys(staged_employees))
+            created_accounts, existing_accounts = employee_db.process_excel_employees(unique_employees)
+            print(f"DEBUG: Created {len(created_accounts)} new accounts, {len(existing_accounts)} existing accounts")
+
+        message = f"Processed {len(saved_files)} file(s), {total_records} total records saved to database. "
+        if write_mode == 'delta':
+            message += f"{changes['inserted']} inserted, {changes['updated']} updated, {changes['deleted']} deleted. "
+        if skipped_files:
+            message += f"{len(skipped_files)} unchanged file(s) skipped. "
+        if skipped_sheets:
+            message += f"{skipped_sheets} unchanged sheet(s) skipped. "
+        if created_accounts:
+            message += f"{len(created_accounts)} new employee accounts created."
+
+        result = {
+            'success': True,
+            'message': message,
+            'record_count': total_records,
+            'files_processed': len(saved_files),
+            'created_accounts': created_accounts,
+            'total_employees': len(set([acc['name'] for acc in created_accounts + existing_accounts])),
+            'new_accounts': len(created_accounts),
+            'write_mode': write_mode,
+            'skipped_files': skipped_files,
+            'skipped_sheets': skipped_sheets
+        }
+        if write_mode == 'delta':
+            result['changes'] = changes
+        db.update_upload_job(job_id, status='completed', message=message, result=json.dumps(result))
+
+    except Exception as e:
+        print(f"Error processing upload job {job_id}: {e}")
+        db.update_upload_job(job_id, status='failed', message=f'Error processing files: {str(e)}')
+    
+    finally:
+        if write_mode == 'staged':
+            db.discard_staged_upload(job_id)
+        release_upload_sources(saved_files)
+
+def spool_upload(file):
+    """Copy an uploaded file into a buffer that only spills to disk above UPLOAD_SPOOL_MAX_SIZE.
+    The spill file is anonymous, so nothing is left behind if processing fails.
+    """
+    buffer = tempfile.SpooledTemporaryFile(max_size=app.config['UPLOAD_SPOOL_MAX_SIZE'], mode='w+b')
+    shutil.copyfileobj(file.stream, buffer)
+    buffer.seek(0)
+    return buffer
+
+def release_upload_sources(saved_files):
+    """Close spooled upload buffers and remove upload files saved to disk"""
+    for _, source in saved_files:
+        if isinstance(source, str):
+            if os.path.exists(source):
+                os.remove(source)
+        else:
+            source.close()
+
+# Background upload jobs run one at a time on a single worker thread,
+# so web workers stay free and uploads never write concurrently
+upload_job_queue = queue.Queue()
+upload_worker_lock = threading.Lock()
+upload_worker_thread = None
+
+def upload_worker():
+    """Run queued upload jobs forever"""
+    while True:
+        job_id, saved_files, selected_date, write_mode, start_date = upload_job_queue.get()
+        try:
+            run_upload_job(job_id, saved_files, selected_date, write_mode, start_date)
+        finally:
+            upload_job_queue.task_done()
+
+def enqueue_upload_job(job_id, saved_files, selected_date, write_mode='replace', start_date=None):
+    """Queue an upload job, starting the worker thread on first use"""
+    global upload_worker_thread
+    with upload_worker_lock:
+        if upload_worker_thread is None or not upload_worker_thread.is_alive():
+            upload_worker_thread = threading.Thread(target=upload_worker, name='upload-worker', daemon=True)
+            upload_worker_thread.start()
+    upload_job_queue.put((job_id, saved_files, selected_date, write_mode, start_date))
+
 @app.route('/api/upload', methods=['POST'])
 def upload_file():
+    """Save uploaded files and queue them as a background job - poll /api/upload-status/<job_id>"""
     if 'user_data' not in session or not session['user_data'].get('is_admin'):
         return jsonify({'success': False, 'message': 'Admin access required'})
     
@@ -1328,69 +1215,68 @@ def upload_file():
     if not valid_files:
         return jsonify({'success': False, 'message': 'No valid .xlsx files selected'})
 
+    saved_files = []
     try:
         selected_date = datetime.date.today()
         if 'selected_date' in request.form:
             selected_date = datetime.datetime.strptime(request.form['selected_date'], '%Y-%m-%d').date()
 
-        total_records = 0
-        uploaded_filepaths = []
-        created_accounts = []
-        existing_accounts = []
+        # Multi-month ingestion: every month block from start_date (or all of them) through selected_date
+        start_date = None
+        if request.form.get('all_months', '').lower() == 'true':
+            start_date = datetime.date.min
+        elif request.form.get('start_date'):
+            start_date = datetime.datetime.strptime(request.form['start_date'], '%Y-%m-%d').date()
+            if start_date > selected_date:
+                return jsonify({'success': False, 'message': 'Start date must not be after the selected date'})
 
-        for file in valid_files:
-            filename = secure_filename(file.filename)
-            filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-            file.save(filepath)
-            uploaded_filepaths.append(filepath)
-
-            # Process attendance data
-            file_records = process_attendance_file(filepath, selected_date)
-            print(f"DEBUG: Generated {len(file_records)} records from file processing")
-            
-            # Save to database (this will overwrite existing data for this file)
-            records_saved = db.save_attendance_records(file_records, filename)
-            print(f"DEBUG: Successfully saved {records_saved} records to database")
-            total_records += records_saved
-
-            # Process and save leave totals
-            sheet_totals = extract_leave_totals(filepath)
-            db.save_leave_totals(sheet_totals, filename)
+        # 'delta' upserts only changed rows, 'replace' rewrites the whole file,
+        # 'staged' replaces all files of the upload in one transaction
+        write_mode = request.form.get('write_mode', app.config['UPLOAD_WRITE_MODE'])
+        if write_mode not in ('delta', 'replace', 'staged'):
+            return jsonify({'success': False, 'message': f'Unknown write mode: {write_mode}'})
 
-            # Auto-create employee accounts from this file's data
-            unique_employees = list(set([record['Employee'] for record in file_records]))
-            print(f"DEBUG: Found {len(unique_employees)} unique employees in file: {unique_employees}")
-            file_created, file_existing = employee_db.process_excel_employees(unique_employees)
-            print(f"DEBUG: Created {len(file_created)} new accounts, {len(file_existing)} existing accounts")
-            created_accounts.extend(file_created)
-            existing_accounts.extend(file_existing)
+        job_id = uuid.uuid4().hex
 
-        # Cleanup uploaded files
-        for p in uploaded_filepaths:
-            if os.path.exists(p):
-                os.remove(p)
+        for file in valid_files:
+            filename = secure_filename(file.filename)
+            if app.config['UPLOAD_STORAGE'] == 'disk':
+                # Prefix with the job id so concurrent jobs never share a path
+                filepath = os.path.join(app.config['UPLOAD_FOLDER'], f"{job_id}_{filename}")
+                file.save(filepath)
+                saved_files.append((filename, filepath))
+            else:
+                saved_files.append((filename, spool_upload(file)))
 
-        message = f"Processed {len(valid_files)} file(s), {total_records} total records saved to database. "
-        if created_accounts:
-            message += f"{len(created_accounts)} new employee accounts created."
+        if not db.create_upload_job(job_id, len(saved_files), user_data.get('name')):
+            raise RuntimeError('Could not create upload job')
+        enqueue_upload_job(job_id, saved_files, selected_date, write_mode, start_date)
 
         return jsonify({
             'success': True,
-            'message': message,
-            'record_count': total_records,
-            'files_processed': len(valid_files),
-            'created_accounts': created_accounts,
-            'total_employees': len(set([acc['name'] for acc in created_accounts + existing_accounts])),
-            'new_accounts': len(created_accounts)
+            'job_id': job_id,
+            'status': 'queued',
+            'message': f"Queued {len(saved_files)} file(s) for processing"
         })
 
     except Exception as e:
         # Cleanup on error
-        for p in uploaded_filepaths:
-            if os.path.exists(p):
-                os.remove(p)
+        release_upload_sources(saved_files)
         return jsonify({'success': False, 'message': f'Error processing files: {str(e)}'})
 
+@app.route('/api/upload-status/<job_id>')
+def get_upload_status(job_id):
+    """Get progress of a background upload job (admin only)"""
+    if 'user_data' not in session or not session['user_data'].get('is_admin'):
+        return jsonify({'success': False, 'message': 'Admin access required'})
+
+    job = db.get_upload_job(job_id)
+    if not job:
+        return jsonify({'success': False, 'message': 'Upload job not found'})
+
+    job['result'] = json.loads(job['result']) if job['result'] else None
+    return jsonify({'success': True, 'job': job})
+
 @app.route('/api/attendance')
 def get_attendance():
     if 'user_data' not in session:
@@ -1399,6 +1285,25 @@ def get_attendance():
     user_data = session['user_data']
     filter_status = request.args.get('status', 'All')
     employee_filter = request.args.get('employee')
+    # Optional inclusive date range (YYYY-MM-DD) and keyset pagination
+    from_date = request.args.get('from')
+    to_date = request.args.get('to')
+    cursor = request.args.get('cursor')
+    limit = request.args.get('limit')
+    # Optional comma-separated projection, e.g. fields=Employee,Date,Punch-In,Punch-Out,Status
+    fields = [field.strip() for field in request.args.get('fields', '').split(',') if field.strip()]
+
+    try:
+        for value in (from_date, to_date):
+            if value:
+                datetime.datetime.strptime(value, '%Y-%m-%d')
+        if limit is not None:
+            limit = int(limit)
+            if limit < 1:
+                raise ValueError(f"limit must be positive: {limit}")
+            limit = min(limit, app.config['ATTENDANCE_MAX_LIMIT'])
+    except ValueError as e:
+        return jsonify({'success': False, 'message': f'Invalid parameter: {e}'}), 400
 
     # Determine which employee to filter by
     if not user_data.get('is_admin') or employee_filter:
@@ -1407,9 +1312,13 @@ def get_attendance():
         target_employee = None
 
     # Get data from database
-    filtered_data = db.get_attendance_records(target_employee, filter_status)
+    try:
+        page = db.get_attendance_page(target_employee, filter_status, from_date, to_date, limit, cursor,
+                                      fields)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
     
-    return jsonify({'success': True, 'data': filtered_data})
+    return jsonify({'success': True, 'data': page['records'], 'next_cursor': page['next_cursor']})
 
 @app.route('/api/employees')
 def get_employees():
@@ -1457,50 +1366,16 @@ def get_employee_data(employee_name):
             return jsonify({'success': False, 'message': 'Access denied'})
     
     try:
-        # Get employee attendance records
-        employee_records = db.get_attendance_records(employee_filter=employee_name)
+        # Counts come from the monthly summary maintained at ingestion time
+        summary = db.get_employee_summary(employee_name)
         
-        if not employee_records:
+        if not summary:
             return jsonify({'success': False, 'message': 'No data found for this employee'})
         
-        # Calculate statistics
-        total_days = len(employee_records)
-        present_days = len([r for r in employee_records if r['Status'].startswith('P') and not r['Status'].startswith(('PL', 'SL', 'FL', 'PAT', 'MAT', 'HL'))])
-        absent_days = len([r for r in employee_records if r['Status'].startswith('A')]) + (len([r for r in employee_records if r['Status'].startswith('HF')]) * 0.5) + (len([r for r in employee_records if r['Status'].startswith('PHF')]) * 0.5) + (len([r for r in employee_records if r['Status'].startswith('SHF')]) * 0.5)
-        
-        # Calculate half days
-        half_days = len([r for r in employee_records if r['Status'].startswith('HF')])
-        paid_half_days = len([r for r in employee_records if r['Status'].startswith('PHF')])
-        sick_half_days = len([r for r in employee_records if r['Status'].startswith('SHF')])
-        
-        # Calculate leave breakdown
-        wo_used = len([r for r in employee_records if r['Status'].startswith('W/O')])
-        pl_used = len([r for r in employee_records if r['Status'].startswith('PL')])
-        sl_used = len([r for r in employee_records if r['Status'].startswith('SL')])
-        fl_used = len([r for r in employee_records if r['Status'].startswith('FL')])
-        hl_used = len([r for r in employee_records if r['Status'].startswith('HL')])
-        pat_used = len([r for r in employee_records if r['Status'].startswith('PAT')])
-        mat_used = len([r for r in employee_records if r['Status'].startswith('MAT')])
-        
-        # Calculate total paid days (exclude W/O as it's not a leave)
-        paid_leave_days = pl_used + sl_used + fl_used + hl_used + pat_used + mat_used
-        
-        # Add PHF and SHF to paid days (both count as 0.5)
-        paid_half_days = len([r for r in employee_records if r['Status'].startswith('PHF')])
-        sick_half_days = len([r for r in employee_records if r['Status'].startswith('SHF')])
-        total_paid_days = paid_leave_days + (paid_half_days * 0.5) + (sick_half_days * 0.5)
-        
-        # Calculate working days (exclude W/O)
-        working_days = total_days - wo_used
-        
-        # Calculate weighted present days
-        present_days_weighted = present_days + (half_days * 0.5) + (paid_half_days * 0.5) + (sick_half_days * 0.5)
-        
-        # Calculate attendance rate based on working days
-        attendance_rate = (present_days_weighted / working_days * 100) if working_days > 0 else 0
+        counts = summary['counts']
         
         # Get recent records (last 10)
-        recent_records = sorted(employee_records, key=lambda x: x['Date'], reverse=True)[:10]
+        recent_records = db.get_attendance_records(employee_filter=employee_name, limit=10, newest_first=True)
         
         # Get employee email
         employee_email = employee_db.create_employee_email(employee_name)
@@ -1510,20 +1385,20 @@ def get_employee_data(employee_name):
             'employee_name': employee_name,
             'email': employee_email,
             'joining_date': 'N/A',  # Could be added to database if needed
-            'total_days': total_days,
-            'working_days': working_days,
-            'present_days': present_days_weighted,
-            'absent_days': absent_days,
-            'paid_leave_days': total_paid_days,
-            'attendance_rate': round(attendance_rate, 1),
+            'total_days': summary['total_days'],
+            'working_days': summary['working_days'],
+            'present_days': summary['present_days_weighted'],
+            'absent_days': summary['absent_days'],
+            'paid_leave_days': summary['paid_leave_days'],
+            'attendance_rate': round(summary['attendance_rate'], 1),
             'leave_breakdown': {
-                'wo_used': wo_used,
-                'pl_used': pl_used,
-                'sl_used': sl_used,
-                'fl_used': fl_used,
-                'hl_used': hl_used,
-                'pat_used': pat_used,
-                'mat_used': mat_used
+                'wo_used': counts['wo'],
+                'pl_used': counts['pl'],
+                'sl_used': counts['sl'],
+                'fl_used': counts['fl'],
+                'hl_used': counts['hl'],
+                'pat_used': counts['pat'],
+                'mat_used': counts['mat']
             },
             'recent_records': recent_records
         }
@@ -1638,27 +1513,9 @@ def get_late_statistics():
     user_data = session['user_data']
     employee_name = user_data['name']
     
-    print(f"Calculating late statistics for: {employee_name}")
-    
-    # Get the time range for this employee from their records
-    records = db.get_attendance_records(employee_filter=employee_name)
-    print(f"Found {len(records)} records for {employee_name}")
-    
-    time_range = None
-    if records:
-        # Get the most recent time range from records
-        for record in records:
-            if record.get('time_range'):
-                time_range = record['time_range']
-                print(f"Found time range: {time_range}")
-                break
-    
-    if not time_range:
-        print("No time range found, using default 9:00 AM")
-    
-    # Calculate late statistics
-    late_stats = calculate_late_statistics(employee_name, time_range)
-    print(f"Late stats result: {late_stats}")
+    # One query serves both the time range lookup and the lateness pass
+    late_stats = calculate_late_statistics(employee_name)
+    print(f"DEBUG: Late statistics for {employee_name}: {late_stats['total_late_count']} late arrivals")
     
     return jsonify({
         'success': True,
@@ -1674,34 +1531,8 @@ def get_admin_late_statistics():
         return jsonify({'success': False, 'message': 'Admin access required'})
     
     try:
-        # Get all attendance records
-        all_records = db.get_attendance_records()
-        
-        # Group records by employee
-        employee_records = {}
-        for record in all_records:
-            employee_name = record['Employee']
-            if employee_name not in employee_records:
-                employee_records[employee_name] = []
-            employee_records[employee_name].append(record)
-        
-        # Calculate late statistics for each employee
-        all_employee_stats = []
-        
-        for employee_name, records in employee_records.items():
-            # Get time range for this employee
-            time_range = None
-            for record in records:
-                if record.get('time_range'):
-                    time_range = record['time_range']
-                    break
-            
-            # Calculate late statistics
-            late_stats = calculate_late_statistics(employee_name, time_range)
-            
-            # Add employee name to the stats
-            late_stats['employee_name'] = employee_name
-            all_employee_stats.append(late_stats)
+        # Calculate late statistics for each employee from one query
+        all_employee_stats = calculate_all_late_statistics()
         
         # Sort by total late count (descending)
         all_employee_stats.sort(key=lambda x: x['total_late_count'], reverse=True)
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Benchmark for field projection on attendance queries
+Compares fetching and JSON-encoding every attendance column with the slim
+projection table views can request (date, punches and status)
+
+Usage: python benchmarks/bench_attendance_fields.py [record_count]
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import AttendanceDatabase
+from bench_save_attendance import make_records
+
+PROJECTIONS = {
+    'all fields': None,
+    'slim': ['Employee', 'Date', 'Punch-In', 'Punch-Out', 'Status'],
+}
+
+
+def run(database, fields, repeats=5):
+    """Best-of time to fetch all records and to JSON-encode them, plus the payload size"""
+    best_fetch = best_encode = None
+    payload = ''
+    for _ in range(repeats):
+        start = time.perf_counter()
+        records = database.get_attendance_records(fields=fields)
+        fetched = time.perf_counter()
+        payload = json.dumps({'success': True, 'data': records})
+        encoded = time.perf_counter()
+        best_fetch = fetched - start if best_fetch is None else min(best_fetch, fetched - start)
+        best_encode = encoded - fetched if best_encode is None else min(best_encode, encoded - fetched)
+    return best_fetch, best_encode, len(payload)
+
+
+def main():
+    record_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database = AttendanceDatabase(os.path.join(tmp, 'fields.db'))
+        database.save_attendance_records(make_records(record_count), 'history.xlsx')
+
+        print(f"Fetching {record_count:,} attendance records")
+        for label, fields in PROJECTIONS.items():
+            fetch, encode, size = run(database, fields)
+            print(f"{label:12} query: {fetch * 1000:8.1f} ms   json: {encode * 1000:8.1f} ms   "
+                  f"payload: {size / 1024 / 1024:6.2f} MiB")
+
+
+if __name__ == '__main__':
+    main()
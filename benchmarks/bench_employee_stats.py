@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Benchmark for employee statistics aggregation
+Builds five years of daily attendance per employee with a realistic status mix,
+then times one employee's statistics computed two ways: the previous twenty
+list comprehensions over the fetched records and the monthly summary read
+
+Usage: python benchmarks/bench_employee_stats.py [employee_count]
+"""
+
+import datetime
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import AttendanceDatabase
+
+YEARS = 5
+# Weekly offs, the odd leave and half day; P-prefixed leaves exercise the present exclusions
+STATUS_CYCLE = ['P'] * 20 + ['W/O'] * 4 + ['A', 'HF', 'PHF', 'SHF', 'PL', 'SL', 'FL', 'HL', 'P(Late)', 'PAT']
+
+
+def make_history(employee_count):
+    """Daily records for employee_count employees over YEARS years"""
+    start_date = datetime.date(2020, 1, 1)
+    day_count = (datetime.date(2020 + YEARS, 1, 1) - start_date).days
+    records = []
+    for employee in range(employee_count):
+        for day in range(day_count):
+            records.append({
+                'Employee': f"Employee {employee}",
+                'Date': (start_date + datetime.timedelta(days=day)).strftime('%Y-%m-%d'),
+                'Punch-In': '09:05',
+                'Punch-Out': '18:40',
+                'Status': STATUS_CYCLE[(day * 7 + employee) % len(STATUS_CYCLE)],
+                'pin_comment': '',
+                'pout_comment': '',
+                'status_comment': '',
+                'pin_highlight': False,
+                'pout_highlight': False,
+                'status_highlight': False,
+                'time_range': '09:00 AM to 06:00 PM'
+            })
+    return records
+
+
+def comprehension_stats(employee_records):
+    """Statistics as get_employee_data computed them, one comprehension per bucket"""
+    total_days = len(employee_records)
+    present_days = len([r for r in employee_records if r['Status'].startswith('P') and not r['Status'].startswith(('PL', 'SL', 'FL', 'PAT', 'MAT', 'HL'))])
+    absent_days = len([r for r in employee_records if r['Status'].startswith('A')]) + (len([r for r in employee_records if r['Status'].startswith('HF')]) * 0.5) + (len([r for r in employee_records if r['Status'].startswith('PHF')]) * 0.5) + (len([r for r in employee_records if r['Status'].startswith('SHF')]) * 0.5)
+    half_days = len([r for r in employee_records if r['Status'].startswith('HF')])
+    paid_half_days = len([r for r in employee_records if r['Status'].startswith('PHF')])
+    sick_half_days = len([r for r in employee_records if r['Status'].startswith('SHF')])
+    wo_used = len([r for r in employee_records if r['Status'].startswith('W/O')])
+    pl_used = len([r for r in employee_records if r['Status'].startswith('PL')])
+    sl_used = len([r for r in employee_records if r['Status'].startswith('SL')])
+    fl_used = len([r for r in employee_records if r['Status'].startswith('FL')])
+    hl_used = len([r for r in employee_records if r['Status'].startswith('HL')])
+    pat_used = len([r for r in employee_records if r['Status'].startswith('PAT')])
+    mat_used = len([r for r in employee_records if r['Status'].startswith('MAT')])
+    paid_leave_days = pl_used + sl_used + fl_used + hl_used + pat_used + mat_used
+    paid_half_days = len([r for r in employee_records if r['Status'].startswith('PHF')])
+    sick_half_days = len([r for r in employee_records if r['Status'].startswith('SHF')])
+    total_paid_days = paid_leave_days + (paid_half_days * 0.5) + (sick_half_days * 0.5)
+    working_days = total_days - wo_used
+    present_days_weighted = present_days + (half_days * 0.5) + (paid_half_days * 0.5) + (sick_half_days * 0.5)
+    attendance_rate = (present_days_weighted / working_days * 100) if working_days > 0 else 0
+    return {'total_days': total_days, 'working_days': working_days, 'present_days_weighted': present_days_weighted,
+            'absent_days': absent_days, 'paid_leave_days': total_paid_days, 'attendance_rate': attendance_rate}
+
+
+def best_of(function, repeats=10):
+    best = None
+    result = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    employee_count = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database = AttendanceDatabase(os.path.join(tmp, 'stats.db'))
+        records = make_history(employee_count)
+        database.save_attendance_records(records, 'history.xlsx')
+        employee = 'Employee 1'
+
+        fetch, employee_records = best_of(lambda: database.get_attendance_records(employee_filter=employee))
+        approaches = {
+            'fetch + 20 comprehensions': lambda: comprehension_stats(
+                database.get_attendance_records(employee_filter=employee)),
+            'monthly summary': lambda: database.get_employee_summary(employee),
+        }
+
+        print(f"{employee_count} employees x {YEARS} years daily = {len(records):,} records; "
+              f"{len(employee_records):,} for {employee} (fetch alone {fetch * 1000:.1f} ms)")
+        results = {}
+        for label, function in approaches.items():
+            elapsed, results[label] = best_of(function)
+            print(f"{label:28} {elapsed * 1000:8.2f} ms")
+
+        in_memory, _ = best_of(lambda: comprehension_stats(employee_records))
+        print(f"{'in memory: 20 comprehensions':28} {in_memory * 1000:8.2f} ms")
+
+        # Both approaches must agree on the figures the employee page shows
+        for key in ('total_days', 'working_days', 'present_days_weighted', 'absent_days',
+                    'paid_leave_days', 'attendance_rate'):
+            values = {round(result[key], 6) for result in results.values()}
+            assert len(values) == 1, f"{key} differs between approaches: {values}"
+
+
+if __name__ == '__main__':
+    main()
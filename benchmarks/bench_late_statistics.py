@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the admin late statistics
+Compares the previous per-employee computation (one attendance query per
+employee after fetching every record, with per-employee debug output) with
+calculate_all_late_statistics, which reads the stored punch-ins once and only
+fetches the status and punch-out of the late days
+
+Usage: python benchmarks/bench_late_statistics.py [employee_count]
+"""
+
+import contextlib
+import datetime
+import io
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from database import AttendanceDatabase
+from bench_save_attendance import make_records
+
+PUNCH_INS = ['08:55', '09:00', '09:01', '09:05', '09:17', '09:42', '10:03', '08:48']
+
+
+def previous_late_statistics(app):
+    """The admin endpoint before batching: all records, then one query per employee"""
+    employee_records = {}
+    for record in app.db.get_attendance_records():
+        employee_records.setdefault(record['Employee'], []).append(record)
+
+    all_employee_stats = []
+    for employee_name, records in employee_records.items():
+        time_range = next((record['time_range'] for record in records if record.get('time_range')), None)
+        # calculate_late_statistics used to fetch the employee's full records itself
+        full_records = app.db.get_attendance_records(employee_filter=employee_name)
+        late_stats = app.summarize_late_records(employee_name, time_range, full_records)
+        print(f"Late statistics for {employee_name}:")
+        for i, record in enumerate(late_stats['late_records'][:3]):
+            print(f"    Record {i+1}: {record}")
+        late_stats['employee_name'] = employee_name
+        all_employee_stats.append(late_stats)
+    return all_employee_stats
+
+
+def main():
+    employee_count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+
+    records = make_records(employee_count * 365)
+    for i, record in enumerate(records):
+        record['Punch-In'] = PUNCH_INS[(i * 3 + i // 365) % len(PUNCH_INS)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # app opens its default database in the working directory on import
+        os.chdir(tmp)
+        with contextlib.redirect_stdout(io.StringIO()):
+            import app
+            app.db = AttendanceDatabase(os.path.join(tmp, 'late.db'))
+            app.db.save_attendance_records(records, 'history.xlsx')
+
+        print(f"{employee_count} employees, {len(records):,} attendance records")
+        results = {}
+        for label, function in (('per employee (before)', lambda: previous_late_statistics(app)),
+                                ('batched (after)', app.calculate_all_late_statistics)):
+            best = None
+            for _ in range(3):
+                start = time.perf_counter()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    results[label] = function()
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            late = sum(stats['total_late_count'] for stats in results[label])
+            print(f"{label:24} {best * 1000:9.1f} ms   {late:,} late arrivals")
+        os.chdir(ROOT)
+
+    before, after = results.values()
+    assert before == after, "batched late statistics differ from the per-employee results"
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for red font highlight detection
+Compares calling is_font_red on every cell with SheetData.is_red, which
+decides once per style and reuses the result for cells sharing that style
+
+Usage: python benchmarks/bench_red_font.py [employee_count]
+"""
+
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from openpyxl import Workbook, load_workbook
+from openpyxl.styles import Font
+
+from utils.excel_ingest import SheetData, is_font_red
+
+DAYS = 31
+# A realistic handful of fonts: plain, red highlight, bold headers, theme-coloured notes
+FONTS = [Font(), Font(color="FFFF0000"), Font(bold=True), Font(color="FF0000FF"), Font(italic=True)]
+
+
+def make_workbook(employee_count):
+    """Build an in-memory workbook with punch/status rows styled with a few shared fonts"""
+    wb = Workbook()
+    wb.remove(wb.active)
+    for e in range(employee_count):
+        ws = wb.create_sheet(f"Emp {e}")
+        for col in range(1, DAYS + 1):
+            for row in (4, 5, 6):
+                cell = ws.cell(row=row, column=col, value="09:05" if row < 6 else "P")
+                cell.font = FONTS[(col * row + e) % len(FONTS)]
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    buffer.seek(0)
+    return buffer
+
+
+def positions():
+    return [(row, col) for col in range(1, DAYS + 1) for row in (4, 5, 6)]
+
+
+def bench_per_cell(sheets):
+    count = 0
+    for sheet in sheets:
+        for row, col in positions():
+            count += is_font_red(sheet._cells.get((row, col)))
+    return count
+
+
+def bench_cached(sheets):
+    count = 0
+    for sheet in sheets:
+        for row, col in positions():
+            count += sheet.is_red(row, col)
+    return count
+
+
+def best_of(fn, sheets, runs=5):
+    best = None
+    result = None
+    for _ in range(runs):
+        # Fresh caches each run so the cached path pays for its first lookups
+        for sheet in sheets:
+            sheet._red_styles = {}
+        start = time.perf_counter()
+        result = fn(sheets)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    employee_count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    buffer = make_workbook(employee_count)
+
+    # SheetData reads workbooks opened read-only, as the ingestion opens them
+    wb = load_workbook(buffer, data_only=True, read_only=True)
+    sheets = [SheetData(ws) for ws in wb.worksheets]
+    cells = len(sheets) * len(positions())
+    
+    per_cell, red_a = best_of(bench_per_cell, sheets)
+    cached, red_b = best_of(bench_cached, sheets)
+    assert red_a == red_b, "cached detection disagrees with is_font_red"
+    
+    print(f"cells={cells:7d} red={red_a:6d}  "
+          f"is_font_red: {per_cell * 1000:8.1f} ms  "
+          f"style cache: {cached * 1000:8.1f} ms  "
+          f"speedup: {per_cell / cached:5.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Benchmark for AttendanceDatabase.save_attendance_records
+Compares the old per-row INSERT loop into the one-table layout with the batched
+single-transaction write path into the current layout
+
+Usage: python benchmarks/bench_save_attendance.py [record_count]
+"""
+
+import datetime
+import os
+import sys
+import sqlite3
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import AttendanceDatabase, ATTENDANCE_INSERT_SQL, attendance_record_row
+
+# The attendance_records table and its indexes before the compact layout
+LEGACY_SCHEMA = '''
+    CREATE TABLE attendance_records (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        employee_name TEXT NOT NULL,
+        date TEXT NOT NULL,
+        punch_in TEXT,
+        punch_out TEXT,
+        status TEXT,
+        pin_comment TEXT,
+        pout_comment TEXT,
+        status_comment TEXT,
+        pin_highlight BOOLEAN DEFAULT 0,
+        pout_highlight BOOLEAN DEFAULT 0,
+        status_highlight BOOLEAN DEFAULT 0,
+        time_range TEXT,
+        upload_timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+        file_name TEXT,
+        UNIQUE(employee_name, date, file_name)
+    );
+    CREATE INDEX idx_attendance_employee_date ON attendance_records (employee_name, date, status);
+    CREATE INDEX idx_attendance_status_date ON attendance_records (status, date);
+    CREATE INDEX idx_attendance_file ON attendance_records (file_name);
+'''
+
+# The other tables the old write path touched
+LEGACY_UPLOAD_SCHEMA = '''
+    CREATE TABLE leave_totals (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        employee_name TEXT NOT NULL,
+        wo_days REAL DEFAULT 0,
+        pl_days REAL DEFAULT 0,
+        sl_days REAL DEFAULT 0,
+        fl_days REAL DEFAULT 0,
+        upload_timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+        file_name TEXT,
+        UNIQUE(employee_name, file_name)
+    );
+    CREATE TABLE file_uploads (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        file_name TEXT NOT NULL,
+        upload_timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+        record_count INTEGER DEFAULT 0,
+        status TEXT DEFAULT 'success'
+    );
+'''
+
+
+def make_records(count):
+    """Build synthetic attendance records (one per employee per day)"""
+    start_date = datetime.date(2024, 1, 1)
+    records = []
+    for i in range(count):
+        employee = f"Employee {i // 365}"
+        day = i % 365
+        records.append({
+            'Employee': employee,
+            'Date': (start_date + datetime.timedelta(days=day)).strftime('%Y-%m-%d'),
+            'Punch-In': '09:05',
+            'Punch-Out': '18:40',
+            'Status': 'P',
+            'pin_comment': '',
+            'pout_comment': '',
+            'status_comment': '',
+            'pin_highlight': False,
+            'pout_highlight': False,
+            'status_highlight': day % 50 == 0,
+            'time_range': '09:00 AM to 06:00 PM'
+        })
+    return records
+
+
+def open_legacy(path):
+    """A database in the one-table layout, as the previous write path found it"""
+    with sqlite3.connect(path) as conn:
+        conn.executescript(LEGACY_SCHEMA + LEGACY_UPLOAD_SCHEMA)
+    conn.close()
+    return path
+
+
+def save_per_row(db_path, records, file_name):
+    """The previous write path: separate clear connection, one INSERT per record"""
+    with sqlite3.connect(db_path) as conn:
+        cursor = conn.cursor()
+        with sqlite3.connect(db_path) as clear_conn:
+            clear_conn.execute('DELETE FROM attendance_records WHERE file_name = ?', (file_name,))
+            clear_conn.execute('DELETE FROM leave_totals WHERE file_name = ?', (file_name,))
+            clear_conn.execute('DELETE FROM file_uploads WHERE file_name = ?', (file_name,))
+        clear_conn.close()
+        for record in records:
+            cursor.execute(ATTENDANCE_INSERT_SQL, attendance_record_row(record, file_name))
+        cursor.execute('''
+            INSERT INTO file_uploads (file_name, record_count, status)
+            VALUES (?, ?, ?)
+        ''', (file_name, len(records), 'success'))
+        conn.commit()
+        return len(records)
+
+
+def run(label, open_database, save, records, repeats=3):
+    """Time a fresh insert and a re-upload (delete + insert); best of ``repeats``"""
+    fresh, reupload = [], []
+    for _ in range(repeats):
+        with tempfile.TemporaryDirectory() as tmp:
+            database = open_database(os.path.join(tmp, 'bench.db'))
+            start = time.perf_counter()
+            save(database, records, 'bench.xlsx')
+            fresh.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            save(database, records, 'bench.xlsx')
+            reupload.append(time.perf_counter() - start)
+    print(f"{label:<28} fresh: {len(records) / min(fresh):10,.0f} rows/sec   "
+          f"re-upload: {len(records) / min(reupload):10,.0f} rows/sec")
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    records = make_records(count)
+    print(f"Saving {count:,} attendance records")
+    run('per-row INSERT (before)', open_legacy, save_per_row, records)
+    run('batched executemany (after)', AttendanceDatabase,
+        lambda database, r, f: database.save_attendance_records(r, f), records)
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the compact attendance storage layout
+Stores the same synthetic history in the previous one-table layout and in the
+compact attendance_days layout, then compares file size and the per-employee
+reads, from the query to the record dicts get_attendance_records returns
+
+Usage: python benchmarks/bench_storage_layout.py [record_count]
+"""
+
+import os
+import sys
+import sqlite3
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import AttendanceDatabase, ATTENDANCE_INSERT_SQL, ATTENDANCE_RECORD_FIELDS, attendance_record_row
+from bench_save_attendance import LEGACY_SCHEMA, make_records
+
+def legacy_records_query(employee_filter: str = None, status_filter: str = 'All') -> tuple:
+    """get_attendance_records' query as it ran against the one-table layout"""
+    query = '''
+        SELECT employee_name, date, punch_in, punch_out, status,
+               pin_comment, pout_comment, status_comment,
+               pin_highlight, pout_highlight, status_highlight,
+               time_range, upload_timestamp, file_name
+        FROM attendance_records
+        WHERE 1=1
+    '''
+    params = []
+    if employee_filter:
+        query += ' AND employee_name = ?'
+        params.append(employee_filter)
+    if status_filter != 'All':
+        query += ' AND status LIKE ?'
+        params.append(f'{status_filter}%')
+    query += ' ORDER BY date ASC, employee_name'
+    return query, params
+
+
+def build_legacy(path, rows):
+    with sqlite3.connect(path) as conn:
+        conn.executescript(LEGACY_SCHEMA)
+        conn.executemany(ATTENDANCE_INSERT_SQL, rows)
+        conn.execute('ANALYZE')
+    conn.execute('VACUUM')
+    conn.close()
+    connection = sqlite3.connect(path)
+    
+    def read_records(employee_filter, status_filter):
+        query, params = legacy_records_query(employee_filter, status_filter)
+        records = []
+        for row in connection.execute(query, params):
+            record = dict(zip(ATTENDANCE_RECORD_FIELDS, row))
+            for field in ('pin_highlight', 'pout_highlight', 'status_highlight'):
+                record[field] = bool(record[field])
+            records.append(record)
+        return records
+    return read_records
+
+
+def build_compact(path, records):
+    database = AttendanceDatabase(path, journal_mode='DELETE')
+    database.save_attendance_records(records, 'history.xlsx')
+    with database._connect() as conn:
+        conn.execute('ANALYZE')
+        conn.commit()
+        conn.execute('VACUUM')
+    return database.get_attendance_records
+
+
+def file_size(path):
+    return os.path.getsize(path)
+
+
+def time_read(read_records, filters, repeats=50):
+    best = None
+    records = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        records = read_records(*filters)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, records
+
+
+def main():
+    record_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    records = make_records(record_count)
+    # A few days carry comments so the text lookup table is not trivially empty
+    for i, record in enumerate(records[::97]):
+        record['pin_comment'] = f"Late due to traffic ({i % 40})"
+    rows = [attendance_record_row(record, 'history.xlsx') for record in records]
+
+    # Each layout runs the query its own code issued
+    queries = {
+        'one employee': ('Employee 3', 'All'),
+        'one employee, status P': ('Employee 3', 'P'),
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = {label: os.path.join(tmp, f'{name}.db')
+                 for label, name in (('one table (before)', 'legacy'), ('compact (after)', 'compact'))}
+        layouts = {
+            'one table (before)': build_legacy(paths['one table (before)'], rows),
+            'compact (after)': build_compact(paths['compact (after)'], records),
+        }
+        print(f"Storing {record_count:,} attendance records")
+        results = {}
+        for label, read_records in layouts.items():
+            size = file_size(paths[label])
+            timings = []
+            for name, filters in queries.items():
+                elapsed, results[label, name] = time_read(read_records, filters)
+                timings.append(f"{name}: {elapsed * 1000:6.2f} ms ({len(results[label, name])} rows)")
+            print(f"{label:20} {size / 1024 / 1024:7.2f} MiB  "
+                  f"{size / record_count:6.1f} bytes/row  " + '  '.join(timings))
+        # Both layouts return the same records; only the upload times differ between the two builds
+        for name in queries:
+            before, after = ([{**record, 'upload_timestamp': None} for record in results[label, name]]
+                             for label in layouts)
+            assert before == after, name
+
+
+if __name__ == '__main__':
+    main()
@@ -4,6 +4,23 @@ class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'your-secret-key-change-this-in-production'
     UPLOAD_FOLDER = 'uploads'
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
+    INGEST_WORKERS = int(os.environ.get('INGEST_WORKERS', 0))  # 0 or 1 = serial sheet parsing
+    UPLOAD_FILE_WORKERS = int(os.environ.get('UPLOAD_FILE_WORKERS', 0))  # parse files of one upload concurrently
+    UPLOAD_WRITE_MODE = os.environ.get('UPLOAD_WRITE_MODE', 'delta')  # 'delta', 'replace' or 'staged'
+    INGEST_STREAMING = os.environ.get('INGEST_STREAMING', 'false').lower() == 'true'  # feed records to the DB as parsed
+    UPLOAD_STORAGE = os.environ.get('UPLOAD_STORAGE', 'spooled')  # 'spooled' or 'disk'
+    UPLOAD_SPOOL_MAX_SIZE = int(os.environ.get('UPLOAD_SPOOL_MAX_SIZE', 8 * 1024 * 1024))  # spill to disk above this
+    ATTENDANCE_MAX_LIMIT = int(os.environ.get('ATTENDANCE_MAX_LIMIT', 5000))  # largest /api/attendance page
+    DB_BUSY_TIMEOUT = float(os.environ.get('DB_BUSY_TIMEOUT', 5.0))  # seconds to wait for a locked database
+    DB_STATEMENT_CACHE_SIZE = int(os.environ.get('DB_STATEMENT_CACHE_SIZE', 256))  # prepared statements per connection
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 4))  # idle database connections kept for reuse
+    DB_JOURNAL_MODE = os.environ.get('DB_JOURNAL_MODE', 'WAL').upper()  # WAL lets reads continue during uploads
+    DB_SYNCHRONOUS = os.environ.get('DB_SYNCHRONOUS', 'NORMAL').upper()
+    DB_CACHE_SIZE = int(os.environ.get('DB_CACHE_SIZE', -20000))  # negative = KiB
+    DB_MMAP_SIZE = int(os.environ.get('DB_MMAP_SIZE', 256 * 1024 * 1024))
+    DB_TEMP_STORE = os.environ.get('DB_TEMP_STORE', 'MEMORY').upper()
+    DB_CHECKPOINT_ROWS = int(os.environ.get('DB_CHECKPOINT_ROWS', 10000))  # checkpoint the WAL after larger ingests
+    DB_CHECKPOINT_MODE = os.environ.get('DB_CHECKPOINT_MODE', 'PASSIVE').upper()
     
     @staticmethod
     def init_app(app):
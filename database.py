@@ -6,16 +6,599 @@ Handles SQLite database operations for storing Excel data
 
 import sqlite3
 import os
+import re
+import base64
+import json
 import datetime
-from typing import List, Dict, Any, Optional
+import functools
+import itertools
+import queue
+import uuid
+from contextlib import contextmanager
+from typing import List, Dict, Any, Iterable, Optional
 import pytz
+from config.settings import Config
+from utils.attendance_stats import STATUS_BUCKETS, tally_status_buckets, derive_attendance_stats, attendance_summary
+
+# Seconds a connection waits for another writer's lock before raising "database is locked"
+DB_BUSY_TIMEOUT = Config.DB_BUSY_TIMEOUT
+
+# Prepared statements kept per connection (sqlite3 compiles each distinct SQL string once)
+DB_STATEMENT_CACHE_SIZE = Config.DB_STATEMENT_CACHE_SIZE
+
+# Idle connections kept for reuse across requests and threads; extras are closed
+DB_POOL_SIZE = Config.DB_POOL_SIZE
+
+# Connection pragmas. WAL lets employee reads continue while an upload is writing;
+# synchronous=NORMAL is durable in WAL mode without an fsync on every commit.
+DB_JOURNAL_MODE = Config.DB_JOURNAL_MODE
+DB_SYNCHRONOUS = Config.DB_SYNCHRONOUS
+DB_CACHE_SIZE = Config.DB_CACHE_SIZE  # negative = KiB, positive = pages
+DB_MMAP_SIZE = Config.DB_MMAP_SIZE
+DB_TEMP_STORE = Config.DB_TEMP_STORE
+
+# Checkpoint the WAL once an ingest has written at least this many rows
+DB_CHECKPOINT_ROWS = Config.DB_CHECKPOINT_ROWS
+DB_CHECKPOINT_MODE = Config.DB_CHECKPOINT_MODE
+
+JOURNAL_MODES = {'DELETE', 'TRUNCATE', 'PERSIST', 'MEMORY', 'WAL', 'OFF'}
+SYNCHRONOUS_LEVELS = {'OFF', 'NORMAL', 'FULL', 'EXTRA'}
+TEMP_STORES = {'DEFAULT', 'FILE', 'MEMORY'}
+CHECKPOINT_MODES = {'PASSIVE', 'FULL', 'RESTART', 'TRUNCATE'}
+
+# Rows per executemany call when bulk-inserting attendance records
+ATTENDANCE_INSERT_BATCH_SIZE = 5000
+
+ATTENDANCE_INSERT_SQL = '''
+    INSERT OR REPLACE INTO attendance_records 
+    (employee_name, date, punch_in, punch_out, status, 
+     pin_comment, pout_comment, status_comment, 
+     pin_highlight, pout_highlight, status_highlight, time_range, file_name)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+STAGED_ATTENDANCE_INSERT_SQL = '''
+    INSERT OR REPLACE INTO staged_attendance_records
+    (job_id, employee_name, date, punch_in, punch_out, status,
+     pin_comment, pout_comment, status_comment,
+     pin_highlight, pout_highlight, status_highlight, time_range, file_name)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+# Compact attendance storage. Each attendance_days row holds integer ids for the employee,
+# status, file and repeated texts (comments, shift time range), the date as a day number,
+# 'HH:MM' punch times as minutes since midnight, the upload time as unix seconds and the
+# three highlight flags packed into one integer. attendance_records is a view with the
+# original columns; its INSTEAD OF triggers route inserts, updates and deletes.
+UNIX_EPOCH_JULIAN_DAY = 2440587.5
+UNIX_EPOCH_ORDINAL = datetime.date(1970, 1, 1).toordinal()
+
+# PUNCH_TIME_TEXTS[minutes] is the 'HH:MM' text of a stored punch time
+PUNCH_TIME_TEXTS = tuple(f'{minutes // 60:02d}:{minutes % 60:02d}' for minutes in range(24 * 60))
+PUNCH_TIME_MINUTES = {text: minutes for minutes, text in enumerate(PUNCH_TIME_TEXTS)}
+PUNCH_TIME_TEXT_BY_MINUTES = dict(enumerate(PUNCH_TIME_TEXTS))
+
+UPLOAD_TIME_SQL = "CAST(strftime('%s', 'now') AS INTEGER)"
+
+# The punch columns have no type: minutes are stored as integers and any other text
+# (e.g. '930' or 'MISS') stays text, rather than being coerced by a column affinity
+ATTENDANCE_DAYS_SCHEMA = f'''
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    employee_id INTEGER NOT NULL REFERENCES employee_names (id),
+    day INTEGER NOT NULL,
+    punch_in,
+    punch_out,
+    status_id INTEGER REFERENCES attendance_statuses (id),
+    pin_comment_id INTEGER REFERENCES attendance_texts (id),
+    pout_comment_id INTEGER REFERENCES attendance_texts (id),
+    status_comment_id INTEGER REFERENCES attendance_texts (id),
+    highlights INTEGER NOT NULL DEFAULT 0,
+    time_range_id INTEGER REFERENCES attendance_texts (id),
+    upload_timestamp INTEGER DEFAULT ({UPLOAD_TIME_SQL}),
+    file_id INTEGER REFERENCES attendance_files (id),
+    UNIQUE(employee_id, day, file_id)
+'''
+
+def punch_minutes_sql(value: str) -> str:
+    """SQL for the stored form of a punch time expression (see punch_time_minutes)"""
+    return (f"CASE WHEN {value} GLOB '[01][0-9]:[0-5][0-9]' OR {value} GLOB '2[0-3]:[0-5][0-9]' "
+            f"THEN substr({value}, 1, 2) * 60 + substr({value}, 4, 2) ELSE CAST({value} AS TEXT) END")
+
+def punch_text_sql(column: str) -> str:
+    """SQL for the 'HH:MM' text of a stored punch time column (see punch_time_texts)"""
+    return f"CASE WHEN typeof({column}) = 'integer' THEN printf('%02d:%02d', {column} / 60, {column} % 60) ELSE {column} END"
+
+ATTENDANCE_LOOKUP_TABLES = {
+    # table: value column
+    'employee_names': 'employee_name',
+    'attendance_statuses': 'status',
+    'attendance_texts': 'text',
+    'attendance_files': 'file_name',
+}
+
+ATTENDANCE_VIEW_SQL = f'''
+    CREATE VIEW IF NOT EXISTS attendance_records AS
+    SELECT d.id, e.employee_name, date(d.day + {UNIX_EPOCH_JULIAN_DAY}) AS date,
+           {punch_text_sql('d.punch_in')} AS punch_in, {punch_text_sql('d.punch_out')} AS punch_out, s.status,
+           pc.text AS pin_comment, oc.text AS pout_comment, sc.text AS status_comment,
+           d.highlights & 1 AS pin_highlight,
+           (d.highlights >> 1) & 1 AS pout_highlight,
+           (d.highlights >> 2) & 1 AS status_highlight,
+           tr.text AS time_range, datetime(d.upload_timestamp, 'unixepoch') AS upload_timestamp, f.file_name,
+           d.day
+    FROM attendance_days d
+    JOIN employee_names e ON e.id = d.employee_id
+    LEFT JOIN attendance_statuses s ON s.id = d.status_id
+    LEFT JOIN attendance_texts pc ON pc.id = d.pin_comment_id
+    LEFT JOIN attendance_texts oc ON oc.id = d.pout_comment_id
+    LEFT JOIN attendance_texts sc ON sc.id = d.status_comment_id
+    LEFT JOIN attendance_texts tr ON tr.id = d.time_range_id
+    LEFT JOIN attendance_files f ON f.id = d.file_id
+'''
+
+# Adds NEW's employee, status, file and texts to the lookup tables. Written with NOT EXISTS
+# rather than INSERT OR IGNORE, since an outer INSERT OR REPLACE would turn OR IGNORE into a
+# REPLACE that gives existing values new ids.
+_ATTENDANCE_INTERN_SQL = '''
+        SELECT RAISE(ABORT, 'attendance date must be YYYY-MM-DD') WHERE date(NEW.date) IS NOT NEW.date;
+        INSERT INTO employee_names (employee_name) SELECT NEW.employee_name
+        WHERE NEW.employee_name IS NOT NULL
+          AND NOT EXISTS (SELECT 1 FROM employee_names WHERE employee_name = NEW.employee_name);
+        INSERT INTO attendance_statuses (status) SELECT NEW.status
+        WHERE NEW.status IS NOT NULL
+          AND NOT EXISTS (SELECT 1 FROM attendance_statuses WHERE status = NEW.status);
+        INSERT INTO attendance_files (file_name) SELECT NEW.file_name
+        WHERE NEW.file_name IS NOT NULL
+          AND NOT EXISTS (SELECT 1 FROM attendance_files WHERE file_name = NEW.file_name);
+        INSERT INTO attendance_texts (text)
+        SELECT value FROM (SELECT NEW.pin_comment AS value UNION SELECT NEW.pout_comment
+                           UNION SELECT NEW.status_comment UNION SELECT NEW.time_range)
+        WHERE value IS NOT NULL
+          AND NOT EXISTS (SELECT 1 FROM attendance_texts WHERE text = value);
+'''
+
+# attendance_days values for NEW, in ATTENDANCE_DAY_COLUMNS order
+_ATTENDANCE_DAY_VALUES = f'''
+            (SELECT id FROM employee_names WHERE employee_name = NEW.employee_name),
+            CAST(julianday(NEW.date) - {UNIX_EPOCH_JULIAN_DAY} AS INTEGER),
+            {punch_minutes_sql('NEW.punch_in')},
+            {punch_minutes_sql('NEW.punch_out')},
+            (SELECT id FROM attendance_statuses WHERE status = NEW.status),
+            (SELECT id FROM attendance_texts WHERE text = NEW.pin_comment),
+            (SELECT id FROM attendance_texts WHERE text = NEW.pout_comment),
+            (SELECT id FROM attendance_texts WHERE text = NEW.status_comment),
+            (COALESCE(NEW.pin_highlight, 0) != 0)
+              | ((COALESCE(NEW.pout_highlight, 0) != 0) << 1)
+              | ((COALESCE(NEW.status_highlight, 0) != 0) << 2),
+            (SELECT id FROM attendance_texts WHERE text = NEW.time_range),
+            COALESCE(CAST(strftime('%s', NEW.upload_timestamp) AS INTEGER), {UPLOAD_TIME_SQL}),
+            (SELECT id FROM attendance_files WHERE file_name = NEW.file_name)
+'''
+
+ATTENDANCE_DAY_COLUMNS = (
+    'employee_id, day, punch_in, punch_out, status_id, '
+    'pin_comment_id, pout_comment_id, status_comment_id, highlights, time_range_id, '
+    'upload_timestamp, file_id'
+)
+
+# Direct write path used by the save/sync/commit methods; the triggers below serve
+# anything else that writes through the view
+ATTENDANCE_DAY_INSERT_SQL = '''
+    INSERT OR REPLACE INTO attendance_days
+    (employee_id, day, punch_in, punch_out, status_id,
+     pin_comment_id, pout_comment_id, status_comment_id, highlights, time_range_id, file_id)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+# Rows moved over from a pre-compact attendance_records table keep their upload time;
+# a row already stored for the same employee, day and file is kept instead
+LEGACY_ATTENDANCE_INSERT_SQL = f'''
+    INSERT OR IGNORE INTO attendance_days
+    (employee_id, day, punch_in, punch_out, status_id,
+     pin_comment_id, pout_comment_id, status_comment_id, highlights, time_range_id, file_id, upload_timestamp)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, COALESCE(CAST(strftime('%s', ?) AS INTEGER), {UPLOAD_TIME_SQL}))
+'''
+
+# Date formats found in databases written before dates were stored as 'YYYY-MM-DD'
+LEGACY_DATE_FORMATS = ('%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y', '%Y-%m-%d %H:%M:%S')
+
+# Lookup table for each attendance_record_row position
+ATTENDANCE_ROW_LOOKUPS = {
+    'employee_names': (0,),
+    'attendance_statuses': (4,),
+    'attendance_texts': (5, 6, 7, 11),
+    'attendance_files': (12,),
+}
+
+ATTENDANCE_TRIGGERS = {
+    'attendance_records_insert': f'''
+        CREATE TRIGGER IF NOT EXISTS attendance_records_insert
+        INSTEAD OF INSERT ON attendance_records
+        BEGIN
+        {_ATTENDANCE_INTERN_SQL}
+        INSERT INTO attendance_days (id, {ATTENDANCE_DAY_COLUMNS})
+        VALUES (NEW.id, {_ATTENDANCE_DAY_VALUES});
+        END
+    ''',
+    'attendance_records_update': f'''
+        CREATE TRIGGER IF NOT EXISTS attendance_records_update
+        INSTEAD OF UPDATE ON attendance_records
+        BEGIN
+        {_ATTENDANCE_INTERN_SQL}
+        UPDATE attendance_days SET ({ATTENDANCE_DAY_COLUMNS}) = ({_ATTENDANCE_DAY_VALUES})
+        WHERE id = OLD.id;
+        END
+    ''',
+    'attendance_records_delete': '''
+        CREATE TRIGGER IF NOT EXISTS attendance_records_delete
+        INSTEAD OF DELETE ON attendance_records
+        BEGIN
+        DELETE FROM attendance_days WHERE id = OLD.id;
+        END
+    ''',
+}
+
+# One file's rows in attendance_record_row order (file_name excepted) plus the row id,
+# read straight from attendance_days so the file_id index drives the lookup
+ATTENDANCE_FILE_ROWS_SQL = f'''
+    SELECT e.employee_name, date(d.day + {UNIX_EPOCH_JULIAN_DAY}),
+           {punch_text_sql('d.punch_in')}, {punch_text_sql('d.punch_out')}, s.status,
+           pc.text, oc.text, sc.text,
+           d.highlights & 1, (d.highlights >> 1) & 1, (d.highlights >> 2) & 1, tr.text, d.file_id, d.id
+    FROM attendance_days d
+    JOIN employee_names e ON e.id = d.employee_id
+    LEFT JOIN attendance_statuses s ON s.id = d.status_id
+    LEFT JOIN attendance_texts pc ON pc.id = d.pin_comment_id
+    LEFT JOIN attendance_texts oc ON oc.id = d.pout_comment_id
+    LEFT JOIN attendance_texts sc ON sc.id = d.status_comment_id
+    LEFT JOIN attendance_texts tr ON tr.id = d.time_range_id
+    WHERE d.file_id = ?
+'''
+
+# Employees that still have attendance rows; one index probe per name instead of a
+# DISTINCT over every row
+EMPLOYEE_NAMES_SQL = '''
+    SELECT employee_name FROM employee_names
+    WHERE EXISTS (SELECT 1 FROM attendance_days WHERE employee_id = employee_names.id)
+    ORDER BY employee_name
+'''
+
+# Per-employee monthly summary, kept up to date by every write that changes attendance rows
+MONTHLY_SUMMARY_COUNT_COLUMNS = ['total_days'] + [f'{bucket}_days' for bucket in STATUS_BUCKETS]
+MONTHLY_SUMMARY_DERIVED_COLUMNS = ['working_days', 'present_days_weighted', 'attendance_rate']
+MONTHLY_SUMMARY_COLUMNS = MONTHLY_SUMMARY_COUNT_COLUMNS + MONTHLY_SUMMARY_DERIVED_COLUMNS
+
+# The 'YYYY-MM' month of an attendance_days row aliased d
+ATTENDANCE_MONTH_SQL = f"strftime('%Y-%m', d.day + {UNIX_EPOCH_JULIAN_DAY})"
+
+# Secondary indexes for the hot query shapes, created (or added to existing databases) by init_database
+SECONDARY_INDEXES = {
+    # Per-employee history is served by the UNIQUE (employee_id, day, file_id) index
+    # Status filter across all employees
+    'idx_attendance_status_date': 'attendance_days (status_id, day)',
+    # Replacing or syncing one uploaded file
+    'idx_attendance_file': 'attendance_days (file_id)',
+    # Date range across all employees (e.g. one month for the admin table)
+    'idx_attendance_day': 'attendance_days (day, employee_id)',
+    'idx_login_logs_time': 'login_logs (login_time)',
+    'idx_otp_lookup': 'otp_verification (email, is_used, expires_at)',
+}
+
+LOGIN_LOGS_SQL = '''
+    SELECT email, user_name, is_admin, login_time, ip_address, user_agent
+    FROM login_logs 
+    ORDER BY login_time DESC 
+    LIMIT ?
+'''
+
+OTP_LOOKUP_SQL = '''
+    SELECT id, actual_email FROM otp_verification 
+    WHERE email = ? AND otp_code = ? AND is_used = 0 AND expires_at > ?
+'''
+
+def clean_employee_name(full_name: str) -> str:
+    """Login email key for an employee name: 'Sachin Mandal (T)' -> 'sachinmandal'"""
+    cleaned_name = full_name.strip()
+    cleaned_name = re.sub(r'\s*\([^)]*\)$', '', cleaned_name)
+    return cleaned_name.lower().replace(' ', '').replace('.', '').replace('-', '')
+
+def status_prefix_range(prefix: str) -> tuple:
+    """Bounds (low, high) such that low <= status < high for statuses starting with prefix.
+    Statuses are stored upper-cased, so the range is taken on the upper-cased prefix.
+    """
+    prefix = prefix.upper()
+    return prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+@functools.lru_cache(maxsize=4096)
+def attendance_date_text(day: int) -> str:
+    """'YYYY-MM-DD' for an attendance_days.day number"""
+    return datetime.date.fromordinal(day + UNIX_EPOCH_ORDINAL).isoformat()
+
+def punch_time_minutes(value: Any) -> Any:
+    """Stored form of a punch time: minutes since midnight for 'HH:MM', other values as text"""
+    if value is None:
+        return None
+    # The columns had TEXT affinity before, so non-text values are still stored as text
+    value = str(value)
+    return PUNCH_TIME_MINUTES.get(value, value)
+
+def punch_time_texts(values: Iterable[Any]) -> Iterable[Any]:
+    """Punch times as read from attendance_days back to their 'HH:MM' (or original) text"""
+    return map(PUNCH_TIME_TEXT_BY_MINUTES.get, values, values)
+
+@functools.lru_cache(maxsize=1024)
+def upload_time_text(seconds: Optional[int]) -> Optional[str]:
+    """'YYYY-MM-DD HH:MM:SS' (UTC, as CURRENT_TIMESTAMP writes it) for stored unix seconds"""
+    if seconds is None:
+        return None
+    return datetime.datetime.fromtimestamp(seconds, datetime.timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+
+# Attendance record keys returned by get_attendance_records and the attendance_days
+# expression each is read from
+ATTENDANCE_RECORD_FIELDS = {
+    'Employee': 'e.employee_name',
+    'Date': 'd.day',
+    'Punch-In': 'd.punch_in',
+    'Punch-Out': 'd.punch_out',
+    'Status': 'd.status_id',
+    'pin_comment': 'd.pin_comment_id',
+    'pout_comment': 'd.pout_comment_id',
+    'status_comment': 'd.status_comment_id',
+    'pin_highlight': 'd.highlights & 1',
+    'pout_highlight': 'd.highlights & 2',
+    'status_highlight': 'd.highlights & 4',
+    'time_range': 'd.time_range_id',
+    'upload_timestamp': 'd.upload_timestamp',
+    'file_name': 'd.file_id',
+}
+
+# Fields read as ids of one of ATTENDANCE_LOOKUP_TABLES; get_attendance_page resolves them
+# from AttendanceDatabase._lookup_values rather than joining the table on every row
+ATTENDANCE_LOOKUP_FIELDS = {
+    'Status': 'attendance_statuses',
+    'pin_comment': 'attendance_texts',
+    'pout_comment': 'attendance_texts',
+    'status_comment': 'attendance_texts',
+    'time_range': 'attendance_texts',
+    'file_name': 'attendance_files',
+}
+
+# Fields stored in a compact form, with the function that turns a column of stored values
+# back into what the attendance_records view shows. One map() per column over cached
+# results is cheaper than SQL date()/printf() on every row.
+ATTENDANCE_COLUMN_DECODERS = {
+    'Date': functools.partial(map, attendance_date_text),
+    'Punch-In': punch_time_texts,
+    'Punch-Out': punch_time_texts,
+    'pin_highlight': functools.partial(map, bool),
+    'pout_highlight': functools.partial(map, bool),
+    'status_highlight': functools.partial(map, bool),
+    'upload_timestamp': functools.partial(map, upload_time_text),
+}
+
+def attendance_aggregate_query(keys: List[str], where: str = None) -> str:
+    """Days per status grouped by the keys SQL expressions, over attendance_days aliased d;
+    where is an optional condition on it. Bucket counts are folded from these in Python so
+    the prefix tests run once per distinct status rather than once per row."""
+    group = ', '.join(keys)
+    query = f'''
+        SELECT {group}, s.status, COUNT(*)
+        FROM attendance_days d
+        LEFT JOIN attendance_statuses s ON s.id = d.status_id
+    '''
+    if where:
+        query += f' WHERE {where}'
+    return query + f' GROUP BY {group}, d.status_id'
+
+def attendance_records_query(employee_filter: str = None, status_filter: str = 'All',
+                             from_date: str = None, to_date: str = None,
+                             after: tuple = None, limit: int = None, fields: Iterable[str] = None,
+                             newest_first: bool = False) -> tuple:
+    """Build the get_attendance_records query and its parameters.
+    from_date/to_date are inclusive 'YYYY-MM-DD' bounds. after is a (day, employee_name,
+    file_id, id) keyset from decode_attendance_cursor; rows sort on that key so pages never
+    overlap. A row without a file sorts as file_id 0, ahead of every stored file.
+    fields selects ATTENDANCE_RECORD_FIELDS keys (default all); the selected columns are in
+    their stored form (see ATTENDANCE_LOOKUP_FIELDS and ATTENDANCE_COLUMN_DECODERS) and,
+    when there is a limit, followed by the day, employee_name, file_id, id keyset.
+    Raises ValueError for unknown fields.
+    newest_first reverses the order (and the direction pages continue in).
+    """
+    fields = list(fields or ATTENDANCE_RECORD_FIELDS)
+    unknown = [field for field in fields if field not in ATTENDANCE_RECORD_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown attendance field(s): {', '.join(unknown)}")
+    
+    # Read attendance_days directly; statuses are joined only to filter on them
+    columns = [ATTENDANCE_RECORD_FIELDS[field] for field in fields]
+    if limit:
+        # Only a page that can end early needs the key its cursor continues from
+        columns += ['d.day', 'e.employee_name', 'IFNULL(d.file_id, 0)', 'd.id']
+    query = f'''
+        SELECT {', '.join(columns)}
+        FROM attendance_days d
+        JOIN employee_names e ON e.id = d.employee_id
+        {'LEFT JOIN attendance_statuses s ON s.id = d.status_id' if status_filter != 'All' else ''}
+        WHERE 1=1
+    '''
+    params = []
+    
+    if employee_filter:
+        query += ' AND e.employee_name = ?'
+        params.append(employee_filter)
+    
+    if status_filter != 'All':
+        # LIKE is case-insensitive and can't use an index; the range lets the index do the work
+        query += ' AND s.status LIKE ?'
+        params.append(f'{status_filter}%')
+        if status_filter:
+            query += ' AND s.status >= ? AND s.status < ?'
+            params.extend(status_prefix_range(status_filter))
+    
+    # Date bounds go on the indexed day number
+    if from_date:
+        query += ' AND d.day >= ?'
+        params.append(attendance_day_number(from_date))
+    if to_date:
+        query += ' AND d.day <= ?'
+        params.append(attendance_day_number(to_date))
+    
+    if after:
+        # The plain day bound gives the index a starting point for the row comparison
+        if newest_first:
+            query += ' AND d.day <= ? AND (d.day, e.employee_name, IFNULL(d.file_id, 0), d.id) < (?, ?, ?, ?)'
+        else:
+            query += ' AND d.day >= ? AND (d.day, e.employee_name, IFNULL(d.file_id, 0), d.id) > (?, ?, ?, ?)'
+        params.append(after[0])
+        params.extend(after)
+    
+    # day orders like the ISO date; for one employee the whole key is the order of the
+    # UNIQUE (employee_id, day, file_id) index, so no sort is needed
+    if newest_first:
+        query += ' ORDER BY d.day DESC, e.employee_name DESC, d.file_id DESC, d.id DESC'
+    else:
+        query += ' ORDER BY d.day ASC, e.employee_name, d.file_id, d.id'
+    if limit:
+        query += ' LIMIT ?'
+        params.append(limit)
+    return query, params
+
+def encode_attendance_cursor(day: int, employee_name: str, file_id: int, row_id: int) -> str:
+    """Opaque keyset cursor for the attendance row a page ended on"""
+    key = json.dumps([day, employee_name, file_id, row_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(key.encode()).decode()
+
+def decode_attendance_cursor(cursor: str) -> tuple:
+    """(day, employee_name, file_id, id) from encode_attendance_cursor; raises ValueError if malformed"""
+    try:
+        day, employee_name, file_id, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+    if not all(isinstance(value, int) for value in (day, file_id, row_id)) or not isinstance(employee_name, str):
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+    return day, employee_name, file_id, row_id
+
+def attendance_record_row(record: Dict[str, Any], file_name: str) -> tuple:
+    """Convert a processed attendance record into ATTENDANCE_INSERT_SQL parameters"""
+    return (
+        record.get('Employee', ''),
+        record.get('Date', ''),
+        record.get('Punch-In', ''),
+        record.get('Punch-Out', ''),
+        record.get('Status', ''),
+        record.get('pin_comment', ''),
+        record.get('pout_comment', ''),
+        record.get('status_comment', ''),
+        record.get('pin_highlight', False),
+        record.get('pout_highlight', False),
+        record.get('status_highlight', False),
+        record.get('time_range', ''),
+        file_name
+    )
+
+def attendance_day_number(date_text: str) -> int:
+    """Days since 1970-01-01 for a 'YYYY-MM-DD' date, as stored in attendance_days.day"""
+    day = datetime.date.fromisoformat(date_text)
+    if day.isoformat() != date_text:
+        raise ValueError(f"attendance date must be YYYY-MM-DD: {date_text!r}")
+    return day.toordinal() - UNIX_EPOCH_ORDINAL
+
+def normalize_attendance_date(value: Any) -> Optional[str]:
+    """'YYYY-MM-DD' for a stored attendance date in any LEGACY_DATE_FORMATS, or None"""
+    if value is None:
+        return None
+    text = str(value).strip()
+    for date_format in LEGACY_DATE_FORMATS:
+        try:
+            return datetime.datetime.strptime(text, date_format).date().isoformat()
+        except ValueError:
+            continue
+    return None
+
+def pack_highlights(pin_highlight: Any, pout_highlight: Any, status_highlight: Any) -> int:
+    """Pack the three highlight flags into attendance_days.highlights (bits 0, 1, 2)"""
+    return bool(pin_highlight) | bool(pout_highlight) << 1 | bool(status_highlight) << 2
 
 class AttendanceDatabase:
-    def __init__(self, db_path: str = 'attendance.db'):
+    def __init__(self, db_path: str = 'attendance.db', busy_timeout: float = DB_BUSY_TIMEOUT,
+                 statement_cache_size: int = DB_STATEMENT_CACHE_SIZE, journal_mode: str = DB_JOURNAL_MODE,
+                 synchronous: str = DB_SYNCHRONOUS, cache_size: int = DB_CACHE_SIZE,
+                 mmap_size: int = DB_MMAP_SIZE, temp_store: str = DB_TEMP_STORE,
+                 checkpoint_rows: int = DB_CHECKPOINT_ROWS, checkpoint_mode: str = DB_CHECKPOINT_MODE,
+                 pool_size: int = DB_POOL_SIZE):
         """Initialize database connection"""
+        # Pragma values can't be bound as parameters, so only known values are accepted
+        if journal_mode not in JOURNAL_MODES:
+            raise ValueError(f"Unknown journal mode: {journal_mode}")
+        if synchronous not in SYNCHRONOUS_LEVELS:
+            raise ValueError(f"Unknown synchronous level: {synchronous}")
+        if temp_store not in TEMP_STORES:
+            raise ValueError(f"Unknown temp store: {temp_store}")
+        if checkpoint_mode not in CHECKPOINT_MODES:
+            raise ValueError(f"Unknown checkpoint mode: {checkpoint_mode}")
+        
         self.db_path = db_path
+        self.busy_timeout = busy_timeout
+        self.statement_cache_size = statement_cache_size
+        self.journal_mode = journal_mode
+        self.synchronous = synchronous
+        self.cache_size = int(cache_size)
+        self.mmap_size = int(mmap_size)
+        self.temp_store = temp_store
+        self.checkpoint_rows = checkpoint_rows
+        self.checkpoint_mode = checkpoint_mode
+        # Idle connections shared by every thread; the threaded dev server runs each
+        # request on a new thread, so per-thread connections would never be reused
+        self._pool = queue.LifoQueue(maxsize=max(int(pool_size), 0))
+        # id -> value of each lookup table, filled as records are read. Lookup rows are only
+        # ever added, never changed or deleted, so a value once read stays correct.
+        self._lookup_values = {table: {} for table in ATTENDANCE_LOOKUP_TABLES}
         self.init_database()
     
+    def _new_connection(self) -> sqlite3.Connection:
+        # Pooled connections move between threads, but only one thread uses each at a time
+        conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout,
+                               cached_statements=self.statement_cache_size, check_same_thread=False)
+        # Per-connection settings; the journal mode is stored in the file by init_database
+        conn.execute(f'PRAGMA synchronous = {self.synchronous}')
+        conn.execute(f'PRAGMA cache_size = {self.cache_size}')
+        conn.execute(f'PRAGMA mmap_size = {self.mmap_size}')
+        conn.execute(f'PRAGMA temp_store = {self.temp_store}')
+        return conn
+    
+    @contextmanager
+    def _connect(self):
+        """Hand out a pooled connection for one unit of work.
+        Like ``with sqlite3.connect(...)``, it commits on success and rolls back on error.
+        Each use gets a connection of its own, so a nested use (e.g. a generator consumed
+        inside another transaction) can't commit the outer one. Afterwards the connection
+        goes back to the pool, or is closed when pool_size idle connections are kept.
+        """
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            conn = self._new_connection()
+        # Methods that want sqlite3.Row set it themselves
+        conn.row_factory = None
+        try:
+            with conn:
+                yield conn
+        except BaseException:
+            conn.close()
+            raise
+        try:
+            self._pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+    
+    def close(self):
+        """Close the idle pooled connections (connections in use are closed when released)"""
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
+    
     def get_indian_time(self):
         """Get current time in Indian Standard Time (IST)"""
         ist = pytz.timezone('Asia/Kolkata')
@@ -23,38 +606,33 @@ class AttendanceDatabase:
     
     def init_database(self):
         """Create database tables if they don't exist"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             cursor = conn.cursor()
             
-            # Create attendance records table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS attendance_records (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    employee_name TEXT NOT NULL,
-                    date TEXT NOT NULL,
-                    punch_in TEXT,
-                    punch_out TEXT,
-                    status TEXT,
-                    pin_comment TEXT,
-                    pout_comment TEXT,
-                    status_comment TEXT,
-                    pin_highlight BOOLEAN DEFAULT 0,
-                    pout_highlight BOOLEAN DEFAULT 0,
-                    status_highlight BOOLEAN DEFAULT 0,
-                    time_range TEXT,
-                    upload_timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    file_name TEXT,
-                    UNIQUE(employee_name, date, file_name)
-                )
-            ''')
+            # WAL is persistent, so setting it once per process is enough
+            cursor.execute(f'PRAGMA journal_mode = {self.journal_mode}')
             
-            # Add time_range column if it doesn't exist (for existing databases)
+            # Add time_range column if it doesn't exist (databases older than the compact layout)
             try:
                 cursor.execute('ALTER TABLE attendance_records ADD COLUMN time_range TEXT')
             except sqlite3.OperationalError:
-                # Column already exists, ignore
+                # Column already exists (or attendance_records is already the view), ignore
                 pass
             
+            # Create compact attendance storage and its lookup tables
+            for table, column in ATTENDANCE_LOOKUP_TABLES.items():
+                cursor.execute(f'''
+                    CREATE TABLE IF NOT EXISTS {table} (
+                        id INTEGER PRIMARY KEY,
+                        {column} TEXT UNIQUE NOT NULL
+                    )
+                ''')
+            cursor.execute(f'CREATE TABLE IF NOT EXISTS attendance_days ({ATTENDANCE_DAYS_SCHEMA})')
+            
+            # Databases from the first compact layout stored punch and upload times as text,
+            # and those from before it keep attendance_records as a table
+            migrated_rows = self._upgrade_attendance_days(conn)
+            migrated_rows += self._migrate_legacy_attendance(conn)
             
             # Create leave totals table
             cursor.execute('''
@@ -82,6 +660,26 @@ class AttendanceDatabase:
                 )
             ''')
             
+            # Add content hash columns if they don't exist (for existing databases)
+            for column in ('content_hash TEXT', 'selected_date TEXT'):
+                try:
+                    cursor.execute(f'ALTER TABLE file_uploads ADD COLUMN {column}')
+                except sqlite3.OperationalError:
+                    # Column already exists, ignore
+                    pass
+            
+            # Create per-sheet content hash table so unchanged sheets can be skipped
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS sheet_hashes (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    file_name TEXT NOT NULL,
+                    sheet_name TEXT NOT NULL,
+                    content_hash TEXT NOT NULL,
+                    selected_date TEXT,
+                    UNIQUE(file_name, sheet_name)
+                )
+            ''')
+            
             # Create admin settings table
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS admin_settings (
@@ -162,142 +760,874 @@ class AttendanceDatabase:
                 )
             ''')
             
+            # Create upload jobs table for background upload progress
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS upload_jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    job_id TEXT UNIQUE NOT NULL,
+                    status TEXT DEFAULT 'queued',
+                    total_files INTEGER DEFAULT 0,
+                    files_done INTEGER DEFAULT 0,
+                    current_file TEXT,
+                    sheets_done INTEGER DEFAULT 0,
+                    current_sheet TEXT,
+                    message TEXT,
+                    result TEXT,
+                    created_by TEXT,
+                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            
+            # Create staging tables for staged uploads; rows are swapped into the live
+            # tables in one transaction once every file of the job has been written
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS staged_attendance_records (
+                    job_id TEXT NOT NULL,
+                    employee_name TEXT NOT NULL,
+                    date TEXT NOT NULL,
+                    punch_in TEXT,
+                    punch_out TEXT,
+                    status TEXT,
+                    pin_comment TEXT,
+                    pout_comment TEXT,
+                    status_comment TEXT,
+                    pin_highlight BOOLEAN DEFAULT 0,
+                    pout_highlight BOOLEAN DEFAULT 0,
+                    status_highlight BOOLEAN DEFAULT 0,
+                    time_range TEXT,
+                    file_name TEXT,
+                    UNIQUE(job_id, employee_name, date, file_name)
+                )
+            ''')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS staged_leave_totals (
+                    job_id TEXT NOT NULL,
+                    employee_name TEXT NOT NULL,
+                    wo_days REAL DEFAULT 0,
+                    pl_days REAL DEFAULT 0,
+                    sl_days REAL DEFAULT 0,
+                    fl_days REAL DEFAULT 0,
+                    file_name TEXT,
+                    UNIQUE(job_id, employee_name, file_name)
+                )
+            ''')
+            
+            # Create employees table: one row per login email key, rebuilt from
+            # attendance_records whenever an ingest or clear changes the stored names
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'employees'")
+            employees_table_exists = cursor.fetchone() is not None
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS employees (
+                    email_key TEXT PRIMARY KEY,
+                    employee_name TEXT NOT NULL,
+                    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            if not employees_table_exists:
+                # Existing databases: fill it from the attendance already stored
+                self._refresh_employees(cursor)
+            
+            # Create per-employee monthly summary table (month is 'YYYY-MM')
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'employee_monthly_summary'")
+            summary_table_exists = cursor.fetchone() is not None
+            summary_columns = ',\n'.join(
+                [f'{column} INTEGER NOT NULL DEFAULT 0' for column in MONTHLY_SUMMARY_COUNT_COLUMNS] +
+                ['working_days INTEGER NOT NULL DEFAULT 0',
+                 'present_days_weighted REAL NOT NULL DEFAULT 0',
+                 'attendance_rate REAL NOT NULL DEFAULT 0'])
+            cursor.execute(f'''
+                CREATE TABLE IF NOT EXISTS employee_monthly_summary (
+                    employee_id INTEGER NOT NULL REFERENCES employee_names (id),
+                    month TEXT NOT NULL,
+                    {summary_columns},
+                    PRIMARY KEY (employee_id, month)
+                ) WITHOUT ROWID
+            ''')
+            if not summary_table_exists:
+                self._refresh_monthly_summary(cursor)
+            
+            # Add secondary indexes (also migrates existing databases)
+            cursor.execute("SELECT name FROM sqlite_master WHERE type = 'index'")
+            existing_indexes = {row[0] for row in cursor.fetchall()}
+            for name, columns in SECONDARY_INDEXES.items():
+                if name not in existing_indexes:
+                    cursor.execute(f'CREATE INDEX {name} ON {columns}')
+                    print(f"Created index {name}")
             
             conn.commit()
+            
+            if not set(SECONDARY_INDEXES) <= existing_indexes:
+                # Refresh planner statistics for the new indexes
+                cursor.execute('ANALYZE')
+            
+            if migrated_rows:
+                # Give the space of the old table back to the filesystem
+                conn.execute('VACUUM')
+    
+    def _upgrade_attendance_days(self, conn: sqlite3.Connection) -> int:
+        """Rebuild an attendance_days table that stores punch and upload times as text into
+        ATTENDANCE_DAYS_SCHEMA, in one transaction. The attendance_records view is dropped
+        with it and recreated by _migrate_legacy_attendance. Returns the number of rows converted.
+        """
+        cursor = conn.cursor()
+        cursor.execute("SELECT type FROM pragma_table_info('attendance_days') WHERE name = 'punch_in'")
+        if cursor.fetchone()[0] != 'TEXT':
+            return 0
+        
+        # Explicit, because sqlite3 would otherwise autocommit each DDL statement
+        cursor.execute('BEGIN IMMEDIATE')
+        try:
+            cursor.execute(f'CREATE TABLE attendance_days_upgraded ({ATTENDANCE_DAYS_SCHEMA})')
+            cursor.execute(f'''
+                INSERT INTO attendance_days_upgraded (id, {ATTENDANCE_DAY_COLUMNS})
+                SELECT id, employee_id, day, {punch_minutes_sql('punch_in')}, {punch_minutes_sql('punch_out')},
+                       status_id, pin_comment_id, pout_comment_id, status_comment_id, highlights, time_range_id,
+                       COALESCE(CAST(strftime('%s', upload_timestamp) AS INTEGER), {UPLOAD_TIME_SQL}), file_id
+                FROM attendance_days
+            ''')
+            converted_rows = cursor.rowcount
+            # The view refers to attendance_days, which would block the rename below
+            cursor.execute('DROP VIEW IF EXISTS attendance_records')
+            cursor.execute('DROP TABLE attendance_days')
+            cursor.execute('ALTER TABLE attendance_days_upgraded RENAME TO attendance_days')
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        print(f"Converted {converted_rows} attendance_days rows to integer punch and upload times")
+        return converted_rows
+    
+    def _migrate_legacy_attendance(self, conn: sqlite3.Connection) -> int:
+        """Move a pre-compact attendance_records table into attendance_days and create the
+        attendance_records view and its triggers, all in one transaction.
+        The old table is renamed to attendance_records_legacy and emptied into the new
+        layout; a legacy table left behind by an interrupted migration is resumed the
+        same way. Dates are normalized with normalize_attendance_date; rows whose date
+        can't be read stay in attendance_records_legacy and are reported, the table is
+        dropped once it is empty. Rows already stored in the new layout win over legacy
+        rows for the same employee, day and file. Returns the number of rows moved.
+        """
+        cursor = conn.cursor()
+        # Explicit, because sqlite3 would otherwise autocommit each DDL statement
+        cursor.execute('BEGIN IMMEDIATE')
+        try:
+            cursor.execute('''
+                SELECT name, type FROM sqlite_master
+                WHERE name IN ('attendance_records', 'attendance_records_legacy')
+            ''')
+            objects = dict(cursor.fetchall())
+            if objects.get('attendance_records') == 'table':
+                cursor.execute('ALTER TABLE attendance_records RENAME TO attendance_records_legacy')
+                objects['attendance_records_legacy'] = 'table'
+            
+            cursor.execute(ATTENDANCE_VIEW_SQL)
+            for trigger_sql in ATTENDANCE_TRIGGERS.values():
+                cursor.execute(trigger_sql)
+            
+            moved_rows = 0
+            if 'attendance_records_legacy' in objects:
+                moved_rows = self._move_legacy_rows(cursor)
+            conn.commit()
+            return moved_rows
+        except Exception:
+            conn.rollback()
+            raise
+    
+    def _move_legacy_rows(self, cursor: sqlite3.Cursor) -> int:
+        """Copy attendance_records_legacy rows with readable dates into attendance_days and
+        delete them from the legacy table, using the caller's transaction"""
+        # The legacy indexes moved with the rename; they would shadow the new ones by name
+        cursor.execute('''
+            SELECT name FROM sqlite_master
+            WHERE type = 'index' AND tbl_name = 'attendance_records_legacy' AND sql IS NOT NULL
+        ''')
+        for (index_name,) in cursor.fetchall():
+            cursor.execute(f'DROP INDEX {index_name}')
+        
+        # Newest first, so when two legacy dates normalize to the same day the later row wins
+        cursor.execute('''
+            SELECT id, employee_name, date, punch_in, punch_out, status,
+                   pin_comment, pout_comment, status_comment,
+                   pin_highlight, pout_highlight, status_highlight, time_range, file_name, upload_timestamp
+            FROM attendance_records_legacy
+            ORDER BY id DESC
+        ''')
+        legacy_rows = cursor.fetchall()
+        
+        moved_ids, rows, timestamps, rejected = [], [], [], []
+        for legacy_id, employee_name, date, *values, file_name, upload_timestamp in legacy_rows:
+            day = normalize_attendance_date(date)
+            if day is None:
+                rejected.append((legacy_id, employee_name, date))
+                continue
+            moved_ids.append((legacy_id,))
+            rows.append((employee_name, day, *values, file_name))
+            timestamps.append(upload_timestamp)
+        
+        for start in range(0, len(rows), ATTENDANCE_INSERT_BATCH_SIZE):
+            batch = rows[start:start + ATTENDANCE_INSERT_BATCH_SIZE]
+            day_rows = self._attendance_day_rows(cursor, batch)
+            cursor.executemany(LEGACY_ATTENDANCE_INSERT_SQL, [
+                day_row + (timestamp,)
+                for day_row, timestamp in zip(day_rows, timestamps[start:start + ATTENDANCE_INSERT_BATCH_SIZE])])
+        
+        if rejected:
+            cursor.executemany('DELETE FROM attendance_records_legacy WHERE id = ?', moved_ids)
+            print(f"WARNING: {len(rejected)} legacy attendance row(s) have unreadable dates and were left in "
+                  f"attendance_records_legacy, e.g. {rejected[:3]}")
+        else:
+            cursor.execute('DROP TABLE attendance_records_legacy')
+        
+        if moved_ids:
+            # Tables created by later versions are kept in step with the moved rows
+            cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' "
+                           "AND name IN ('employees', 'employee_monthly_summary')")
+            derived_tables = {row[0] for row in cursor.fetchall()}
+            if 'employees' in derived_tables:
+                self._refresh_employees(cursor)
+            if 'employee_monthly_summary' in derived_tables:
+                self._refresh_monthly_summary(cursor)
+            print(f"Migrated {len(moved_ids)} attendance_records rows to the compact layout")
+        return len(moved_ids)
+    
+    def query_plans(self) -> Dict[str, List[str]]:
+        """EXPLAIN QUERY PLAN details for the hot read queries, keyed by query name.
+        Used by tests/test_query_plans.py to catch full table scans.
+        """
+        queries = {
+            'attendance_by_employee': attendance_records_query('Employee', 'All'),
+            'attendance_by_employee_status': attendance_records_query('Employee', 'P'),
+            'attendance_by_status': attendance_records_query(None, 'P'),
+            'attendance_month': attendance_records_query(None, 'All', '2025-01-01', '2025-01-31', limit=501),
+            'attendance_month_next_page': attendance_records_query(
+                'Employee', 'All', '2025-01-01', '2025-01-31', (20089, 'Employee', 1, 1), 501),
+            'attendance_month_slim': attendance_records_query(
+                None, 'All', '2025-01-01', '2025-01-31', fields=['Employee', 'Date', 'Status']),
+            'attendance_recent': attendance_records_query('Employee', 'All', limit=10, newest_first=True),
+            'employee_summary': (f'''
+                SELECT SUM(m.total_days) FROM employee_monthly_summary m
+                JOIN employee_names e ON e.id = m.employee_id
+                WHERE e.employee_name = ?
+            ''', ['Employee']),
+            'monthly_summary_refresh': (attendance_aggregate_query(
+                ['d.employee_id', ATTENDANCE_MONTH_SQL], 'd.employee_id = ?'), [1]),
+            'attendance_by_file': (ATTENDANCE_FILE_ROWS_SQL, [1]),
+            'attendance_count_by_file': ('SELECT COUNT(*) FROM attendance_days WHERE file_id = ?', [1]),
+            'employee_login': ('SELECT employee_name FROM employees WHERE email_key = ?', ['employee']),
+            'login_logs': (LOGIN_LOGS_SQL, [100]),
+            'otp_lookup': (OTP_LOOKUP_SQL, ['user@gmail.com', '123456', self.get_indian_time()]),
+        }
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            plans = {}
+            for name, (query, params) in queries.items():
+                cursor.execute(f'EXPLAIN QUERY PLAN {query}', params)
+                plans[name] = [row[3] for row in cursor.fetchall()]
+            return plans
+    
+    def find_full_scans(self) -> List[str]:
+        """Hot queries whose plan scans a whole table instead of using an index"""
+        scans = []
+        for name, plan in self.query_plans().items():
+            for detail in plan:
+                if detail.startswith('SCAN ') and ' INDEX ' not in detail:
+                    scans.append(f"{name}: {detail}")
+        return scans
+    
+    def checkpoint_after_ingest(self, rows_written: int) -> bool:
+        """Checkpoint the WAL after a large ingest so it doesn't keep growing.
+        Small writes are left to SQLite's automatic checkpoints. The default PASSIVE
+        mode never waits on readers or writers.
+        """
+        if self.journal_mode != 'WAL' or rows_written < self.checkpoint_rows:
+            return False
+        try:
+            with self._connect() as conn:
+                busy, log_pages, checkpointed = conn.execute(
+                    f'PRAGMA wal_checkpoint({self.checkpoint_mode})').fetchone()
+            print(f"DEBUG: WAL checkpoint after {rows_written} rows: {checkpointed}/{log_pages} pages, busy={busy}")
+            return True
+        except Exception as e:
+            print(f"Error checkpointing database: {e}")
+            return False
+    
+    def _delete_file_data(self, cursor: sqlite3.Cursor, file_name: str = None):
+        """Delete stored data for a specific file (or all data) using the caller's transaction"""
+        if file_name:
+            # Clear data for specific file
+            cursor.execute('DELETE FROM attendance_days WHERE file_id = ?', (self._file_id(cursor, file_name),))
+            cursor.execute('DELETE FROM leave_totals WHERE file_name = ?', (file_name,))
+            cursor.execute('DELETE FROM file_uploads WHERE file_name = ?', (file_name,))
+            cursor.execute('DELETE FROM sheet_hashes WHERE file_name = ?', (file_name,))
+        else:
+            # Clear all data
+            cursor.execute('DELETE FROM attendance_days')
+            cursor.execute('DELETE FROM leave_totals')
+            cursor.execute('DELETE FROM file_uploads')
+            cursor.execute('DELETE FROM sheet_hashes')
+    
+    def _lookup_ids(self, cursor: sqlite3.Cursor, table: str, values: Iterable[Any]) -> Dict[Any, int]:
+        """Ids of values in one of ATTENDANCE_LOOKUP_TABLES, adding the ones not stored yet"""
+        column = ATTENDANCE_LOOKUP_TABLES[table]
+        ids = {}
+        for value in set(values):
+            if value is None:
+                continue
+            cursor.execute(f'SELECT id FROM {table} WHERE {column} = ?', (value,))
+            row = cursor.fetchone()
+            if row is None:
+                cursor.execute(f'INSERT INTO {table} ({column}) VALUES (?)', (value,))
+                ids[value] = cursor.lastrowid
+            else:
+                ids[value] = row[0]
+        return ids
+    
+    def _lookup_values_of(self, cursor: sqlite3.Cursor, table: str, ids: Iterable[Optional[int]]) -> Dict[int, str]:
+        """id -> value map of one of ATTENDANCE_LOOKUP_TABLES covering ids, reading only
+        the ids not seen before"""
+        values = self._lookup_values[table]
+        missing = set(ids).difference(values)
+        missing.discard(None)
+        if missing:
+            column = ATTENDANCE_LOOKUP_TABLES[table]
+            cursor.execute(f"SELECT id, {column} FROM {table} WHERE id IN ({', '.join('?' * len(missing))})",
+                           list(missing))
+            values.update(cursor.fetchall())
+        return values
+    
+    def _attendance_day_rows(self, cursor: sqlite3.Cursor, rows: List[tuple]) -> List[tuple]:
+        """Convert attendance_record_row tuples into ATTENDANCE_DAY_INSERT_SQL parameters"""
+        ids = {table: self._lookup_ids(cursor, table, (row[i] for row in rows for i in positions))
+               for table, positions in ATTENDANCE_ROW_LOOKUPS.items()}
+        names, statuses = ids['employee_names'], ids['attendance_statuses']
+        texts, files = ids['attendance_texts'], ids['attendance_files']
+        return [(
+            names.get(row[0]),
+            attendance_day_number(row[1]),
+            punch_time_minutes(row[2]),
+            punch_time_minutes(row[3]),
+            statuses.get(row[4]),
+            texts.get(row[5]),
+            texts.get(row[6]),
+            texts.get(row[7]),
+            pack_highlights(row[8], row[9], row[10]),
+            texts.get(row[11]),
+            files.get(row[12])
+        ) for row in rows]
+    
+    def _insert_attendance_rows(self, cursor: sqlite3.Cursor, rows: Iterable[tuple]) -> int:
+        """Insert attendance_record_row tuples in batches using the caller's transaction"""
+        record_count = 0
+        rows = iter(rows)
+        while True:
+            batch = list(itertools.islice(rows, ATTENDANCE_INSERT_BATCH_SIZE))
+            if not batch:
+                break
+            cursor.executemany(ATTENDANCE_DAY_INSERT_SQL, self._attendance_day_rows(cursor, batch))
+            record_count += len(batch)
+        return record_count
+    
+    def _refresh_employees(self, cursor: sqlite3.Cursor):
+        """Rebuild the employees table from the names in attendance_records using the caller's transaction.
+        When several names share a login email key the first name in sort order wins,
+        matching the order logins used to scan get_employees() in.
+        """
+        cursor.execute(EMPLOYEE_NAMES_SQL)
+        employees = {}
+        for (employee_name,) in cursor.fetchall():
+            employees.setdefault(clean_employee_name(employee_name), employee_name)
+        cursor.execute('DELETE FROM employees')
+        cursor.executemany('INSERT INTO employees (email_key, employee_name) VALUES (?, ?)',
+                           employees.items())
+    
+    def _file_id(self, cursor: sqlite3.Cursor, file_name: str) -> Optional[int]:
+        """attendance_files id of file_name (None if no rows were ever stored for it).
+        Queries resolve it first so attendance_days is read through idx_attendance_file."""
+        cursor.execute('SELECT id FROM attendance_files WHERE file_name = ?', (file_name,))
+        row = cursor.fetchone()
+        return row[0] if row else None
+    
+    def _file_employee_ids(self, cursor: sqlite3.Cursor, file_name: str) -> set:
+        """Ids of the employees with attendance rows from file_name"""
+        cursor.execute('SELECT DISTINCT employee_id FROM attendance_days WHERE file_id = ?',
+                       (self._file_id(cursor, file_name),))
+        return {row[0] for row in cursor.fetchall()}
+    
+    def _aggregate_status_days(self, cursor: sqlite3.Cursor, keys: List[str], where: str = None,
+                               params: List[Any] = ()) -> Dict[tuple, tuple]:
+        """Run attendance_aggregate_query and fold the per-status day counts into
+        {key tuple: (total_days, bucket counts)}"""
+        cursor.execute(attendance_aggregate_query(keys, where), list(params))
+        
+        status_days = {}
+        for *key, status, days in cursor.fetchall():
+            status_days.setdefault(tuple(key), []).append((status, days))
+        return {key: tally_status_buckets(pairs) for key, pairs in status_days.items()}
+    
+    def _refresh_monthly_summary(self, cursor: sqlite3.Cursor, employee_ids: Iterable[int] = None):
+        """Recompute employee_monthly_summary rows for employee_ids (all employees if None)
+        from attendance_days, using the caller's transaction"""
+        if employee_ids is None:
+            cursor.execute('DELETE FROM employee_monthly_summary')
+            groups = self._aggregate_status_days(cursor, ['d.employee_id', ATTENDANCE_MONTH_SQL])
+        else:
+            groups = {}
+            for employee_id in employee_ids:
+                cursor.execute('DELETE FROM employee_monthly_summary WHERE employee_id = ?', (employee_id,))
+                groups.update(self._aggregate_status_days(cursor, ['d.employee_id', ATTENDANCE_MONTH_SQL],
+                                                          'd.employee_id = ?', [employee_id]))
+        
+        rows = []
+        for (employee_id, month), (total_days, counts) in groups.items():
+            stats = derive_attendance_stats(total_days, counts)
+            rows.append((employee_id, month, total_days, *counts.values(),
+                         *(stats[column] for column in MONTHLY_SUMMARY_DERIVED_COLUMNS)))
+        cursor.executemany(f'''
+            INSERT INTO employee_monthly_summary (employee_id, month, {', '.join(MONTHLY_SUMMARY_COLUMNS)})
+            VALUES ({', '.join('?' * (len(MONTHLY_SUMMARY_COLUMNS) + 2))})
+        ''', rows)
     
     def clear_existing_data(self, file_name: str = None):
         """Clear existing data for a specific file or all data"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             cursor = conn.cursor()
-            
-            if file_name:
-                # Clear data for specific file
-                cursor.execute('DELETE FROM attendance_records WHERE file_name = ?', (file_name,))
-                cursor.execute('DELETE FROM leave_totals WHERE file_name = ?', (file_name,))
-                cursor.execute('DELETE FROM file_uploads WHERE file_name = ?', (file_name,))
-            else:
-                # Clear all data
-                cursor.execute('DELETE FROM attendance_records')
-                cursor.execute('DELETE FROM leave_totals')
-                cursor.execute('DELETE FROM file_uploads')
-            
+            affected = self._file_employee_ids(cursor, file_name) if file_name else None
+            self._delete_file_data(cursor, file_name)
+            self._refresh_employees(cursor)
+            self._refresh_monthly_summary(cursor, affected)
             conn.commit()
     
-    def save_attendance_records(self, records: List[Dict[str, Any]], file_name: str):
-        """Save attendance records to database"""
-        with sqlite3.connect(self.db_path) as conn:
+    def save_attendance_records(self, records: Iterable[Dict[str, Any]], file_name: str,
+                                leave_totals: Dict[str, Dict[str, float]] = None,
+                                upload: Dict[str, Any] = None):
+        """Save attendance records to database.
+        The delete of this file's old data, the batched inserts and the file_uploads
+        row all run in one transaction on one connection, together with the file's
+        leave_totals and upload hashes (content_hash, selected_date, sheet_hashes)
+        when given, so stored hashes always describe rows that were written.
+        records may be a generator (streaming ingestion); it is then staged batch by
+        batch first and only the final swap takes the write lock, so parsing never
+        blocks other writers. leave_totals is read after records is consumed.
+        """
+        if not isinstance(records, (list, tuple)):
+            return self._save_streamed_records(records, file_name, leave_totals, upload)
+        
+        with self._connect() as conn:
             cursor = conn.cursor()
+            # Take the write lock up front; the connection context rolls back on error
+            cursor.execute('BEGIN IMMEDIATE')
             
             # Clear existing data for this file
-            self.clear_existing_data(file_name)
+            affected = self._file_employee_ids(cursor, file_name)
+            self._delete_file_data(cursor, file_name)
             
-            # Insert new records
-            for record in records:
-                cursor.execute('''
-                    INSERT OR REPLACE INTO attendance_records 
-                    (employee_name, date, punch_in, punch_out, status, 
-                     pin_comment, pout_comment, status_comment, 
-                     pin_highlight, pout_highlight, status_highlight, time_range, file_name)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    record.get('Employee', ''),
-                    record.get('Date', ''),
-                    record.get('Punch-In', ''),
-                    record.get('Punch-Out', ''),
-                    record.get('Status', ''),
-                    record.get('pin_comment', ''),
-                    record.get('pout_comment', ''),
-                    record.get('status_comment', ''),
-                    record.get('pin_highlight', False),
-                    record.get('pout_highlight', False),
-                    record.get('status_highlight', False),
-                    record.get('time_range', ''),
-                    file_name
-                ))
+            # Insert new records in batches
+            record_count = self._insert_attendance_rows(
+                cursor, (attendance_record_row(record, file_name) for record in records))
             
             # Record file upload
             cursor.execute('''
                 INSERT INTO file_uploads (file_name, record_count, status)
                 VALUES (?, ?, ?)
-            ''', (file_name, len(records), 'success'))
+            ''', (file_name, record_count, 'success'))
+            if leave_totals:
+                self._write_leave_totals(cursor, leave_totals, file_name)
+            if upload:
+                self._write_upload_hashes(cursor, file_name, upload)
             
+            self._refresh_employees(cursor)
+            self._refresh_monthly_summary(cursor, affected | self._file_employee_ids(cursor, file_name))
             conn.commit()
-            return len(records)
+        
+        self.checkpoint_after_ingest(record_count)
+        return record_count
     
-    def save_leave_totals(self, leave_totals: Dict[str, Dict[str, float]], file_name: str):
-        """Save leave totals to database"""
-        with sqlite3.connect(self.db_path) as conn:
+    def _save_streamed_records(self, records: Iterable[Dict[str, Any]], file_name: str,
+                               leave_totals: Dict[str, Dict[str, float]] = None,
+                               upload: Dict[str, Any] = None) -> int:
+        """save_attendance_records for a generator: stage it outside any write lock,
+        then replace the file's data with one commit_staged_upload transaction"""
+        staging_key = f"save-{uuid.uuid4().hex}"
+        try:
+            self.stage_attendance_records(staging_key, records, file_name)
+            self.stage_leave_totals(staging_key, leave_totals or {}, file_name)
+            upload = upload or {'content_hash': None, 'selected_date': None, 'sheet_hashes': {}}
+            return self.commit_staged_upload(staging_key, [dict(upload, file_name=file_name)])
+        finally:
+            self.discard_staged_upload(staging_key)
+    
+    def sync_attendance_records(self, records: Iterable[Dict[str, Any]], file_name: str,
+                                keep_employees: Optional[set] = None,
+                                leave_totals: Dict[str, Dict[str, float]] = None,
+                                upload: Dict[str, Any] = None) -> Dict[str, int]:
+        """Apply only the differences between records and what is stored for this file.
+        Rows are matched on (employee_name, date); new rows are inserted, changed rows
+        updated and rows no longer in the file deleted, all in one transaction.
+        Stored rows and leave totals of keep_employees (e.g. unchanged sheets that were
+        not reprocessed) are left untouched. The file's new leave_totals and upload
+        hashes (as for save_attendance_records) are written in the same transaction,
+        so a failed sync never leaves hashes that would skip the file next time.
+        Returns the inserted/updated/deleted/unchanged counts and, as stored, the number
+        of rows kept for the file afterwards.
+        """
+        keep_employees = keep_employees or set()
+        incoming = {}
+        for record in records:
+            row = attendance_record_row(record, file_name)
+            incoming[(row[0], row[1])] = row
+        
+        with self._connect() as conn:
             cursor = conn.cursor()
+            # Take the write lock up front; the connection context rolls back on error
+            cursor.execute('BEGIN IMMEDIATE')
             
-            for employee, totals in leave_totals.items():
-                cursor.execute('''
-                    INSERT OR REPLACE INTO leave_totals 
-                    (employee_name, wo_days, pl_days, sl_days, fl_days, file_name)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                ''', (
-                    employee,
-                    totals.get('W/O', 0),
-                    totals.get('PL', 0),
-                    totals.get('SL', 0),
-                    totals.get('FL', 0),
-                    file_name
-                ))
+            file_id = self._file_id(cursor, file_name)
+            cursor.execute(ATTENDANCE_FILE_ROWS_SQL, (file_id,))
+            stored = {(row[0], row[1]): row for row in cursor.fetchall() if row[0] not in keep_employees}
             
+            # Changed and removed rows are addressed by their attendance_days id
+            inserts, changed, changed_ids, unchanged = [], [], [], 0
+            for key, row in incoming.items():
+                old = stored.pop(key, None)
+                if old is None:
+                    inserts.append(row)
+                elif tuple(old[2:12]) != tuple(row[2:12]):
+                    changed.append(row)
+                    changed_ids.append(old[13])
+                else:
+                    unchanged += 1
+            deletes = [(old[13],) for old in stored.values()]
+            updates = [day_row[2:10] + (row_id,)
+                       for day_row, row_id in zip(self._attendance_day_rows(cursor, changed), changed_ids)]
+            
+            cursor.executemany('DELETE FROM attendance_days WHERE id = ?', deletes)
+            self._insert_attendance_rows(cursor, inserts)
+            cursor.executemany(f'''
+                UPDATE attendance_days
+                SET punch_in = ?, punch_out = ?, status_id = ?,
+                    pin_comment_id = ?, pout_comment_id = ?, status_comment_id = ?,
+                    highlights = ?, time_range_id = ?,
+                    upload_timestamp = {UPLOAD_TIME_SQL}
+                WHERE id = ?
+            ''', updates)
+            
+            # Leave totals are re-saved after every upload; refresh the upload record
+            cursor.execute('SELECT DISTINCT employee_name FROM leave_totals WHERE file_name = ?', (file_name,))
+            cursor.executemany('''
+                DELETE FROM leave_totals WHERE employee_name = ? AND file_name = ?
+            ''', [(row[0], file_name) for row in cursor.fetchall() if row[0] not in keep_employees])
+            # New rows may have created the file's id
+            cursor.execute('SELECT COUNT(*) FROM attendance_days WHERE file_id = ?',
+                           (self._file_id(cursor, file_name),))
+            record_count = cursor.fetchone()[0]
+            cursor.execute('DELETE FROM file_uploads WHERE file_name = ?', (file_name,))
+            cursor.execute('''
+                INSERT INTO file_uploads (file_name, record_count, status)
+                VALUES (?, ?, ?)
+            ''', (file_name, record_count, 'success'))
+            if leave_totals:
+                self._write_leave_totals(cursor, leave_totals, file_name)
+            if upload:
+                self._write_upload_hashes(cursor, file_name, upload)
+            
+            if inserts or deletes:
+                self._refresh_employees(cursor)
+            affected = {row[0] for row in inserts + changed} | {key[0] for key in stored}
+            self._refresh_monthly_summary(cursor, self._lookup_ids(cursor, 'employee_names', affected).values())
             conn.commit()
+        
+        self.checkpoint_after_ingest(len(inserts) + len(updates) + len(deletes))
+        return {
+            'inserted': len(inserts),
+            'updated': len(updates),
+            'deleted': len(deletes),
+            'unchanged': unchanged,
+            'stored': record_count
+        }
     
-    def get_attendance_records(self, employee_filter: str = None, status_filter: str = 'All') -> List[Dict[str, Any]]:
-        """Get attendance records from database"""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
+    def stage_attendance_records(self, job_id: str, records: Iterable[Dict[str, Any]], file_name: str) -> int:
+        """Write one file's records into the staging table for an upload job.
+        Nothing is visible to readers until commit_staged_upload swaps the job in.
+        Each batch commits on its own, so while records (e.g. a parsing generator) is
+        being consumed no write lock is held and other writers are not kept waiting;
+        a failed job's partial rows are removed by discard_staged_upload.
+        """
+        with self._connect() as conn:
             cursor = conn.cursor()
+            cursor.execute('DELETE FROM staged_attendance_records WHERE job_id = ? AND file_name = ?',
+                           (job_id, file_name))
+            conn.commit()
             
-            query = '''
-                SELECT employee_name, date, punch_in, punch_out, status,
-                       pin_comment, pout_comment, status_comment,
-                       pin_highlight, pout_highlight, status_highlight,
-                       time_range, upload_timestamp, file_name
-                FROM attendance_records
-                WHERE 1=1
-            '''
-            params = []
+            record_count = 0
+            rows = ((job_id,) + attendance_record_row(record, file_name) for record in records)
+            while True:
+                batch = list(itertools.islice(rows, ATTENDANCE_INSERT_BATCH_SIZE))
+                if not batch:
+                    break
+                cursor.executemany(STAGED_ATTENDANCE_INSERT_SQL, batch)
+                conn.commit()
+                record_count += len(batch)
             
-            if employee_filter:
-                query += ' AND employee_name = ?'
-                params.append(employee_filter)
+            return record_count
+    
+    def stage_leave_totals(self, job_id: str, leave_totals: Dict[str, Dict[str, float]], file_name: str):
+        """Write one file's leave totals into the staging table for an upload job"""
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            cursor.executemany('''
+                INSERT OR REPLACE INTO staged_leave_totals
+                (job_id, employee_name, wo_days, pl_days, sl_days, fl_days, file_name)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', [(job_id, employee, totals.get('W/O', 0), totals.get('PL', 0), totals.get('SL', 0),
+                   totals.get('FL', 0), file_name) for employee, totals in leave_totals.items()])
+            conn.commit()
+    
+    def commit_staged_upload(self, job_id: str, uploads: List[Dict[str, Any]]) -> int:
+        """Swap every staged file of an upload job into the live tables in one transaction.
+        uploads holds file_name, content_hash, selected_date and sheet_hashes per file.
+        Each file's old data is replaced; readers see either the old or the new data
+        for all files. Staged rows are removed. Returns the number of records committed.
+        """
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            # Take the write lock up front; the connection context rolls back on error
+            cursor.execute('BEGIN IMMEDIATE')
             
-            if status_filter != 'All':
-                query += ' AND status LIKE ?'
-                params.append(f'{status_filter}%')
+            total_records = 0
+            affected = set()
+            for upload in uploads:
+                file_name = upload['file_name']
+                affected |= self._file_employee_ids(cursor, file_name)
+                self._delete_file_data(cursor, file_name)
+                
+                staged = conn.execute('''
+                    SELECT employee_name, date, punch_in, punch_out, status,
+                           pin_comment, pout_comment, status_comment,
+                           pin_highlight, pout_highlight, status_highlight, time_range, file_name
+                    FROM staged_attendance_records
+                    WHERE job_id = ? AND file_name = ?
+                ''', (job_id, file_name))
+                record_count = self._insert_attendance_rows(cursor, staged)
+                total_records += record_count
+                affected |= self._file_employee_ids(cursor, file_name)
+                
+                cursor.execute('''
+                    INSERT OR REPLACE INTO leave_totals
+                    (employee_name, wo_days, pl_days, sl_days, fl_days, file_name)
+                    SELECT employee_name, wo_days, pl_days, sl_days, fl_days, file_name
+                    FROM staged_leave_totals
+                    WHERE job_id = ? AND file_name = ?
+                ''', (job_id, file_name))
+                
+                cursor.execute('''
+                    INSERT INTO file_uploads (file_name, record_count, status, content_hash, selected_date)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', (file_name, record_count, 'success', upload['content_hash'], upload['selected_date']))
+                cursor.executemany('''
+                    INSERT INTO sheet_hashes (file_name, sheet_name, content_hash, selected_date)
+                    VALUES (?, ?, ?, ?)
+                ''', [(file_name, sheet, sheet_hash, upload['selected_date'])
+                      for sheet, sheet_hash in upload['sheet_hashes'].items()])
             
-            query += ' ORDER BY date ASC, employee_name'
+            cursor.execute('DELETE FROM staged_attendance_records WHERE job_id = ?', (job_id,))
+            cursor.execute('DELETE FROM staged_leave_totals WHERE job_id = ?', (job_id,))
             
+            self._refresh_employees(cursor)
+            self._refresh_monthly_summary(cursor, affected)
+            conn.commit()
+        
+        # Staged rows were written twice (staging, then live), so count them both times
+        self.checkpoint_after_ingest(2 * total_records)
+        return total_records
+    
+    def discard_staged_upload(self, job_id: str) -> bool:
+        """Drop whatever an upload job staged (after a failure, or left over after a commit)"""
+        try:
+            with self._connect() as conn:
+                cursor = conn.cursor()
+                cursor.execute('DELETE FROM staged_attendance_records WHERE job_id = ?', (job_id,))
+                cursor.execute('DELETE FROM staged_leave_totals WHERE job_id = ?', (job_id,))
+                conn.commit()
+                return True
+        except Exception as e:
+            print(f"Error discarding staged upload {job_id}: {e}")
+            return False
+    
+    def is_upload_unchanged(self, file_name: str, content_hash: str, selected_date: str) -> bool:
+        """Check whether this exact file was already ingested for the same selected date"""
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT 1 FROM file_uploads
+                WHERE file_name = ? AND content_hash = ? AND selected_date = ?
+                LIMIT 1
+            ''', (file_name, content_hash, selected_date))
+            return cursor.fetchone() is not None
+    
+    def get_sheet_hashes(self, file_name: str, selected_date: str) -> Dict[str, str]:
+        """Get stored per-sheet content hashes for a file ingested for selected_date"""
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT sheet_name, content_hash FROM sheet_hashes
+                WHERE file_name = ? AND selected_date = ?
+            ''', (file_name, selected_date))
+            return {row[0]: row[1] for row in cursor.fetchall()}
+    
+    def _write_upload_hashes(self, cursor: sqlite3.Cursor, file_name: str, upload: Dict[str, Any]):
+        """Store a file's content hash and per-sheet hashes using the caller's transaction.
+        upload holds content_hash, selected_date and sheet_hashes."""
+        cursor.execute('''
+            UPDATE file_uploads SET content_hash = ?, selected_date = ?
+            WHERE file_name = ?
+        ''', (upload['content_hash'], upload['selected_date'], file_name))
+        cursor.execute('DELETE FROM sheet_hashes WHERE file_name = ?', (file_name,))
+        cursor.executemany('''
+            INSERT INTO sheet_hashes (file_name, sheet_name, content_hash, selected_date)
+            VALUES (?, ?, ?, ?)
+        ''', [(file_name, sheet, sheet_hash, upload['selected_date'])
+              for sheet, sheet_hash in upload['sheet_hashes'].items()])
+    
+    def _write_leave_totals(self, cursor: sqlite3.Cursor, leave_totals: Dict[str, Dict[str, float]],
+                            file_name: str):
+        """Store a file's leave totals using the caller's transaction"""
+        for employee, totals in leave_totals.items():
+            cursor.execute('''
+                INSERT OR REPLACE INTO leave_totals
+                (employee_name, wo_days, pl_days, sl_days, fl_days, file_name)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (
+                employee,
+                totals.get('W/O', 0),
+                totals.get('PL', 0),
+                totals.get('SL', 0),
+                totals.get('FL', 0),
+                file_name
+            ))
+    
+    def get_attendance_records(self, employee_filter: str = None, status_filter: str = 'All',
+                               from_date: str = None, to_date: str = None,
+                               limit: int = None, cursor: str = None,
+                               fields: Iterable[str] = None, newest_first: bool = False) -> List[Dict[str, Any]]:
+        """Get attendance records from database (see get_attendance_page for the options)"""
+        return self.get_attendance_page(employee_filter, status_filter, from_date, to_date,
+                                        limit, cursor, fields, newest_first)['records']
+    
+    def get_attendance_page(self, employee_filter: str = None, status_filter: str = 'All',
+                            from_date: str = None, to_date: str = None,
+                            limit: int = None, cursor: str = None,
+                            fields: Iterable[str] = None, newest_first: bool = False) -> Dict[str, Any]:
+        """Get one page of attendance records, ordered by date and employee.
+        from_date/to_date are inclusive 'YYYY-MM-DD' bounds. With a limit, next_cursor is
+        set when more rows follow; pass it back as cursor for the next page.
+        fields limits each record to those ATTENDANCE_RECORD_FIELDS keys (default all).
+        newest_first returns the latest dates first.
+        Returns {'records': [...], 'next_cursor': str or None}.
+        """
+        fields = list(fields or ATTENDANCE_RECORD_FIELDS)
+        after = decode_attendance_cursor(cursor) if cursor else None
+        # One extra row tells whether another page follows
+        query, params = attendance_records_query(employee_filter, status_filter, from_date, to_date,
+                                                 after, limit + 1 if limit else None, fields, newest_first)
+        with self._connect() as conn:
+            cursor = conn.cursor()
             cursor.execute(query, params)
             rows = cursor.fetchall()
             
+            next_cursor = None
+            if limit and len(rows) > limit:
+                rows = rows[:limit]
+                next_cursor = encode_attendance_cursor(*rows[-1][-4:])
+            
             records = []
-            for row in rows:
-                records.append({
-                    'Employee': row['employee_name'],
-                    'Date': row['date'],
-                    'Punch-In': row['punch_in'],
-                    'Punch-Out': row['punch_out'],
-                    'Status': row['status'],
-                    'pin_comment': row['pin_comment'],
-                    'pout_comment': row['pout_comment'],
-                    'status_comment': row['status_comment'],
-                    'pin_highlight': bool(row['pin_highlight']),
-                    'pout_highlight': bool(row['pout_highlight']),
-                    'status_highlight': bool(row['status_highlight']),
-                    'time_range': row['time_range'],
-                    'upload_timestamp': row['upload_timestamp'],
-                    'file_name': row['file_name']
-                })
-            
-            return records
+            if rows:
+                # Decoded a column at a time; the trailing keyset columns are left out
+                columns = list(zip(*rows))[:len(fields)]
+                for i, field in enumerate(fields):
+                    if field in ATTENDANCE_LOOKUP_FIELDS:
+                        values = self._lookup_values_of(cursor, ATTENDANCE_LOOKUP_FIELDS[field], columns[i])
+                        columns[i] = map(values.get, columns[i])
+                    elif field in ATTENDANCE_COLUMN_DECODERS:
+                        columns[i] = ATTENDANCE_COLUMN_DECODERS[field](columns[i])
+                records = [dict(zip(fields, values)) for values in zip(*columns)]
+        
+        return {'records': records, 'next_cursor': next_cursor}
+    
+    def get_punch_ins(self) -> List[Dict[str, Any]]:
+        """Every employee's punch-ins for the late statistics, read straight from attendance_days
+        without building full records. Returns one {'employee', 'time_range', 'punches'} dict
+        per employee, where punches are (row_id, date, punch_in) tuples and time_range is the
+        first one set. Employees and punches are in get_attendance_records order.
+        """
+        employees = []
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            # The UNIQUE (employee_id, day, file_id) index gives this order without a sort
+            cursor.execute('''
+                SELECT employee_id, id, day, punch_in, time_range_id
+                FROM attendance_days
+                ORDER BY employee_id, day, file_id, id
+            ''')
+            for employee_id, rows in itertools.groupby(cursor.fetchall(), key=lambda row: row[0]):
+                _, row_ids, days, punch_ins, time_range_ids = zip(*rows)
+                employees.append((days[0], employee_id, dict.fromkeys(time_range_ids),
+                                  list(zip(row_ids, map(attendance_date_text, days), punch_time_texts(punch_ins)))))
+            
+            names = self._lookup_values_of(cursor, 'employee_names', [employee[1] for employee in employees])
+            texts = self._lookup_values_of(cursor, 'attendance_texts', itertools.chain.from_iterable(
+                employee[2] for employee in employees))
+        
+        # get_attendance_records sorts on date, then name; an employee first shows up on their first day
+        employees.sort(key=lambda employee: (employee[0], names[employee[1]]))
+        return [{'employee': names[employee_id],
+                 'time_range': next(filter(None, map(texts.get, time_range_ids)), None),
+                 'punches': punches}
+                for _, employee_id, time_range_ids, punches in employees]
+    
+    def get_attendance_details(self, row_ids: Iterable[int]) -> Dict[int, tuple]:
+        """(status, punch_out) of attendance_days rows by row id, as get_attendance_records shows them"""
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            # The ids go in as one JSON array rather than one parameter each
+            cursor.execute('''
+                SELECT id, status_id, punch_out FROM attendance_days
+                WHERE id IN (SELECT value FROM json_each(?))
+            ''', (json.dumps(list(row_ids)),))
+            rows = cursor.fetchall()
+            statuses = self._lookup_values_of(cursor, 'attendance_statuses', [row[1] for row in rows])
+        return {row_id: (statuses.get(status_id), PUNCH_TIME_TEXT_BY_MINUTES.get(punch_out, punch_out))
+                for row_id, status_id, punch_out in rows}
+    
+    def get_employee_summary(self, employee_name: str, month: str = None) -> Optional[Dict[str, Any]]:
+        """Attendance statistics for an employee from employee_monthly_summary, over all
+        months or one 'YYYY-MM' month. Returns None when there are no attendance rows.
+        The result holds total_days, a counts dict per STATUS_BUCKETS bucket and the
+        derive_attendance_stats figures.
+        """
+        query = f'''
+            SELECT {', '.join(f'SUM(m.{column})' for column in MONTHLY_SUMMARY_COUNT_COLUMNS)}
+            FROM employee_monthly_summary m
+            JOIN employee_names e ON e.id = m.employee_id
+            WHERE e.employee_name = ?
+        '''
+        params = [employee_name]
+        if month:
+            query += ' AND m.month = ?'
+            params.append(month)
+        
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            cursor.execute(query, params)
+            total_days, *bucket_counts = cursor.fetchone()
+        
+        if not total_days:
+            return None
+        return attendance_summary(total_days, dict(zip(STATUS_BUCKETS, bucket_counts)))
     
     def get_leave_totals(self, employee_filter: str = None) -> Dict[str, Dict[str, float]]:
         """Get leave totals from database"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             conn.row_factory = sqlite3.Row
             cursor = conn.cursor()
             
@@ -329,14 +1659,22 @@ class AttendanceDatabase:
     
     def get_employees(self) -> List[str]:
         """Get list of unique employees from database"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             cursor = conn.cursor()
-            cursor.execute('SELECT DISTINCT employee_name FROM attendance_records ORDER BY employee_name')
+            cursor.execute(EMPLOYEE_NAMES_SQL)
             return [row[0] for row in cursor.fetchall()]
     
+    def get_employee_by_email_key(self, email_key: str) -> Optional[str]:
+        """Get the employee name whose login email key (see clean_employee_name) matches"""
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT employee_name FROM employees WHERE email_key = ?', (email_key,))
+            row = cursor.fetchone()
+            return row[0] if row else None
+    
     def get_upload_history(self) -> List[Dict[str, Any]]:
         """Get file upload history"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             conn.row_factory = sqlite3.Row
             cursor = conn.cursor()
             cursor.execute('''
@@ -350,7 +1688,7 @@ class AttendanceDatabase:
     
     def get_database_stats(self) -> Dict[str, Any]:
         """Get database statistics"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             cursor = conn.cursor()
             
             # Get total records
@@ -358,7 +1696,7 @@ class AttendanceDatabase:
             total_records = cursor.fetchone()[0]
             
             # Get unique employees
-            cursor.execute('SELECT COUNT(DISTINCT employee_name) FROM attendance_records')
+            cursor.execute(f'SELECT COUNT(*) FROM ({EMPLOYEE_NAMES_SQL})')
             unique_employees = cursor.fetchone()[0]
             
             # Get latest upload
@@ -376,7 +1714,7 @@ class AttendanceDatabase:
     def set_admin_setting(self, key: str, value: str) -> bool:
         """Set an admin setting"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     INSERT OR REPLACE INTO admin_settings (setting_key, setting_value, updated_timestamp)
@@ -391,7 +1729,7 @@ class AttendanceDatabase:
     def get_admin_setting(self, key: str) -> Optional[str]:
         """Get an admin setting value"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 cursor = conn.cursor()
                 cursor.execute('SELECT setting_value FROM admin_settings WHERE setting_key = ?', (key,))
                 result = cursor.fetchone()
@@ -403,7 +1741,7 @@ class AttendanceDatabase:
     def log_password_change(self, email: str, employee_name: str, current_password: str, changed_by: str = 'employee') -> bool:
         """Log password change for admin visibility"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 cursor = conn.cursor()
                 indian_time = self.get_indian_time()
                 cursor.execute('''
@@ -420,7 +1758,7 @@ class AttendanceDatabase:
     def get_password_history(self, limit: int = 100) -> List[Dict[str, Any]]:
         """Get password history for admin view"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 cursor = conn.cursor()
                 
                 # First check if table exists
@@ -456,7 +1794,7 @@ class AttendanceDatabase:
     def has_user_changed_password(self, email: str) -> bool:
         """Check if user has ever changed their password"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     SELECT has_changed_password FROM user_password_status 
@@ -471,7 +1809,7 @@ class AttendanceDatabase:
     def mark_password_as_changed(self, email: str, actual_email: str = None) -> bool:
         """Mark that user has changed their password"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     INSERT OR REPLACE INTO user_password_status 
@@ -488,7 +1826,7 @@ class AttendanceDatabase:
     def get_actual_email(self, email: str) -> Optional[str]:
         """Get the actual email address for a user from password status"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     SELECT actual_email FROM user_password_status 
@@ -503,7 +1841,7 @@ class AttendanceDatabase:
     def get_actual_email_from_otp(self, email: str) -> Optional[str]:
         """Get the actual email address from OTP verification table"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 cursor = conn.cursor()
                 # Check all OTP records (used, unused, expired, non-expired) to find stored email
                 cursor.execute('''
@@ -520,7 +1858,7 @@ class AttendanceDatabase:
     def store_employee_password(self, email: str, password_hash: str, employee_name: str, role: str = 'Employee', is_admin: bool = False) -> bool:
         """Store employee password in database for persistence"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     INSERT OR REPLACE INTO employee_passwords 
@@ -536,7 +1874,7 @@ class AttendanceDatabase:
     def get_employee_password(self, email: str) -> Optional[Dict[str, Any]]:
         """Get employee password data from database"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     SELECT email, password_hash, employee_name, role, is_admin, updated_at
@@ -561,7 +1899,7 @@ class AttendanceDatabase:
     def load_all_employee_passwords(self) -> Dict[str, Dict[str, Any]]:
         """Load all employee passwords from database into memory"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     SELECT email, password_hash, employee_name, role, is_admin
@@ -588,7 +1926,7 @@ class AttendanceDatabase:
     def store_otp(self, email: str, otp_code: str, actual_email: str, expires_minutes: int = 5) -> bool:
         """Store OTP code for verification"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 cursor = conn.cursor()
                 # Calculate expiration time in Indian timezone
                 ist = pytz.timezone('Asia/Kolkata')
@@ -609,13 +1947,10 @@ class AttendanceDatabase:
     def verify_otp(self, email: str, otp_code: str) -> bool:
         """Verify OTP code"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 cursor = conn.cursor()
                 indian_time = self.get_indian_time()
-                cursor.execute('''
-                    SELECT id, actual_email FROM otp_verification 
-                    WHERE email = ? AND otp_code = ? AND is_used = 0 AND expires_at > ?
-                ''', (email, otp_code, indian_time))
+                cursor.execute(OTP_LOOKUP_SQL, (email, otp_code, indian_time))
                 result = cursor.fetchone()
                 
                 if result:
@@ -633,7 +1968,7 @@ class AttendanceDatabase:
     def cleanup_expired_otps(self) -> bool:
         """Clean up expired OTPs"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 cursor = conn.cursor()
                 indian_time = self.get_indian_time()
                 cursor.execute('''
@@ -649,7 +1984,7 @@ class AttendanceDatabase:
     def log_login(self, email: str, user_name: str, is_admin: bool, ip_address: str = None, user_agent: str = None) -> bool:
         """Log a user login"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 cursor = conn.cursor()
                 indian_time = self.get_indian_time()
                 cursor.execute('''
@@ -666,7 +2001,7 @@ class AttendanceDatabase:
     def get_login_logs(self, limit: int = 100) -> List[Dict[str, Any]]:
         """Get login logs"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 cursor = conn.cursor()
                 
                 # Check if table exists
@@ -676,12 +2011,7 @@ class AttendanceDatabase:
                 if not table_exists:
                     return []
                 
-                cursor.execute('''
-                    SELECT email, user_name, is_admin, login_time, ip_address, user_agent
-                    FROM login_logs 
-                    ORDER BY login_time DESC 
-                    LIMIT ?
-                ''', (limit,))
+                cursor.execute(LOGIN_LOGS_SQL, (limit,))
                 
                 results = cursor.fetchall()
                 
@@ -700,16 +2030,77 @@ class AttendanceDatabase:
             print(f"Error getting login logs: {e}")
             return []
     
+    def create_upload_job(self, job_id: str, total_files: int, created_by: str = None) -> bool:
+        """Register a queued background upload job"""
+        try:
+            with self._connect() as conn:
+                cursor = conn.cursor()
+                indian_time = self.get_indian_time()
+                cursor.execute('''
+                    INSERT INTO upload_jobs 
+                    (job_id, status, total_files, created_by, created_at, updated_at)
+                    VALUES (?, 'queued', ?, ?, ?, ?)
+                ''', (job_id, total_files, created_by, indian_time, indian_time))
+                conn.commit()
+                return True
+        except Exception as e:
+            print(f"Error creating upload job: {e}")
+            return False
+    
+    def update_upload_job(self, job_id: str, **fields) -> bool:
+        """Update progress fields of a background upload job"""
+        allowed = {'status', 'files_done', 'current_file', 'sheets_done', 'current_sheet', 'message', 'result'}
+        fields = {key: value for key, value in fields.items() if key in allowed}
+        if not fields:
+            return False
+        try:
+            with self._connect() as conn:
+                cursor = conn.cursor()
+                assignments = ', '.join(f'{key} = ?' for key in fields)
+                cursor.execute(f'''
+                    UPDATE upload_jobs SET {assignments}, updated_at = ?
+                    WHERE job_id = ?
+                ''', (*fields.values(), self.get_indian_time(), job_id))
+                conn.commit()
+                return cursor.rowcount > 0
+        except Exception as e:
+            print(f"Error updating upload job: {e}")
+            return False
+    
+    def get_upload_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get a background upload job's status and progress"""
+        try:
+            with self._connect() as conn:
+                conn.row_factory = sqlite3.Row
+                cursor = conn.cursor()
+                cursor.execute('''
+                    SELECT job_id, status, total_files, files_done, current_file,
+                           sheets_done, current_sheet, message, result, created_at, updated_at
+                    FROM upload_jobs
+                    WHERE job_id = ?
+                ''', (job_id,))
+                row = cursor.fetchone()
+                return dict(row) if row else None
+        except Exception as e:
+            print(f"Error getting upload job: {e}")
+            return None
+    
     def clear_attendance_records(self) -> bool:
         """Clear only attendance records - keeps all other data"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 cursor = conn.cursor()
                 
                 # Clear only attendance records
-                cursor.execute('DELETE FROM attendance_records')
+                cursor.execute('DELETE FROM attendance_days')
+                cursor.execute('DELETE FROM employees')
+                cursor.execute('DELETE FROM employee_monthly_summary')
                 print("Cleared attendance_records table")
                 
+                # Forget content hashes so the next upload is not skipped as unchanged
+                cursor.execute('DELETE FROM sheet_hashes')
+                cursor.execute('UPDATE file_uploads SET content_hash = NULL')
+                
                 conn.commit()
                 print("Attendance records cleared successfully")
                 return True
@@ -721,7 +2112,7 @@ class AttendanceDatabase:
     def clear_password_history(self) -> bool:
         """Clear all password history - ADMIN ONLY"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 cursor = conn.cursor()
                 
                 # Clear password history
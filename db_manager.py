@@ -51,6 +51,20 @@ def clear_file_data(filename):
     else:
         print("❌ Operation cancelled")
 
+def check_query_plans():
+    """Show the query plans of the hot queries and flag full table scans"""
+    print("🔎 Query Plans:")
+    for name, plan in db.query_plans().items():
+        print(f"  {name}: {' | '.join(plan)}")
+    scans = db.find_full_scans()
+    if scans:
+        print(f"⚠️  {len(scans)} full table scan(s):")
+        for scan in scans:
+            print(f"  {scan}")
+    else:
+        print("✅ No full table scans")
+    return scans
+
 def help():
     """Show available commands"""
     print("=" * 60)
@@ -62,6 +76,7 @@ def help():
     print("  show_upload_history() - Show file upload history")
     print("  clear_database() - Clear all data (with confirmation)")
     print("  clear_file_data('filename.xlsx') - Clear specific file data")
+    print("  check_query_plans() - Check hot queries use indexes")
     print("  help() - Show this help")
     print("=" * 60)
     print("Example usage:")
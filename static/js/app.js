@@ -1789,7 +1789,16 @@ async function uploadFile() {
             throw new Error(`Server error: ${response.status} ${response.statusText}`);
         }
 
-        const result = await response.json();
+        const queued = await response.json();
+        console.log('Upload queued:', queued);
+
+        if (!queued.success) {
+            showNotification(queued.message, 'error');
+            return;
+        }
+
+        // Uploads run as background jobs - poll until the job finishes
+        const result = await waitForUploadJob(queued.job_id);
         console.log('Upload result:', result);
 
         if (result.success) {
@@ -1820,6 +1829,36 @@ async function uploadFile() {
     }
 }
 
+async function waitForUploadJob(jobId, intervalMs = 1000) {
+    while (true) {
+        await new Promise(resolve => setTimeout(resolve, intervalMs));
+
+        const response = await fetch(`/api/upload-status/${jobId}`);
+        if (!response.ok) {
+            throw new Error(`Server error: ${response.status} ${response.statusText}`);
+        }
+
+        const status = await response.json();
+        if (!status.success) {
+            return status;
+        }
+
+        const job = status.job;
+        if (job.status === 'completed') {
+            return job.result;
+        }
+        if (job.status === 'failed') {
+            return { success: false, message: job.message };
+        }
+
+        let progressText = `Processing file ${Math.min(job.files_done + 1, job.total_files)} of ${job.total_files}`;
+        if (job.current_sheet) {
+            progressText += ` - ${job.sheets_done} sheets done (${job.current_sheet})`;
+        }
+        showLoading(job.status === 'queued' ? 'Waiting for upload queue...' : progressText);
+    }
+}
+
 // **FIXED: Employee Search Functions**
 function searchEmployees() {
     const searchTerm = document.getElementById('employee-search').value.trim();
@@ -2138,69 +2177,88 @@ async function getAdminDate() {
 }
 
 // Data loading functions
+// Rows requested per /api/attendance page; further pages follow next_cursor
+const ATTENDANCE_PAGE_SIZE = 2000;
+// Record fields the attendance tables, stats and export use (no upload_timestamp/file_name)
+const ATTENDANCE_TABLE_FIELDS = [
+    'Employee', 'Date', 'Punch-In', 'Punch-Out', 'Status',
+    'pin_comment', 'pout_comment', 'status_comment',
+    'pin_highlight', 'pout_highlight', 'status_highlight', 'time_range'
+].join(',');
+
+async function fetchAttendancePages(params) {
+    let records = [];
+    let cursor = null;
+    do {
+        const url = new URL('/api/attendance', window.location.origin);
+        Object.entries(params).forEach(([key, value]) => {
+            if (value) url.searchParams.append(key, value);
+        });
+        url.searchParams.append('limit', ATTENDANCE_PAGE_SIZE);
+        if (cursor) url.searchParams.append('cursor', cursor);
+        
+        const response = await fetch(url);
+        const result = await response.json();
+        if (!result.success) return result;
+        
+        records = records.concat(result.data);
+        cursor = result.next_cursor;
+    } while (cursor);
+    return { success: true, data: records };
+}
+
 async function loadAttendanceData() {
     try {
         const statusFilter = currentUser.is_admin ? 
             document.getElementById('status-filter')?.value || 'All' : 
             document.getElementById('employee-status-filter')?.value || 'All';
         
+        let selectedDateStr = '';
+        if (currentUser.is_admin) {
+            // For admin, use the date picker value
+            const dp = document.getElementById('date-picker');
+            selectedDateStr = dp ? dp.value : '';
+            // If no date selected, try to load from server
+            if (!selectedDateStr) {
+                selectedDateStr = await getAdminDate() || '';
+                // Update the date picker if we found a stored date
+                if (selectedDateStr && dp) {
+                    dp.value = selectedDateStr;
+                }
+            } else {
+                // Save admin's selection to server
+                await saveAdminDate(selectedDateStr);
+            }
+        } else {
+            // For employee, get admin's selection from server
+            selectedDateStr = await getAdminDate() || '';
+        }
+        
         // **FIXED: Don't apply employee filter from dropdown when loading data**
         // This was causing the issue - the dropdown filter was restricting data
-        const url = new URL('/api/attendance', window.location.origin);
-        if (statusFilter !== 'All') url.searchParams.append('status', statusFilter);
-        
-        const response = await fetch(url);
-        const result = await response.json();
+        // The selected month (1st up to the selected day) is filtered on the server
+        const result = await fetchAttendancePages({
+            status: statusFilter !== 'All' ? statusFilter : '',
+            from: selectedDateStr ? selectedDateStr.slice(0, 8) + '01' : '',
+            to: selectedDateStr,
+            fields: ATTENDANCE_TABLE_FIELDS
+        });
         
         if (result.success) {
-            // Base dataset from server
-            let data = result.data;
-            // Apply client-side date filter (month/year) if a date is selected
-            let selectedDateStr = '';
-            if (currentUser.is_admin) {
-                // For admin, use the date picker value
-                const dp = document.getElementById('date-picker');
-                selectedDateStr = dp ? dp.value : '';
-                // If no date selected, try to load from server
-                if (!selectedDateStr) {
-                    selectedDateStr = await getAdminDate() || '';
-                    // Update the date picker if we found a stored date
-                    if (selectedDateStr && dp) {
-                        dp.value = selectedDateStr;
-                    }
-                } else {
-                    // Save admin's selection to server
-                    await saveAdminDate(selectedDateStr);
-                }
-            } else {
-                // For employee, get admin's selection from server
-                selectedDateStr = await getAdminDate() || '';
-            }
-            
             globalShowUpdateNote = false;
             if (selectedDateStr) {
                 const selected = new Date(selectedDateStr);
-                const selYear = selected.getFullYear();
-                const selMonth = selected.getMonth();
-                const selDay = selected.getDate();
                 
                 // Check if selected date is before current date
                 const today = new Date();
                 const currentDate = new Date(today.getFullYear(), today.getMonth(), today.getDate());
-                const selectedDate = new Date(selYear, selMonth, selDay);
+                const selectedDate = new Date(selected.getFullYear(), selected.getMonth(), selected.getDate());
                 
                 if (selectedDate < currentDate) {
                     globalShowUpdateNote = true;
                 }
-                
-                data = data.filter(r => {
-                    const d = new Date(r.Date);
-                    const sameMonth = d.getFullYear() === selYear && d.getMonth() === selMonth;
-                    const dayMatch = d.getDate() <= selDay;
-                    return sameMonth && dayMatch;
-                });
             }
-            attendanceData = data;
+            attendanceData = result.data;
             
             if (currentUser.is_admin) {
                 displayAdminAttendanceData(globalShowUpdateNote);
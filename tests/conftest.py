@@ -0,0 +1,89 @@
+"""
+Shared fixtures for the attendance tests
+Every test gets its own AttendanceDatabase in a temporary directory
+"""
+
+import datetime
+import os
+import sys
+import tempfile
+
+import pytest
+from openpyxl import Workbook
+from openpyxl.comments import Comment
+from openpyxl.styles import Font
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# database.py and app.py open attendance.db (and app.py its upload folder) in the
+# working directory when imported, so the suite runs from a scratch directory
+os.chdir(tempfile.mkdtemp(prefix='attendance-tests-'))
+
+from database import AttendanceDatabase
+
+
+def make_record(employee, date, status='P', punch_in='09:05', punch_out='18:40', **fields):
+    """One attendance record as the Excel ingestion produces it"""
+    record = {
+        'Employee': employee,
+        'Date': date,
+        'Punch-In': punch_in,
+        'Punch-Out': punch_out,
+        'Status': status,
+        'pin_comment': '',
+        'pout_comment': '',
+        'status_comment': '',
+        'pin_highlight': False,
+        'pout_highlight': False,
+        'status_highlight': False,
+        'time_range': '09:00 AM to 06:00 PM'
+    }
+    record.update(fields)
+    return record
+
+
+def make_month(employees, year=2025, month=1, days=None, **fields):
+    """Daily records for each employee over the first days of a month (the whole month by default)"""
+    start = datetime.date(year, month, 1)
+    days = days or ((start.replace(month=month % 12 + 1, year=year + month // 12) - start).days)
+    return [make_record(employee, (start + datetime.timedelta(days=day)).isoformat(), **fields)
+            for employee in employees for day in range(days)]
+
+
+def month_block(marker, first_row=4, days=5, status='P', punch_in='09:05', punch_out='18:40'):
+    """Cells {(row, col): value} of one month block as the ingestion reads it: the marker
+    (e.g. 'JAN' or 'NOV-24') and punch-ins on first_row, punch-outs and statuses on the two
+    rows below, day d in column d + 3"""
+    cells = {(first_row, 1): marker}
+    for day in range(1, days + 1):
+        cells[(first_row, day + 3)] = punch_in
+        cells[(first_row + 1, day + 3)] = punch_out
+        cells[(first_row + 2, day + 3)] = status
+    return cells
+
+
+def write_workbook(path, sheets, comments=None, red_cells=None, time_range='09:00 AM to 06:00 PM'):
+    """Save an attendance workbook with one sheet per {title: cells} entry (cells as from
+    month_block). comments maps a title to {(row, col): text}; red_cells to the (row, col)
+    positions written in red."""
+    workbook = Workbook()
+    workbook.remove(workbook.active)
+    for title, cells in sheets.items():
+        sheet = workbook.create_sheet(title)
+        sheet.cell(2, 1, time_range)
+        for (row, col), value in cells.items():
+            sheet.cell(row, col, value)
+        for (row, col), text in (comments or {}).get(title, {}).items():
+            sheet.cell(row, col).comment = Comment(text, 'HR')
+        for row, col in (red_cells or {}).get(title, ()):
+            sheet.cell(row, col).font = Font(color='FFFF0000')
+    workbook.save(path)
+    return path
+
+
+@pytest.fixture
+def database(tmp_path):
+    database = AttendanceDatabase(str(tmp_path / 'attendance.db'))
+    yield database
+    database.close()
@@ -0,0 +1,121 @@
+"""
+Tests for /api/attendance date ranges, field projection and cursor paging
+"""
+
+import pytest
+
+import app
+from tests.conftest import make_month
+
+
+@pytest.fixture
+def client(database, monkeypatch):
+    """A test client signed in as an admin, reading from a January and February history"""
+    database.save_attendance_records(make_month(['Alice', 'Bob'], month=1) + make_month(['Alice', 'Bob'], month=2),
+                                     'history.xlsx')
+    monkeypatch.setattr(app, 'db', database)
+    client = app.app.test_client()
+    with client.session_transaction() as session:
+        session['user_data'] = {'name': 'Admin', 'is_admin': True}
+    return client
+
+
+def all_pages(client, **params):
+    """Follow next_cursor until the last page; returns the pages"""
+    pages = []
+    cursor = None
+    while True:
+        query = dict(params, cursor=cursor) if cursor else params
+        response = client.get('/api/attendance', query_string=query)
+        assert response.status_code == 200
+        pages.append(response.json['data'])
+        cursor = response.json['next_cursor']
+        if cursor is None:
+            return pages
+
+
+def keys(records):
+    return [(record['Employee'], record['Date']) for record in records]
+
+
+def test_without_limit_returns_everything(client):
+    response = client.get('/api/attendance')
+
+    assert response.json['success']
+    assert len(response.json['data']) == 118
+    assert response.json['next_cursor'] is None
+
+
+def test_pages_cover_every_record_once(client):
+    pages = all_pages(client, limit=25)
+
+    assert [len(page) for page in pages] == [25, 25, 25, 25, 18]
+    records = [record for page in pages for record in page]
+    assert keys(records) == keys(client.get('/api/attendance').json['data'])
+    assert len(set(keys(records))) == 118
+
+
+def test_pages_within_a_date_range(client):
+    pages = all_pages(client, limit=7, **{'from': '2025-01-30', 'to': '2025-02-02'})
+
+    records = [record for page in pages for record in page]
+    assert [len(page) for page in pages] == [7, 1]
+    assert sorted({record['Date'] for record in records}) == ['2025-01-30', '2025-01-31', '2025-02-01', '2025-02-02']
+    assert len(set(keys(records))) == 8
+
+
+def test_open_ended_date_ranges(client):
+    assert len(all_pages(client, **{'from': '2025-02-01'})[0]) == 56
+    assert len(all_pages(client, to='2025-01-15')[0]) == 30
+
+
+def test_pages_for_one_employee(client):
+    pages = all_pages(client, limit=50, employee='Alice')
+
+    records = [record for page in pages for record in page]
+    assert [len(page) for page in pages] == [50, 9]
+    assert {record['Employee'] for record in records} == {'Alice'}
+    assert len({record['Date'] for record in records}) == 59
+
+
+def test_pages_with_selected_fields(client):
+    pages = all_pages(client, limit=50, employee='Alice', fields='Date,Status')
+
+    records = [record for page in pages for record in page]
+    assert [len(page) for page in pages] == [50, 9]
+    assert all(set(record) == {'Date', 'Status'} for record in records)
+    assert len({record['Date'] for record in records}) == 59
+
+
+def test_employees_only_see_their_own_records(client):
+    with client.session_transaction() as session:
+        session['user_data'] = {'name': 'Alice', 'is_admin': False}
+
+    records = client.get('/api/attendance', query_string={'employee': 'Alice'}).json['data']
+    own_records = client.get('/api/attendance').json['data']
+
+    assert {record['Employee'] for record in own_records} == {'Alice'}
+    assert keys(own_records) == keys(records)
+
+
+@pytest.mark.parametrize('params', [
+    {'from': '2025-13-01'},
+    {'to': '01/02/2025'},
+    {'limit': 'ten'},
+    {'limit': '0'},
+    {'cursor': 'not-a-cursor'},
+    {'fields': 'Date,Salary'},
+])
+def test_invalid_parameters_are_rejected(client, params):
+    response = client.get('/api/attendance', query_string=params)
+
+    assert response.status_code == 400
+    assert response.json['success'] is False
+
+
+def test_requires_a_session(database, monkeypatch):
+    monkeypatch.setattr(app, 'db', database)
+
+    response = app.app.test_client().get('/api/attendance')
+
+    assert response.json == {'success': False, 'message': 'Not authenticated'}
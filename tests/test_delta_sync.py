@@ -0,0 +1,123 @@
+"""
+Tests for delta uploads through AttendanceDatabase.sync_attendance_records
+"""
+
+import pytest
+
+from database import AttendanceDatabase
+from tests.conftest import make_month, make_record
+
+UPLOAD = {'content_hash': 'file-hash', 'selected_date': '2025-01', 'sheet_hashes': {'Alice': 'a1', 'Bob': 'b1'}}
+
+
+def stored_records(database, employee=None):
+    """(employee, date) -> record for everything stored in january.xlsx"""
+    return {(record['Employee'], record['Date']): record
+            for record in database.get_attendance_records(employee_filter=employee)
+            if record['file_name'] == 'january.xlsx'}
+
+
+def test_first_sync_inserts_every_row(database):
+    changes = database.sync_attendance_records(make_month(['Alice', 'Bob'], days=10), 'january.xlsx')
+
+    assert changes == {'inserted': 20, 'updated': 0, 'deleted': 0, 'unchanged': 0, 'stored': 20}
+    assert len(stored_records(database)) == 20
+
+
+def test_identical_sync_changes_nothing(database):
+    records = make_month(['Alice', 'Bob'], days=10)
+    database.sync_attendance_records(records, 'january.xlsx')
+
+    changes = database.sync_attendance_records(records, 'january.xlsx')
+
+    assert changes == {'inserted': 0, 'updated': 0, 'deleted': 0, 'unchanged': 20, 'stored': 20}
+
+
+def test_sync_inserts_updates_and_deletes(database):
+    records = make_month(['Alice', 'Bob'], days=10)
+    database.sync_attendance_records(records, 'january.xlsx')
+    # Read once first, so the new status and comment are looked up after earlier reads
+    assert stored_records(database)[('Alice', '2025-01-01')]['Status'] == 'P'
+
+    records = [record for record in records if record['Date'] != '2025-01-10']
+    records[0] = dict(records[0], Status='A', status_comment='Sick')
+    records[1] = dict(records[1], **{'Punch-In': '10:15'})
+    records.append(make_record('Carol', '2025-01-01'))
+    changes = database.sync_attendance_records(records, 'january.xlsx')
+
+    assert changes == {'inserted': 1, 'updated': 2, 'deleted': 2, 'unchanged': 16, 'stored': 19}
+    stored = stored_records(database)
+    assert ('Alice', '2025-01-10') not in stored
+    assert stored[('Alice', '2025-01-01')]['Status'] == 'A'
+    assert stored[('Alice', '2025-01-01')]['status_comment'] == 'Sick'
+    assert stored[('Alice', '2025-01-02')]['Punch-In'] == '10:15'
+    assert ('Carol', '2025-01-01') in stored
+    assert 'Carol' in database.get_employees()
+
+
+def test_sync_leaves_other_files_alone(database):
+    database.sync_attendance_records(make_month(['Alice', 'Bob'], days=10), 'january.xlsx')
+    database.save_attendance_records(make_month(['Alice'], days=5), 'other.xlsx')
+
+    changes = database.sync_attendance_records(make_month(['Alice', 'Bob'], days=8), 'january.xlsx')
+
+    assert changes == {'inserted': 0, 'updated': 0, 'deleted': 4, 'unchanged': 16, 'stored': 16}
+    assert len([record for record in database.get_attendance_records()
+                if record['file_name'] == 'other.xlsx']) == 5
+
+
+def test_stored_count_includes_kept_employees(database):
+    database.sync_attendance_records(make_month(['Alice', 'Bob'], days=10), 'january.xlsx')
+
+    # Only Alice's sheet changed, so Bob's rows are not part of the records
+    changes = database.sync_attendance_records(make_month(['Alice'], days=8), 'january.xlsx',
+                                               keep_employees={'Bob'})
+
+    assert changes == {'inserted': 0, 'updated': 0, 'deleted': 2, 'unchanged': 8, 'stored': 18}
+    assert len(stored_records(database, 'Bob')) == 10
+    assert [upload['record_count'] for upload in database.get_upload_history()] == [18]
+
+
+def test_sync_matches_a_full_replace(database, tmp_path):
+    old = make_month(['Alice', 'Bob'], days=10)
+    new = [dict(record, Status='A') if record['Date'] == '2025-01-03' else record for record in old[2:]]
+    new.append(make_record('Carol', '2025-01-04', status='PL'))
+    database.sync_attendance_records(old, 'january.xlsx')
+    database.sync_attendance_records(new, 'january.xlsx')
+    replaced = AttendanceDatabase(str(tmp_path / 'replaced.db'))
+    replaced.save_attendance_records(new, 'january.xlsx')
+
+    def without_timestamps(records):
+        return sorted(tuple(sorted((key, value) for key, value in record.items() if key != 'upload_timestamp'))
+                      for record in records)
+
+    assert without_timestamps(database.get_attendance_records()) == without_timestamps(
+        replaced.get_attendance_records())
+
+
+def test_sync_stores_leave_totals_and_hashes_with_the_rows(database):
+    database.sync_attendance_records(make_month(['Alice', 'Bob'], days=10), 'january.xlsx',
+                                     leave_totals={'Alice': {'PL': 2}, 'Bob': {'SL': 1}}, upload=UPLOAD)
+
+    assert database.get_sheet_hashes('january.xlsx', '2025-01') == UPLOAD['sheet_hashes']
+    assert database.get_leave_totals('Alice')['Alice']['PL'] == 2
+    assert [upload['record_count'] for upload in database.get_upload_history()] == [20]
+
+
+def test_failed_sync_writes_nothing(database, monkeypatch):
+    records = make_month(['Alice', 'Bob'], days=10)
+    database.sync_attendance_records(records, 'january.xlsx')
+
+    def fail_refresh(self, cursor, employee_ids=None):
+        raise RuntimeError('interrupted')
+
+    monkeypatch.setattr(AttendanceDatabase, '_refresh_monthly_summary', fail_refresh)
+    with pytest.raises(RuntimeError):
+        database.sync_attendance_records([dict(record, Status='A') for record in records[:5]], 'january.xlsx',
+                                         leave_totals={'Alice': {'PL': 2}}, upload=UPLOAD)
+
+    stored = stored_records(database)
+    assert len(stored) == 20
+    assert {record['Status'] for record in stored.values()} == {'P'}
+    assert database.get_sheet_hashes('january.xlsx', '2025-01') == {}
+    assert database.get_leave_totals() == {}
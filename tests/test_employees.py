@@ -0,0 +1,73 @@
+"""
+Tests for the employees table behind login lookups: one row per login email key,
+kept in step with the stored attendance by every write
+"""
+
+import sqlite3
+
+from database import AttendanceDatabase, clean_employee_name
+from tests.conftest import make_month
+
+
+def login_names(database):
+    with sqlite3.connect(database.db_path) as conn:
+        names = dict(conn.execute('SELECT email_key, employee_name FROM employees'))
+    conn.close()
+    return names
+
+
+def test_existing_databases_are_backfilled(tmp_path):
+    path = str(tmp_path / 'attendance.db')
+    database = AttendanceDatabase(path)
+    database.save_attendance_records(make_month(['Alice Smith', 'Bob (T)'], days=3), 'january.xlsx')
+    database.close()
+    # A database from before the employees table
+    with sqlite3.connect(path) as conn:
+        conn.execute('DROP TABLE employees')
+    conn.close()
+
+    database = AttendanceDatabase(path)
+
+    assert login_names(database) == {'alicesmith': 'Alice Smith', 'bob': 'Bob (T)'}
+    assert database.get_employee_by_email_key('alicesmith') == 'Alice Smith'
+    assert database.get_employee_by_email_key('carol') is None
+    database.close()
+
+
+def test_employees_follow_syncs_commits_deletes_and_clears(database):
+    database.save_attendance_records(make_month(['Alice', 'Bob'], days=3), 'january.xlsx')
+    database.save_attendance_records(make_month(['Carol'], days=3), 'other.xlsx')
+    assert login_names(database) == {'alice': 'Alice', 'bob': 'Bob', 'carol': 'Carol'}
+
+    # Bob is no longer in january.xlsx and Dave is new
+    database.sync_attendance_records(make_month(['Alice', 'Dave'], days=3), 'january.xlsx')
+    assert login_names(database) == {'alice': 'Alice', 'carol': 'Carol', 'dave': 'Dave'}
+    assert database.get_employee_by_email_key('bob') is None
+
+    database.stage_attendance_records('job-1', make_month(['Erin'], days=3), 'february.xlsx')
+    assert 'erin' not in login_names(database)
+    database.commit_staged_upload('job-1', [{'file_name': 'february.xlsx', 'content_hash': 'hash',
+                                             'selected_date': '2025-01', 'sheet_hashes': {}}])
+    assert login_names(database) == {'alice': 'Alice', 'carol': 'Carol', 'dave': 'Dave', 'erin': 'Erin'}
+
+    database.clear_existing_data('other.xlsx')
+    assert login_names(database) == {'alice': 'Alice', 'dave': 'Dave', 'erin': 'Erin'}
+
+    database.clear_attendance_records()
+    assert login_names(database) == {}
+    assert database.get_employee_by_email_key('alice') is None
+
+
+def test_first_name_in_sort_order_wins_a_shared_key(database):
+    names = ['Sachin Mandal (T)', 'sachin mandal', 'Sachin Mandal', 'Sachin-Mandal']
+    database.save_attendance_records(make_month(names[:2], days=3), 'january.xlsx')
+    database.save_attendance_records(make_month(names[2:], days=3), 'other.xlsx')
+
+    # Logins used to take the first match while scanning get_employees()
+    first_match = next(name for name in database.get_employees() if clean_employee_name(name) == 'sachinmandal')
+    assert first_match == 'Sachin Mandal'
+    assert database.get_employee_by_email_key('sachinmandal') == first_match
+
+    # Once the winner's rows are gone the next name in order takes the key
+    database.clear_existing_data('other.xlsx')
+    assert database.get_employee_by_email_key('sachinmandal') == 'Sachin Mandal (T)'
@@ -0,0 +1,82 @@
+"""
+Tests for reading attendance workbooks through utils/excel_ingest.py
+"""
+
+import datetime
+import re
+import zipfile
+
+from utils.excel_ingest import load_attendance_workbook, extract_sheet_records
+from tests.conftest import month_block, write_workbook
+
+
+def cache_formula_values(path, values):
+    """Rewrite the workbook at path as if Excel had calculated it: values maps a formula
+    (without the '=') to the text Excel would have saved as its result"""
+    with zipfile.ZipFile(path) as archive:
+        parts = {name: archive.read(name) for name in archive.namelist()}
+    for name, data in parts.items():
+        if name.startswith('xl/worksheets/sheet'):
+            text = data.decode()
+            for formula, value in values.items():
+                text = re.sub(rf'(<c r="[A-Z]+[0-9]+")(><f>{re.escape(formula)}</f>)<v ?/>',
+                              rf'\1 t="str"\2<v>{value}</v>', text)
+            parts[name] = text.encode()
+    with zipfile.ZipFile(path, 'w') as archive:
+        for name, data in parts.items():
+            archive.writestr(name, data)
+    return path
+
+
+def test_formula_cells_read_as_their_calculated_values(tmp_path):
+    cells = {**month_block('JAN', days=3), (2, 1): '=Z2', (4, 4): '=Z4', (4, 5): '=Z5'}
+    path = write_workbook(tmp_path / 'formulas.xlsx', {'Alice': cells},
+                          comments={'Alice': {(4, 6): 'Forgot card'}}, red_cells={'Alice': [(6, 6)]})
+    # Z5's formula was never calculated, so it has no value to read
+    cache_formula_values(path, {'Z2': '10:00 AM to 07:00 PM', 'Z4': '09:40'})
+
+    [sheet] = load_attendance_workbook(str(path))
+    records = extract_sheet_records(sheet, datetime.date(2025, 1, 3))
+
+    assert sheet.time_range == '10:00 AM to 07:00 PM'
+    assert [(record['Punch-In'], record['Punch-Out']) for record in records] == [
+        ('09:40', '18:40'), ('⚠️ MISSING', '18:40'), ('09:05', '18:40')]
+    assert {record['time_range'] for record in records} == {'10:00 AM to 07:00 PM'}
+    # Comments and fonts are read alongside the values
+    assert [(record['pin_comment'], record['status_highlight']) for record in records] == [
+        ('', False), ('', False), ('Forgot card', True)]
+
+
+def range_statuses(tmp_path, blocks, start_date, end_date):
+    """{date: status} of the records read from one sheet holding the given month blocks"""
+    cells = {}
+    for first_row, (marker, status) in zip(range(4, 4 * len(blocks) + 4, 4), blocks):
+        cells.update(month_block(marker, first_row=first_row, status=status))
+    path = write_workbook(tmp_path / 'history.xlsx', {'Alice': cells})
+    
+    [sheet] = load_attendance_workbook(str(path))
+    records = extract_sheet_records(sheet, end_date, start_date=start_date)
+    return {record['Date']: record['Status'] for record in records}
+
+
+def test_month_names_across_a_year_end(tmp_path):
+    statuses = range_statuses(tmp_path, [('JAN', 'P'), ('NOV', 'A'), ('DEC', 'HF')],
+                              datetime.date(2024, 11, 1), datetime.date(2025, 1, 3))
+    
+    assert statuses == {
+        **{f'2024-11-0{day}': 'A' for day in range(1, 6)},
+        **{f'2024-12-0{day}': 'HF' for day in range(1, 6)},
+        **{f'2025-01-0{day}': 'P' for day in range(1, 4)},
+    }
+
+
+def test_month_years_and_date_headers_match_strictly(tmp_path):
+    statuses = range_statuses(tmp_path, [('NOV-23', 'A'), ('NOV-24', 'P'),
+                                         (datetime.datetime(2023, 12, 1), 'A'),
+                                         (datetime.datetime(2024, 12, 1), 'HF')],
+                              datetime.date(2024, 11, 1), datetime.date(2024, 12, 31))
+    
+    assert statuses == {
+        **{f'2024-11-0{day}': 'P' for day in range(1, 6)},
+        **{f'2024-12-0{day}': 'HF' for day in range(1, 6)},
+    }
@@ -0,0 +1,66 @@
+"""
+Tests for the admin late statistics: calculate_all_late_statistics reads the stored
+punch-ins once and must return what calculate_late_statistics gives per employee
+"""
+
+import app
+from tests.conftest import make_record
+
+
+def late_statistics_records():
+    """Days covering late, on-time, missing and unreadable punch-ins under several shifts"""
+    return [
+        # 24h and 12h punch-ins against a 09:00 AM shift, late from 09:03
+        make_record('Alice', '2025-01-01', punch_in='09:01'),
+        make_record('Alice', '2025-01-02', punch_in='09:03'),
+        make_record('Alice', '2025-01-03', punch_in='09:45 AM', status='P', punch_out='07:10 PM'),
+        make_record('Alice', '2025-01-04', punch_in='9:30'),
+        make_record('Alice', '2025-01-05', punch_in='', status='A'),
+        make_record('Alice', '2025-01-06', punch_in=None, punch_out=None, status='WO'),
+        make_record('Alice', '2025-01-07', punch_in='MISS'),
+        make_record('Alice', '2025-01-08', punch_in='13:15', status='HD'),
+        # A later shift in 12h text, and a shift that can't be read (so 09:00 AM applies)
+        make_record('Bob', '2025-01-01', punch_in='10:20', time_range='10:00 AM to 07:00 PM'),
+        make_record('Bob', '2025-01-02', punch_in='09:50', time_range='10:00 AM to 07:00 PM'),
+        make_record('Carol', '2025-01-01', punch_in='09:10', time_range='flexible'),
+        make_record('Carol', '2025-01-02', punch_in='08:59', time_range='flexible'),
+        # No shift at all on the first day; the first one set is used
+        make_record('Dave', '2025-01-02', punch_in='09:20', time_range=''),
+        make_record('Dave', '2025-01-03', punch_in='09:20', time_range='09:15 AM to 06:00 PM'),
+        # Never late, but still listed
+        make_record('Erin', '2024-12-31', punch_in='08:45'),
+    ]
+
+
+def test_all_late_statistics_match_the_per_employee_results(database, monkeypatch):
+    monkeypatch.setattr(app, 'db', database)
+    database.save_attendance_records(late_statistics_records(), 'january.xlsx')
+    # The same day again from a second file counts again, in file order
+    database.save_attendance_records([make_record('Alice', '2025-01-04', punch_in='09:40')], 'january-fix.xlsx')
+
+    all_stats = app.calculate_all_late_statistics()
+
+    assert [stats['employee_name'] for stats in all_stats] == ['Erin', 'Alice', 'Bob', 'Carol', 'Dave']
+    for stats in all_stats:
+        expected = app.calculate_late_statistics(stats['employee_name'])
+        expected['employee_name'] = stats['employee_name']
+        assert stats == expected, stats['employee_name']
+
+    late = {stats['employee_name']: [(record['date'], record['punch_in'], record['late_minutes'])
+                                     for record in stats['late_records']] for stats in all_stats}
+    assert late == {
+        'Alice': [('2025-01-02', '09:03', 1), ('2025-01-03', '09:45 AM', 43), ('2025-01-04', '9:30', 28),
+                  ('2025-01-04', '09:40', 38), ('2025-01-08', '13:15', 253)],
+        'Bob': [('2025-01-01', '10:20', 18)],
+        'Carol': [('2025-01-01', '09:10', 8)],
+        'Dave': [('2025-01-02', '09:20', 3), ('2025-01-03', '09:20', 3)],
+        'Erin': [],
+    }
+    [alice_late] = [record for record in all_stats[1]['late_records'] if record['date'] == '2025-01-03']
+    assert (alice_late['status'], alice_late['punch_out']) == ('P', '07:10 PM')
+
+
+def test_all_late_statistics_without_records(database, monkeypatch):
+    monkeypatch.setattr(app, 'db', database)
+
+    assert app.calculate_all_late_statistics() == []
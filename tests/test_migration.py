@@ -0,0 +1,270 @@
+"""
+Tests for moving a pre-compact attendance_records table into attendance_days, and for
+converting the text punch and upload times of the first compact layout
+"""
+
+import sqlite3
+
+import pytest
+
+from database import (AttendanceDatabase, ATTENDANCE_DAYS_SCHEMA, ATTENDANCE_INSERT_SQL, UPLOAD_TIME_SQL,
+                      attendance_record_row, normalize_attendance_date, punch_text_sql)
+from tests.conftest import make_month, make_record
+
+LEGACY_SCHEMA = '''
+    CREATE TABLE attendance_records (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        employee_name TEXT NOT NULL,
+        date TEXT NOT NULL,
+        punch_in TEXT,
+        punch_out TEXT,
+        status TEXT,
+        pin_comment TEXT,
+        pout_comment TEXT,
+        status_comment TEXT,
+        pin_highlight BOOLEAN DEFAULT 0,
+        pout_highlight BOOLEAN DEFAULT 0,
+        status_highlight BOOLEAN DEFAULT 0,
+        time_range TEXT,
+        upload_timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+        file_name TEXT,
+        UNIQUE(employee_name, date, file_name)
+    );
+    CREATE INDEX idx_attendance_employee_date ON attendance_records (employee_name, date, status);
+    CREATE INDEX idx_attendance_file ON attendance_records (file_name);
+'''
+
+# attendance_days as the first compact layout created it
+TEXT_TIMES_SCHEMA = ATTENDANCE_DAYS_SCHEMA.replace('punch_in,', 'punch_in TEXT,').replace(
+    'punch_out,', 'punch_out TEXT,').replace(
+    f'upload_timestamp INTEGER DEFAULT ({UPLOAD_TIME_SQL})', 'upload_timestamp DATETIME DEFAULT CURRENT_TIMESTAMP')
+
+
+def build_legacy(path, records, file_name='old.xlsx'):
+    """A database as written before the compact layout, holding records"""
+    with sqlite3.connect(path) as conn:
+        conn.executescript(LEGACY_SCHEMA)
+        conn.executemany(ATTENDANCE_INSERT_SQL, [attendance_record_row(record, file_name) for record in records])
+    conn.close()
+
+
+def store_text_times(path):
+    """Rewrite attendance_days the way the first compact layout stored it"""
+    with sqlite3.connect(path) as conn:
+        conn.executescript(f'''
+            DROP VIEW attendance_records;
+            ALTER TABLE attendance_days RENAME TO attendance_days_integer;
+            CREATE TABLE attendance_days ({TEXT_TIMES_SCHEMA});
+            INSERT INTO attendance_days
+            SELECT id, employee_id, day, {punch_text_sql('punch_in')}, {punch_text_sql('punch_out')},
+                   status_id, pin_comment_id, pout_comment_id, status_comment_id, highlights, time_range_id,
+                   datetime(upload_timestamp, 'unixepoch'), file_id
+            FROM attendance_days_integer;
+            DROP TABLE attendance_days_integer;
+            CREATE INDEX idx_attendance_employee_date ON attendance_days (employee_id, day, status_id);
+        ''')
+    conn.close()
+
+
+def stored_time_types(path):
+    """typeof() the punch and upload times of each attendance_days row, by day"""
+    with sqlite3.connect(path) as conn:
+        types = conn.execute('''
+            SELECT typeof(punch_in), typeof(punch_out), typeof(upload_timestamp)
+            FROM attendance_days ORDER BY day
+        ''').fetchall()
+    conn.close()
+    return types
+
+
+def schema_objects(path):
+    """Tables and views named attendance_records*, mapped to their type"""
+    with sqlite3.connect(path) as conn:
+        objects = dict(conn.execute('''
+            SELECT name, type FROM sqlite_master
+            WHERE type IN ('table', 'view') AND name LIKE 'attendance_records%'
+        '''))
+    conn.close()
+    return objects
+
+
+def open_database(path):
+    database = AttendanceDatabase(path)
+    database.close()
+    return database
+
+
+@pytest.fixture
+def legacy_path(tmp_path):
+    return str(tmp_path / 'legacy.db')
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('2025-01-09', '2025-01-09'),
+    ('1/9/2025', '2025-09-01'),
+    ('09-01-2025', '2025-01-09'),
+    ('2025-01-09 00:00:00', '2025-01-09'),
+    ('someday', None),
+    (None, None),
+])
+def test_normalize_attendance_date(value, expected):
+    assert normalize_attendance_date(value) == expected
+
+
+def test_legacy_rows_move_to_the_compact_layout(legacy_path):
+    records = make_month(['Alice', 'Bob'], days=10)
+    records[0]['pin_comment'] = 'Late due to traffic'
+    records[0]['status_highlight'] = True
+    build_legacy(legacy_path, records)
+
+    database = open_database(legacy_path)
+
+    assert schema_objects(legacy_path) == {'attendance_records': 'view'}
+    [stored] = database.get_attendance_records(employee_filter='Alice', from_date='2025-01-01', to_date='2025-01-01')
+    assert {key: stored[key] for key in records[0]} == records[0]
+    assert len(database.get_attendance_records()) == 20
+    assert sorted(database.get_employees()) == ['Alice', 'Bob']
+    with database._connect() as conn:
+        indexes = {row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'attendance_days'")}
+    assert {'idx_attendance_day', 'idx_attendance_file'} <= indexes
+
+
+def test_non_iso_legacy_dates_are_normalized(legacy_path):
+    build_legacy(legacy_path, make_month(['Alice'], days=5) + [make_record('Bob', '1/9/2025')])
+
+    database = open_database(legacy_path)
+
+    assert schema_objects(legacy_path) == {'attendance_records': 'view'}
+    assert [record['Date'] for record in database.get_attendance_records(employee_filter='Bob')] == ['2025-09-01']
+    assert len(database.get_attendance_records()) == 6
+
+
+def test_unreadable_legacy_dates_are_kept_and_reported(legacy_path, capsys):
+    build_legacy(legacy_path, make_month(['Alice'], days=5) + [make_record('Bob', 'someday')])
+
+    database = open_database(legacy_path)
+
+    assert "1 legacy attendance row(s) have unreadable dates" in capsys.readouterr().out
+    assert schema_objects(legacy_path) == {'attendance_records': 'view', 'attendance_records_legacy': 'table'}
+    assert len(database.get_attendance_records()) == 5
+    with sqlite3.connect(legacy_path) as conn:
+        assert conn.execute('SELECT employee_name, date FROM attendance_records_legacy').fetchall() == [
+            ('Bob', 'someday')]
+    conn.close()
+
+    # Once the date is fixed by hand, the next start moves the row and drops the table
+    with sqlite3.connect(legacy_path) as conn:
+        conn.execute("UPDATE attendance_records_legacy SET date = '2025-01-31'")
+    conn.close()
+    database = open_database(legacy_path)
+
+    assert schema_objects(legacy_path) == {'attendance_records': 'view'}
+    assert len(database.get_attendance_records()) == 6
+
+
+def test_interrupted_migration_is_resumed(legacy_path):
+    # What an interrupted migration used to leave: the view next to the renamed, unmoved table
+    open_database(legacy_path)
+    rows = [attendance_record_row(record, 'old.xlsx') for record in make_month(['Alice', 'Bob'], days=10)]
+    with sqlite3.connect(legacy_path) as conn:
+        conn.execute(LEGACY_SCHEMA.split(';')[0].replace('attendance_records', 'attendance_records_legacy'))
+        conn.executemany(ATTENDANCE_INSERT_SQL.replace('attendance_records', 'attendance_records_legacy'), rows)
+    conn.close()
+    assert schema_objects(legacy_path) == {'attendance_records': 'view', 'attendance_records_legacy': 'table'}
+
+    database = open_database(legacy_path)
+
+    assert schema_objects(legacy_path) == {'attendance_records': 'view'}
+    assert len(database.get_attendance_records()) == 20
+    assert sorted(database.get_employees()) == ['Alice', 'Bob']
+
+
+def test_failed_migration_rolls_back(legacy_path, monkeypatch):
+    build_legacy(legacy_path, make_month(['Alice'], days=10))
+
+    def fail_insert(self, cursor, rows):
+        raise RuntimeError('interrupted')
+
+    monkeypatch.setattr(AttendanceDatabase, '_attendance_day_rows', fail_insert)
+    with pytest.raises(RuntimeError):
+        AttendanceDatabase(legacy_path)
+
+    assert schema_objects(legacy_path) == {'attendance_records': 'table'}
+    with sqlite3.connect(legacy_path) as conn:
+        assert conn.execute('SELECT COUNT(*) FROM attendance_records').fetchone() == (10,)
+    conn.close()
+
+    monkeypatch.undo()
+    database = open_database(legacy_path)
+
+    assert schema_objects(legacy_path) == {'attendance_records': 'view'}
+    assert len(database.get_attendance_records()) == 10
+
+
+def odd_punch_records():
+    records = make_month(['Alice'], days=5)
+    records[1]['Punch-In'] = '9:05'
+    records[2]['Punch-Out'] = 'MISS'
+    records[3]['Punch-In'] = ''
+    records[4]['Punch-Out'] = '24:00'
+    return records
+
+
+def test_punch_times_are_stored_as_minutes(tmp_path):
+    path = str(tmp_path / 'compact.db')
+    records = odd_punch_records()
+    database = AttendanceDatabase(path)
+    database.save_attendance_records(records, 'january.xlsx')
+    
+    # Only HH:MM punch times become minutes; anything else is kept as the text it was
+    assert stored_time_types(path) == [
+        ('integer', 'integer', 'integer'),
+        ('text', 'integer', 'integer'),
+        ('integer', 'text', 'integer'),
+        ('text', 'integer', 'integer'),
+        ('integer', 'text', 'integer'),
+    ]
+    stored = database.get_attendance_records()
+    assert [(record['Punch-In'], record['Punch-Out']) for record in stored] == [
+        (record['Punch-In'], record['Punch-Out']) for record in records]
+    
+    # The view and its triggers read and write the same form
+    with database._connect() as conn:
+        view_rows = conn.execute(
+            'SELECT punch_in, punch_out, upload_timestamp FROM attendance_records ORDER BY day').fetchall()
+        conn.execute('''
+            INSERT INTO attendance_records (employee_name, date, punch_in, punch_out, file_name)
+            VALUES ('Bob', '2025-01-01', '08:30', '7:00', 'manual.xlsx')
+        ''')
+        conn.commit()
+        bob_types = conn.execute('''
+            SELECT typeof(d.punch_in), typeof(d.punch_out) FROM attendance_days d
+            JOIN employee_names e ON e.id = d.employee_id WHERE e.employee_name = 'Bob'
+        ''').fetchall()
+    assert view_rows == [(record['Punch-In'], record['Punch-Out'], record['upload_timestamp']) for record in stored]
+    assert bob_types == [('integer', 'text')]
+    [bob] = database.get_attendance_records(employee_filter='Bob')
+    assert (bob['Punch-In'], bob['Punch-Out']) == ('08:30', '7:00')
+    database.close()
+
+
+def test_text_punch_times_are_converted(tmp_path):
+    path = str(tmp_path / 'compact.db')
+    database = AttendanceDatabase(path)
+    database.save_attendance_records(odd_punch_records(), 'january.xlsx')
+    expected = database.get_attendance_records()
+    database.close()
+    store_text_times(path)
+    assert stored_time_types(path)[0] == ('text', 'text', 'text')
+    
+    database = open_database(path)
+    
+    assert stored_time_types(path)[0] == ('integer', 'integer', 'integer')
+    assert schema_objects(path) == {'attendance_records': 'view'}
+    assert database.get_attendance_records() == expected
+    with database._connect() as conn:
+        indexes = {row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'attendance_days'")}
+    assert 'idx_attendance_employee_date' not in indexes
+    assert {'idx_attendance_day', 'idx_attendance_file'} <= indexes
@@ -0,0 +1,105 @@
+"""
+Tests for employee_monthly_summary: /api/employee-data reads its figures from the
+summary, which every write must keep equal to a count over the stored rows
+"""
+
+import pytest
+
+import app
+from tests.conftest import make_month
+
+STATUSES = ['P', 'A', 'HF', 'PHF', 'SHF', 'W/O', 'PL', 'SL', 'FL', 'HL', 'PAT', 'MAT', 'P(Late)', 'W/O', 'P']
+UPLOAD = {'file_name': 'march.xlsx', 'content_hash': 'hash', 'selected_date': '2025-03', 'sheet_hashes': {}}
+
+
+def mixed_month(employees, month, offset=0):
+    """A month of records per employee cycling through every status bucket"""
+    records = make_month(employees, month=month)
+    for i, record in enumerate(records):
+        record['Status'] = STATUSES[(i + offset) % len(STATUSES)]
+    return records
+
+
+def per_row_figures(records):
+    """The /api/employee-data figures as they were computed from every record"""
+    def days(prefix):
+        return len([r for r in records if r['Status'].startswith(prefix)])
+
+    total_days = len(records)
+    present_days = len([r for r in records if r['Status'].startswith('P')
+                        and not r['Status'].startswith(('PL', 'SL', 'FL', 'PAT', 'MAT', 'HL'))])
+    half_days, paid_half_days, sick_half_days = days('HF'), days('PHF'), days('SHF')
+    leave_breakdown = {'wo_used': days('W/O'), 'pl_used': days('PL'), 'sl_used': days('SL'), 'fl_used': days('FL'),
+                       'hl_used': days('HL'), 'pat_used': days('PAT'), 'mat_used': days('MAT')}
+    paid_leave_days = sum(leave_breakdown.values()) - leave_breakdown['wo_used']
+    working_days = total_days - leave_breakdown['wo_used']
+    present_days_weighted = present_days + half_days * 0.5 + paid_half_days * 0.5 + sick_half_days * 0.5
+    attendance_rate = (present_days_weighted / working_days * 100) if working_days > 0 else 0
+    return {
+        'total_days': total_days,
+        'working_days': working_days,
+        'present_days': present_days_weighted,
+        'absent_days': days('A') + half_days * 0.5 + paid_half_days * 0.5 + sick_half_days * 0.5,
+        'paid_leave_days': paid_leave_days + paid_half_days * 0.5 + sick_half_days * 0.5,
+        'attendance_rate': round(attendance_rate, 1),
+        'leave_breakdown': leave_breakdown,
+    }
+
+
+@pytest.fixture
+def client(database, monkeypatch):
+    """A test client signed in as an admin"""
+    monkeypatch.setattr(app, 'db', database)
+    client = app.app.test_client()
+    with client.session_transaction() as session:
+        session['user_data'] = {'name': 'Admin', 'is_admin': True}
+    return client
+
+
+def assert_summary_matches_rows(client, database, employee):
+    response = client.get(f'/api/employee-data/{employee}').json
+    records = database.get_attendance_records(employee_filter=employee)
+    if not records:
+        assert response == {'success': False, 'message': 'No data found for this employee'}
+        return
+    assert response['success'], response
+    assert {key: response['data'][key] for key in per_row_figures(records)} == per_row_figures(records)
+
+
+def test_employee_data_matches_the_per_row_figures(client, database):
+    database.save_attendance_records(mixed_month(['Alice', 'Bob'], 1) + mixed_month(['Alice'], 2, offset=4),
+                                     'history.xlsx')
+
+    for employee in ('Alice', 'Bob', 'Carol'):
+        assert_summary_matches_rows(client, database, employee)
+    assert client.get('/api/employee-data/Alice').json['data']['total_days'] == 59
+
+
+def test_summary_follows_every_write(client, database):
+    database.save_attendance_records(mixed_month(['Alice', 'Bob'], 1), 'january.xlsx')
+    database.save_attendance_records(mixed_month(['Alice'], 2), 'february.xlsx')
+
+    # Delta sync: changed statuses, a removed day and a new employee
+    records = mixed_month(['Alice', 'Bob'], 1, offset=3)[1:] + mixed_month(['Carol'], 1)
+    database.sync_attendance_records(records, 'january.xlsx')
+    for employee in ('Alice', 'Bob', 'Carol'):
+        assert_summary_matches_rows(client, database, employee)
+
+    # Staged upload: nothing changes until the commit
+    database.stage_attendance_records('job-1', mixed_month(['Alice', 'Bob'], 3, offset=7), 'march.xlsx')
+    assert client.get('/api/employee-data/Bob').json['data']['total_days'] == 31
+    database.commit_staged_upload('job-1', [UPLOAD])
+    assert client.get('/api/employee-data/Bob').json['data']['total_days'] == 62
+    for employee in ('Alice', 'Bob', 'Carol'):
+        assert_summary_matches_rows(client, database, employee)
+
+    # Clearing one file, then everything
+    database.clear_existing_data('january.xlsx')
+    for employee in ('Alice', 'Bob', 'Carol'):
+        assert_summary_matches_rows(client, database, employee)
+    assert client.get('/api/employee-data/Carol').json['success'] is False
+
+    database.clear_attendance_records()
+    for employee in ('Alice', 'Bob'):
+        assert_summary_matches_rows(client, database, employee)
+    assert client.get('/api/employee-data/Alice').json['success'] is False
@@ -0,0 +1,65 @@
+"""
+Query plan regression tests for the hot read queries
+The history is built with a realistic spread of employees, statuses, comments,
+shift ranges and files so the planner's statistics resemble production
+"""
+
+import datetime
+
+import pytest
+
+from database import AttendanceDatabase
+from tests.conftest import make_record
+
+STATUSES = ['P', 'P', 'P', 'P', 'P', 'P', 'A', 'W/O', 'W/O', 'HF', 'PHF', 'SHF', 'PL', 'SL', 'FL', 'HL', 'P(Late)']
+TIME_RANGES = ['09:00 AM to 06:00 PM', '08:30 AM to 07:00 PM', '10:00 AM to 07:00 PM']
+
+
+def history(employee_count=150, day_count=240, file_count=4):
+    """Records per file name for employee_count employees over day_count days"""
+    start = datetime.date(2024, 1, 1)
+    files = {f"attendance_{index}.xlsx": [] for index in range(file_count)}
+    names = list(files)
+    for employee in range(employee_count):
+        for day in range(day_count):
+            i = employee * day_count + day
+            files[names[employee % file_count]].append(make_record(
+                f"Employee {employee:03d}", (start + datetime.timedelta(days=day)).isoformat(),
+                status=STATUSES[i % len(STATUSES)],
+                punch_in=f"09:{i % 60:02d}",
+                pin_comment=f"Late due to traffic {i % 300}" if i % 7 == 0 else '',
+                pout_comment=f"Left early {i % 200}" if i % 11 == 0 else '',
+                status_comment=f"Approved by manager {i % 100}" if i % 13 == 0 else '',
+                pin_highlight=i % 5 == 0,
+                status_highlight=i % 9 == 0,
+                time_range=TIME_RANGES[employee % len(TIME_RANGES)]))
+    return files
+
+
+@pytest.fixture(scope='module')
+def analyzed_database(tmp_path_factory):
+    database = AttendanceDatabase(str(tmp_path_factory.mktemp('plans') / 'attendance.db'))
+    for file_name, records in history().items():
+        database.save_attendance_records(records, file_name)
+    for i in range(200):
+        database.log_login(f"user{i}@gmail.com", f"User {i}", False)
+    with database._connect() as conn:
+        conn.execute('ANALYZE')
+    yield database
+    database.close()
+
+
+def test_hot_queries_avoid_full_table_scans(analyzed_database):
+    assert analyzed_database.find_full_scans() == []
+
+
+def test_file_queries_use_the_file_index(analyzed_database):
+    plans = analyzed_database.query_plans()
+    assert 'idx_attendance_file' in plans['attendance_by_file'][0]
+    assert 'idx_attendance_file' in plans['attendance_count_by_file'][0]
+
+
+def test_full_scan_is_reported(analyzed_database, monkeypatch):
+    plans = {'by_text': ['SCAN attendance_texts'], 'by_index': ['SCAN login_logs USING INDEX idx_login_logs_time']}
+    monkeypatch.setattr(analyzed_database, 'query_plans', lambda: plans)
+    assert analyzed_database.find_full_scans() == ['by_text: SCAN attendance_texts']
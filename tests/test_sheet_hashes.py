@@ -0,0 +1,81 @@
+"""
+Tests for per-sheet content hashes and the unchanged sheets they let delta uploads skip
+"""
+
+import datetime
+import json
+import os
+
+import app
+from utils import excel_ingest
+from utils.excel_ingest import sheet_content_hashes
+from tests.conftest import month_block, write_workbook
+
+
+def test_sheet_hash_ignores_strings_and_styles_of_other_sheets(tmp_path):
+    sheets = {'Alice': month_block('JAN'), 'Bob': month_block('JAN', status='A')}
+    before = sheet_content_hashes(write_workbook(tmp_path / 'before.xlsx', sheets))
+
+    # A new comment, status text and red font on Alice's first sheet renumber the
+    # workbook's shared strings and styles that Bob's cells point at
+    sheets['Alice'] = {**sheets['Alice'], (6, 4): 'HL'}
+    after = sheet_content_hashes(write_workbook(tmp_path / 'after.xlsx', sheets,
+                                                comments={'Alice': {(4, 4): 'Late due to traffic'}},
+                                                red_cells={'Alice': [(4, 5)]}))
+
+    assert after['Alice'] != before['Alice']
+    assert after['Bob'] == before['Bob']
+
+
+def test_sheet_hash_changes_with_its_own_cells(tmp_path):
+    sheets = {'Alice': month_block('JAN')}
+    before = sheet_content_hashes(write_workbook(tmp_path / 'before.xlsx', sheets))
+
+    for name, kwargs in {
+        'value': {'sheets': {'Alice': {**sheets['Alice'], (6, 4): 'A'}}},
+        'comment': {'sheets': sheets, 'comments': {'Alice': {(6, 4): 'Sick'}}},
+        'font': {'sheets': sheets, 'red_cells': {'Alice': [(6, 4)]}},
+    }.items():
+        after = sheet_content_hashes(write_workbook(tmp_path / f'{name}.xlsx', **kwargs))
+        assert after['Alice'] != before['Alice'], name
+
+
+def upload(database, path, monkeypatch):
+    """Run a delta upload job for path, returning the job result and the sheets parsed"""
+    parsed = []
+
+    class RecordingSheetData(excel_ingest.SheetData):
+        def __init__(self, ws):
+            parsed.append(ws.title)
+            super().__init__(ws)
+
+    monkeypatch.setattr(excel_ingest, 'SheetData', RecordingSheetData)
+    job_id = f"job-{os.path.basename(path)}"
+    database.create_upload_job(job_id, 1)
+    app.run_upload_job(job_id, [('january.xlsx', str(path))], datetime.date(2025, 1, 5), write_mode='delta')
+    job = database.get_upload_job(job_id)
+    assert job['status'] == 'completed', job['message']
+    return json.loads(job['result']), parsed
+
+
+def test_delta_upload_parses_only_changed_sheets(database, tmp_path, monkeypatch):
+    monkeypatch.setattr(app, 'db', database)
+    monkeypatch.setitem(app.app.config, 'UPLOAD_FILE_WORKERS', 1)
+    sheets = {'Alice': month_block('JAN'), 'Bob': month_block('JAN')}
+
+    result, parsed = upload(database, write_workbook(tmp_path / 'first.xlsx', sheets), monkeypatch)
+    assert parsed == ['Alice', 'Bob']
+    assert result['record_count'] == 10
+
+    # Bob's third day becomes sick leave; Alice's sheet is unchanged and not parsed again
+    sheets['Bob'] = {**sheets['Bob'], (6, 6): 'SL'}
+    result, parsed = upload(database, write_workbook(tmp_path / 'second.xlsx', sheets), monkeypatch)
+
+    assert parsed == ['Bob']
+    assert result['skipped_sheets'] == 1
+    assert result['changes'] == {'inserted': 0, 'updated': 1, 'deleted': 0, 'unchanged': 4}
+    assert result['record_count'] == 10
+    statuses = {(record['Employee'], record['Date']): record['Status'] for record in database.get_attendance_records()}
+    assert statuses[('Bob', '2025-01-03')] == 'SL'
+    assert statuses[('Alice', '2025-01-03')] == 'P'
+    assert len(statuses) == 10
@@ -0,0 +1,175 @@
+"""
+Tests for staged uploads: nothing reaches the live tables until commit_staged_upload
+succeeds, and a failure at any point leaves the previous data in place
+"""
+
+import datetime
+import io
+import json
+import sqlite3
+
+import pytest
+
+import app
+from tests.conftest import make_month, month_block, write_workbook
+
+
+def upload(file_name, content_hash='new-hash'):
+    return {'file_name': file_name, 'content_hash': content_hash, 'selected_date': '2025-01',
+            'sheet_hashes': {'Alice': content_hash}}
+
+
+def staged_counts(database):
+    with sqlite3.connect(database.db_path) as conn:
+        counts = (conn.execute('SELECT COUNT(*) FROM staged_attendance_records').fetchone()[0],
+                  conn.execute('SELECT COUNT(*) FROM staged_leave_totals').fetchone()[0])
+    conn.close()
+    return counts
+
+
+def statuses(database):
+    return sorted({record['Status'] for record in database.get_attendance_records()})
+
+
+@pytest.fixture
+def live_database(database):
+    """A database holding january.xlsx with every day present"""
+    database.save_attendance_records(make_month(['Alice', 'Bob'], days=10), 'january.xlsx',
+                                     leave_totals={'Alice': {'PL': 1}}, upload=upload('january.xlsx', 'old-hash'))
+    return database
+
+
+def test_staged_rows_are_invisible_until_committed(live_database):
+    records = make_month(['Alice', 'Bob'], days=5, Status='A')
+    live_database.stage_attendance_records('job-1', records, 'january.xlsx')
+    live_database.stage_leave_totals('job-1', {'Alice': {'PL': 3}}, 'january.xlsx')
+
+    assert statuses(live_database) == ['P']
+    assert len(live_database.get_attendance_records()) == 20
+
+    assert live_database.commit_staged_upload('job-1', [upload('january.xlsx')]) == 10
+
+    assert statuses(live_database) == ['A']
+    assert len(live_database.get_attendance_records()) == 10
+    assert live_database.get_leave_totals('Alice')['Alice']['PL'] == 3
+    assert live_database.get_sheet_hashes('january.xlsx', '2025-01') == {'Alice': 'new-hash'}
+    assert staged_counts(live_database) == (0, 0)
+
+
+def test_discarded_job_leaves_live_data(live_database):
+    live_database.stage_attendance_records('job-1', make_month(['Alice'], days=5, Status='A'), 'january.xlsx')
+    live_database.stage_leave_totals('job-1', {'Alice': {'PL': 3}}, 'january.xlsx')
+
+    assert live_database.discard_staged_upload('job-1')
+
+    assert staged_counts(live_database) == (0, 0)
+    assert statuses(live_database) == ['P']
+    assert len(live_database.get_attendance_records()) == 20
+
+
+def test_failed_commit_rolls_back_every_file(live_database):
+    live_database.stage_attendance_records('job-1', make_month(['Alice'], days=5, Status='A'), 'january.xlsx')
+    live_database.stage_attendance_records('job-1', make_month(['Carol'], days=5), 'february.xlsx')
+
+    # The second file's upload details are incomplete, so the swap fails after the first file
+    incomplete = {'file_name': 'february.xlsx', 'selected_date': '2025-01', 'sheet_hashes': {}}
+    with pytest.raises(KeyError):
+        live_database.commit_staged_upload('job-1', [upload('january.xlsx'), incomplete])
+
+    assert statuses(live_database) == ['P']
+    assert len(live_database.get_attendance_records()) == 20
+    assert 'Carol' not in live_database.get_employees()
+    assert live_database.get_leave_totals('Alice')['Alice']['PL'] == 1
+    assert live_database.get_sheet_hashes('january.xlsx', '2025-01') == {'Alice': 'old-hash'}
+    assert live_database.get_sheet_hashes('february.xlsx', '2025-01') == {}
+    # The staged rows survive for a retry until the job is discarded
+    assert staged_counts(live_database) == (10, 0)
+
+    assert live_database.commit_staged_upload('job-1', [upload('january.xlsx'), upload('february.xlsx')]) == 10
+    assert 'Carol' in live_database.get_employees()
+
+
+def test_failed_streamed_save_keeps_live_data(live_database):
+    def records():
+        yield from make_month(['Alice'], days=5, Status='A')
+        raise ValueError('bad sheet')
+
+    with pytest.raises(ValueError):
+        live_database.save_attendance_records(records(), 'january.xlsx', leave_totals={'Alice': {'PL': 3}},
+                                              upload=upload('january.xlsx'))
+
+    assert statuses(live_database) == ['P']
+    assert len(live_database.get_attendance_records()) == 20
+    assert live_database.get_leave_totals('Alice')['Alice']['PL'] == 1
+    assert live_database.get_sheet_hashes('january.xlsx', '2025-01') == {'Alice': 'old-hash'}
+    # The save staged its rows under a key of its own, which is dropped again
+    assert staged_counts(live_database) == (0, 0)
+
+def test_failed_staged_job_leaves_live_data(live_database, monkeypatch):
+    def fake_records(source, sheet_totals, selected_date, progress=None, skip_sheets=(), start_date=None):
+        if source.name == 'broken.xlsx':
+            raise ValueError('bad sheet')
+        sheet_totals['Alice'] = {'PL': 3}
+        return iter(make_month(['Alice'], days=5, Status='A'))
+
+    monkeypatch.setattr(app, 'db', live_database)
+    monkeypatch.setattr(app, 'iter_attendance_records', fake_records)
+    monkeypatch.setattr(app, 'file_content_hash', lambda source: f"hash-{source.name}")
+    monkeypatch.setattr(app, 'sheet_content_hashes', lambda source: {'Alice': f"hash-{source.name}"})
+    monkeypatch.setitem(app.app.config, 'UPLOAD_FILE_WORKERS', 1)
+
+    sources = []
+    for file_name in ('january.xlsx', 'broken.xlsx'):
+        source = io.BytesIO()
+        source.name = file_name
+        sources.append((file_name, source))
+    live_database.create_upload_job('job-1', len(sources))
+    app.run_upload_job('job-1', sources, datetime.date(2025, 1, 31), write_mode='staged')
+
+    job = live_database.get_upload_job('job-1')
+    assert job['status'] == 'failed'
+    assert 'bad sheet' in job['message']
+    assert statuses(live_database) == ['P']
+    assert len(live_database.get_attendance_records()) == 20
+    assert live_database.get_leave_totals('Alice')['Alice']['PL'] == 1
+    assert staged_counts(live_database) == (0, 0)
+
+
+def test_pooled_replace_job_writes_every_file_or_none(live_database, tmp_path, monkeypatch):
+    monkeypatch.setattr(app, 'db', live_database)
+    monkeypatch.setitem(app.app.config, 'UPLOAD_FILE_WORKERS', 2)
+    
+    def saved_files():
+        return [(name, str(write_workbook(tmp_path / name, {'Alice': month_block('JAN', status='A')})))
+                for name in ('january.xlsx', 'february.xlsx')]
+    
+    # Both files parse in the pool; writing the second one fails
+    stage_leave_totals = live_database.stage_leave_totals
+    
+    def fail_second_file(job_id, sheet_totals, file_name):
+        if file_name == 'february.xlsx':
+            raise ValueError('disk full')
+        return stage_leave_totals(job_id, sheet_totals, file_name)
+    
+    monkeypatch.setattr(live_database, 'stage_leave_totals', fail_second_file)
+    live_database.create_upload_job('job-1', 2)
+    app.run_upload_job('job-1', saved_files(), datetime.date(2025, 1, 5))
+    
+    job = live_database.get_upload_job('job-1')
+    assert job['status'] == 'failed'
+    assert 'disk full' in job['message']
+    assert statuses(live_database) == ['P']
+    assert len(live_database.get_attendance_records()) == 20
+    assert staged_counts(live_database) == (0, 0)
+    
+    monkeypatch.setattr(live_database, 'stage_leave_totals', stage_leave_totals)
+    live_database.create_upload_job('job-2', 2)
+    app.run_upload_job('job-2', saved_files(), datetime.date(2025, 1, 5))
+    
+    job = live_database.get_upload_job('job-2')
+    assert job['status'] == 'completed', job['message']
+    assert json.loads(job['result'])['write_mode'] == 'staged'
+    assert statuses(live_database) == ['A']
+    assert sorted({record['file_name'] for record in live_database.get_attendance_records()}) == [
+        'february.xlsx', 'january.xlsx']
+    assert len(live_database.get_attendance_records()) == 10
@@ -0,0 +1,57 @@
+"""
+Tests for utils/time_parser.py: parse_time must accept exactly what datetime.strptime
+accepts for each format, and return the same time
+"""
+
+import datetime
+
+import pytest
+
+from utils.time_parser import parse_time, PUNCH_FORMATS, SHIFT_FORMATS, STORED_PUNCH_FORMATS
+
+TEXTS = [
+    # Leading zeros, or none
+    '09:30', '9:30', '9:5', '09:05', '00:00', '0:00', '23:59', '009:30', '09:030',
+    # Invalid hours and minutes
+    '24:00', '25:10', '13:00 PM', '00:30 AM', '0:30 AM', '09:60',
+    # 12:xx around midnight and noon, lower-case and spaced am/pm
+    '12:00 AM', '12:30 AM', '12:00 PM', '12:45 PM', '12:30 am', '1:05 pm', '01:05 Pm', '9:30  AM', '9:30\tPM',
+    '09:30AM',
+    # Surrounding whitespace
+    ' 09:30', '09:30 ', '\t9:30 AM',
+    # Seconds, including the leap seconds strptime matches but can't return
+    '09:30:59', '09:30:00 PM', '09:30:60', '09:30:61',
+    # Dotted times
+    '09.30', '9.30 am', '12.15 PM',
+    # Not times at all
+    '', 'MISS', '9:3O', '+9:30', '09:30 to 06:00 PM',
+]
+
+
+def strptime_time(text, formats):
+    """What the ingestion did before parse_time: the first format strptime accepts"""
+    for fmt in formats:
+        try:
+            return datetime.datetime.strptime(text, fmt).time()
+        except ValueError:
+            continue
+    return None
+
+
+@pytest.mark.parametrize('fmt', sorted(set(PUNCH_FORMATS + SHIFT_FORMATS + STORED_PUNCH_FORMATS)))
+@pytest.mark.parametrize('text', TEXTS)
+def test_parse_time_matches_strptime_per_format(text, fmt):
+    assert parse_time(text, (fmt,)) == strptime_time(text, (fmt,))
+
+
+@pytest.mark.parametrize('formats', [PUNCH_FORMATS, SHIFT_FORMATS, STORED_PUNCH_FORMATS])
+@pytest.mark.parametrize('text', TEXTS)
+def test_parse_time_matches_strptime_in_format_order(text, formats):
+    assert parse_time(text, formats) == strptime_time(text, formats)
+
+
+def test_parse_time_reads_12_hour_times():
+    assert parse_time('12:30 am') == datetime.time(0, 30)
+    assert parse_time('12:45 PM') == datetime.time(12, 45)
+    assert parse_time('1:05 pm') == datetime.time(13, 5)
+    assert parse_time('24:00') is None
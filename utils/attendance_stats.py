@@ -0,0 +1,66 @@
+"""
+Attendance statistics
+Status buckets counted for employee statistics and the figures derived from
+their counts (working days, weighted present days, attendance rate)
+"""
+
+from functools import lru_cache
+
+# Bucket name -> (status prefix, prefixes that exclude a status from the bucket).
+# Matching is case-sensitive, like str.startswith.
+STATUS_BUCKETS = {
+    'present': ('P', ('PL', 'SL', 'FL', 'PAT', 'MAT', 'HL')),
+    'absent': ('A', ()),
+    'half': ('HF', ()),
+    'paid_half': ('PHF', ()),
+    'sick_half': ('SHF', ()),
+    'wo': ('W/O', ()),
+    'pl': ('PL', ()),
+    'sl': ('SL', ()),
+    'fl': ('FL', ()),
+    'hl': ('HL', ()),
+    'pat': ('PAT', ()),
+    'mat': ('MAT', ()),
+}
+
+
+@lru_cache(maxsize=None)
+def status_buckets(status):
+    """Buckets a status counts towards; PHF, for example, is both present and paid_half"""
+    if not status:
+        return ()
+    return tuple(bucket for bucket, (prefix, excluded) in STATUS_BUCKETS.items()
+                 if status.startswith(prefix) and not status.startswith(excluded))
+
+
+def tally_status_buckets(status_counts):
+    """Total days and per-bucket counts from (status, day count) pairs, e.g. a GROUP BY status"""
+    total_days = 0
+    counts = dict.fromkeys(STATUS_BUCKETS, 0)
+    for status, days in status_counts:
+        total_days += days
+        for bucket in status_buckets(status):
+            counts[bucket] += days
+    return total_days, counts
+
+
+def derive_attendance_stats(total_days, counts):
+    """Figures shown on the employee page, from the total day count and bucket counts"""
+    half_days = counts['half'] * 0.5 + counts['paid_half'] * 0.5 + counts['sick_half'] * 0.5
+    leave_days = counts['pl'] + counts['sl'] + counts['fl'] + counts['hl'] + counts['pat'] + counts['mat']
+
+    # Working days exclude W/O; PHF and SHF count as half a paid day
+    working_days = total_days - counts['wo']
+    present_days_weighted = counts['present'] + half_days
+    return {
+        'working_days': working_days,
+        'present_days_weighted': present_days_weighted,
+        'absent_days': counts['absent'] + half_days,
+        'paid_leave_days': leave_days + counts['paid_half'] * 0.5 + counts['sick_half'] * 0.5,
+        'attendance_rate': (present_days_weighted / working_days * 100) if working_days > 0 else 0,
+    }
+
+
+def attendance_summary(total_days, counts):
+    """total_days, the bucket counts and the derived figures as one dict"""
+    return {'total_days': total_days, 'counts': counts, **derive_attendance_stats(total_days, counts)}
@@ -0,0 +1,717 @@
+"""
+Excel ingestion engine for attendance workbooks
+Parses each uploaded workbook once and builds the per-sheet value grid,
+comments and font information used to create attendance records
+"""
+
+import calendar
+import datetime
+import hashlib
+import io
+import multiprocessing
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from openpyxl import load_workbook
+from openpyxl.cell.read_only import ReadOnlyCell
+from openpyxl.comments.comment_sheet import CommentSheet
+from openpyxl.packaging.relationship import get_dependents, get_rels_path
+from openpyxl.reader.strings import read_string_table
+from openpyxl.reader.workbook import WorkbookParser
+from openpyxl.utils.cell import coordinate_to_tuple
+from openpyxl.xml.constants import ARC_SHARED_STRINGS, ARC_STYLE, ARC_WORKBOOK, COMMENTS_NS, SHEET_MAIN_NS
+from openpyxl.xml.functions import fromstring, iterparse, tostring
+
+from utils.time_parser import parse_time, PUNCH_FORMATS
+
+# Employees whose punches are always kept blank
+BLANK_EMPLOYEES = [
+    "Bhavin Patel",
+    "Pramod Dubey",
+    "Shrikant Talekar",
+    "Jitendra Patolia",
+    "Lalit Dobariya"
+]
+
+# Pools are started from the upload worker thread. A forked child copies whatever
+# locks other threads hold at that moment, so workers are spawned fresh instead
+POOL_CONTEXT = multiprocessing.get_context('spawn')
+
+# Month abbreviations used as block markers (JAN, NOV-24, ...)
+MONTH_NUMBERS = {abbr.upper(): num for num, abbr in enumerate(calendar.month_abbr) if abbr}
+
+# Statuses that never show punches (off/leave/paid)
+IGNORE_STATUSES = {"A", "W/O", "PL", "SL", "FL", "HL", "PAT", "MAT"}
+# Note: "P", "HF", "PHF", "SHF" are NOT in IGNORE_STATUSES, so they will always show punches
+
+# Strings pandas.read_excel treats as missing values by default
+NA_STRINGS = {
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan",
+    "1.#IND", "1.#QNAN", "<NA>", "N/A", "NA", "NULL", "NaN", "None",
+    "n/a", "nan", "null"
+}
+
+
+def is_font_red(cell):
+    """Check if font color is specifically red or red-like"""
+    if cell is None or cell.font is None:
+        return False
+
+    color = cell.font.color
+    if color is None:
+        return False
+
+    # Handle RGB colors - check for red shades
+    if color.type == "rgb" and color.rgb is not None:
+        rgb_val = color.rgb.upper()
+        red_colors = [
+            "FFFF0000", "FF0000", "FFDC143C", "FFB22222", "FF8B0000",
+            "FFCD5C5C", "FFF08080", "FFFA8072", "FFFF6347", "FFFF1493"
+        ]
+        return rgb_val in red_colors
+    elif color.type == "indexed" and color.indexed is not None:
+        red_indices = [3, 5, 10, 53]
+        return color.indexed in red_indices
+    elif color.type == "theme" and color.theme is not None:
+        return color.theme == 2
+
+    return False
+
+
+def extract_employee_time_range(sheet):
+    """Extract time range from employee sheet (e.g., '08:30 AM to 07:00 PM')"""
+    try:
+        # Look for time range in cell A2 (common location for time range)
+        time_value = sheet.value(1, 0)  # Row 2, Column A
+        if time_value and isinstance(time_value, str):
+            time_value = time_value.strip()
+            # Check if it contains time pattern (AM/PM or 24-hour format)
+            if ('AM' in time_value.upper() or 'PM' in time_value.upper() or
+                ':' in time_value or 'to' in time_value.lower()):
+                return time_value
+
+        # Also check other common locations
+        for row in range(5):  # Check first 5 rows
+            for col in range(3):  # Check first 3 columns
+                time_value = sheet.value(row, col)
+                if time_value and isinstance(time_value, str):
+                    time_value = time_value.strip()
+                    if ('AM' in time_value.upper() or 'PM' in time_value.upper() or
+                        ':' in time_value or 'to' in time_value.lower()):
+                        return time_value
+    except Exception:
+        pass
+
+    return None
+
+
+def to_ts(x):
+    """Convert a punch cell value to a timestamp (NaT when it can't be parsed)"""
+    if x is None or (isinstance(x, float) and pd.isna(x)):
+        return pd.NaT
+
+    # Handle datetime.time objects directly
+    if isinstance(x, datetime.time):
+        return datetime.datetime.combine(datetime.date.today(), x)
+
+    # Handle string time formats that might be manually entered
+    if isinstance(x, str):
+        x = x.strip()
+        # Try common time formats first (cached, so repeated punches parse once)
+        time_obj = parse_time(x, PUNCH_FORMATS)
+        if time_obj is not None:
+            # Create a datetime with today's date and the parsed time
+            return datetime.datetime.combine(datetime.date.today(), time_obj)
+
+    try:
+        return pd.to_datetime(x, errors="coerce")
+    except Exception:
+        return pd.NaT
+
+
+def _grid_value(cell):
+    """Convert a cell to the value pandas.read_excel would report for it"""
+    value = cell.value
+    if value is None or cell.data_type == 'e':
+        return None
+    if isinstance(value, str) and value in NA_STRINGS:
+        return None
+    if cell.data_type == 'n' and isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def read_comment_index(wb, worksheet_path):
+    """Read every comment of a read-only worksheet into a {(row, col): text} index"""
+    archive = wb._archive
+    rels_path = get_rels_path(worksheet_path)
+    if rels_path not in archive.namelist():
+        return {}
+
+    comments = {}
+    for rel in get_dependents(archive, rels_path).find(COMMENTS_NS):
+        comment_sheet = CommentSheet.from_tree(fromstring(archive.read(rel.target)))
+        for ref, comment in comment_sheet.comments:
+            comments[coordinate_to_tuple(ref)] = comment.text
+    return comments
+
+
+class SheetData:
+    """Value grid and formatting lookups for one employee sheet of a read-only workbook.
+
+    Grid access is 0-based (like ``df.iloc``); comment/highlight lookups are
+    1-based (like openpyxl).
+    """
+
+    def __init__(self, ws):
+        self.title = ws.title
+        ws.reset_dimensions()
+        self._cells = {
+            (cell.row, cell.column): cell
+            for row in ws.iter_rows() for cell in row
+            if isinstance(cell, ReadOnlyCell)
+        }
+        # Read-only cells carry no comments; read them from the sheet's comments part
+        self._comments = read_comment_index(ws.parent, ws._worksheet_path)
+        self._red_styles = {}
+        self.rows = self._build_grid(self._cells)
+        self.n_rows = len(self.rows)
+        self.n_cols = len(self.rows[0]) if self.rows else 0
+        self.time_range = extract_employee_time_range(self)
+
+    @staticmethod
+    def _build_grid(cells):
+        """Build the value grid from the cells already parsed from the sheet"""
+        values = {}
+        n_rows = n_cols = 0
+        # Walk only the cells present in the file; iter_rows would create empty ones
+        for (row, col), cell in cells.items():
+            if cell.value is None or cell.value == "":
+                continue
+            values[(row - 1, col - 1)] = _grid_value(cell)
+            n_rows = max(n_rows, row)
+            n_cols = max(n_cols, col)
+
+        grid = [[None] * n_cols for _ in range(n_rows)]
+        for (row, col), value in values.items():
+            grid[row][col] = value
+        return grid
+
+    def is_empty(self):
+        """True when the sheet holds no values at all"""
+        return not any(value is not None for row in self.rows for value in row)
+
+    def value(self, row, col):
+        """Get the grid value at a 0-based position (None when missing)"""
+        if row < self.n_rows and col < self.n_cols:
+            return self.rows[row][col]
+        return None
+
+    def comment(self, row, col):
+        """Get the comment text for a 1-based position from the sheet's comment index"""
+        return self._comments.get((row, col), "")
+
+    def is_red(self, row, col):
+        """Check red font highlight for a 1-based position.
+
+        Cells share a handful of styles, so the decision is made once per style
+        and reused for every other cell with the same style.
+        """
+        cell = self._cells.get((row, col))
+        if cell is None:
+            return False
+        red = self._red_styles.get(cell._style_id)
+        if red is None:
+            red = self._red_styles[cell._style_id] = is_font_red(cell)
+        return red
+
+
+def iter_attendance_sheets(file_path, skip_titles=None):
+    """Yield SheetData for each visible sheet, one sheet at a time.
+
+    The workbook is opened read-only and rows are streamed from each sheet's XML,
+    so only the sheet being processed is held in memory. Cached formula values,
+    comments (from each sheet's comments part) and fonts are all recovered.
+    Sheets named in ``skip_titles`` are not parsed.
+    
+    Every cell reads as the value Excel last calculated for it (data_only=True).
+    Before this module, punch and time range cells were read as formulas: a punch
+    computed by a formula came out missing and a computed time range as its formula
+    text. Both now get the value shown in the sheet, as the status cells always did.
+    A formula saved without a calculated value still reads as empty.
+    """
+    wb = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        for ws in wb.worksheets:
+            if ws.sheet_state == "visible" and ws.title not in (skip_titles or ()):
+                yield SheetData(ws)
+    finally:
+        wb.close()
+
+
+def load_attendance_workbook(file_path):
+    """Parse the workbook once and return SheetData for every visible sheet.
+
+    Cached formula values are used throughout (the same values pandas reported),
+    so the value grid, punches, comments and fonts all come from this one parse.
+    """
+    return list(iter_attendance_sheets(file_path))
+
+
+def _extract_sheet_chunk(file_path, titles, selected_date, start_date=None):
+    """Worker: parse only the given sheets (read-only) and extract their data"""
+    if isinstance(file_path, bytes):
+        # In-memory uploads are shipped to worker processes as raw bytes
+        file_path = io.BytesIO(file_path)
+    wb = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        results = []
+        for title in titles:
+            sheet = SheetData(wb[title])
+            results.append((title, extract_sheet_records(sheet, selected_date, start_date),
+                            extract_sheet_leave_totals(sheet)))
+        return results
+    finally:
+        wb.close()
+
+
+def iter_sheet_results(file_path, selected_date, workers=1, skip_titles=None, start_date=None):
+    """Yield (title, records, leave_totals) for every visible sheet in workbook order.
+
+    ``records`` is None for skipped sheets and ``leave_totals`` is None for sheets
+    without a leave header. With ``workers`` > 1 the sheets are split into
+    contiguous chunks parsed in a process pool; each worker opens the workbook
+    read-only and only parses its own sheets, and results are merged back in
+    workbook order so the output matches the serial path.
+    Sheets named in ``skip_titles`` are not parsed or yielded at all.
+    With ``start_date``, records cover every month block from start_date through
+    selected_date instead of just selected_date's month.
+    """
+    if workers <= 1:
+        # Sheets are parsed and released one at a time
+        for sheet in iter_attendance_sheets(file_path, skip_titles):
+            yield (sheet.title, extract_sheet_records(sheet, selected_date, start_date),
+                   extract_sheet_leave_totals(sheet))
+        return
+
+    wb = load_workbook(file_path, read_only=True)
+    titles = [ws.title for ws in wb.worksheets
+              if ws.sheet_state == "visible" and ws.title not in (skip_titles or ())]
+    wb.close()
+
+    workers = min(workers, len(titles)) or 1
+    chunk_size = -(-len(titles) // workers)
+    chunks = [titles[i:i + chunk_size] for i in range(0, len(titles), chunk_size)]
+
+    source = pool_source(file_path)
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=POOL_CONTEXT) as pool:
+        futures = [pool.submit(_extract_sheet_chunk, source, chunk, selected_date, start_date) for chunk in chunks]
+        for future in futures:
+            yield from future.result()
+
+
+def extract_file_results(file_path, selected_date, skip_titles=None, start_date=None):
+    """Worker: parse one whole workbook and return its (title, records, leave_totals) list"""
+    if isinstance(file_path, bytes):
+        file_path = io.BytesIO(file_path)
+    return list(iter_sheet_results(file_path, selected_date, 1, skip_titles, start_date))
+
+
+def pool_source(file_path):
+    """A workbook source that can be sent to a worker process.
+    File objects can't be sent to other processes; their bytes are sent instead.
+    """
+    if isinstance(file_path, (str, os.PathLike)):
+        return file_path
+    return read_source_bytes(file_path)
+
+
+def read_source_bytes(source):
+    """Read all bytes of a file object from the start, leaving it rewound"""
+    source.seek(0)
+    data = source.read()
+    source.seek(0)
+    return data
+
+
+def file_content_hash(file_path):
+    """SHA-256 of the uploaded file's bytes (file_path may also be a file object)"""
+    digest = hashlib.sha256()
+    if isinstance(file_path, (str, os.PathLike)):
+        f = open(file_path, 'rb')
+    else:
+        f = file_path
+        f.seek(0)
+    try:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    finally:
+        if f is file_path:
+            f.seek(0)
+        else:
+            f.close()
+    return digest.hexdigest()
+
+
+def _style_contents(archive, names):
+    """Per cell style id, the bytes of what records read from that style: its number
+    format (dates vs numbers) and its font (red highlights)"""
+    if ARC_STYLE not in names:
+        return []
+    root = fromstring(archive.read(ARC_STYLE))
+    num_formats = {fmt.get("numFmtId"): fmt.get("formatCode", "")
+                   for fmt in root.iterfind(f"{{{SHEET_MAIN_NS}}}numFmts/{{{SHEET_MAIN_NS}}}numFmt")}
+    fonts = [tostring(font) for font in root.iterfind(f"{{{SHEET_MAIN_NS}}}fonts/{{{SHEET_MAIN_NS}}}font")]
+    styles = []
+    for xf in root.iterfind(f"{{{SHEET_MAIN_NS}}}cellXfs/{{{SHEET_MAIN_NS}}}xf"):
+        num_format = xf.get("numFmtId", "0")
+        font_id = int(xf.get("fontId", 0))
+        font = fonts[font_id] if font_id < len(fonts) else b""
+        styles.append(f"{num_format}|{num_formats.get(num_format, '')}|".encode() + font)
+    return styles
+
+
+def _sheet_cells_digest(digest, sheet_xml, shared_strings, styles):
+    """Add each cell of a worksheet part to digest with its shared string and style
+    resolved, so the numbering of the workbook-wide tables doesn't matter"""
+    cell_tag = f"{{{SHEET_MAIN_NS}}}c"
+    row_tag = f"{{{SHEET_MAIN_NS}}}row"
+    for _, node in iterparse(sheet_xml):
+        if node.tag == cell_tag:
+            data_type = node.get("t", "n")
+            value = node.findtext(f"{{{SHEET_MAIN_NS}}}v")
+            if data_type == "s" and value is not None:
+                index = int(value)
+                value = shared_strings[index] if index < len(shared_strings) else None
+            elif data_type == "inlineStr":
+                value = "".join(node.itertext())
+            style_id = int(node.get("s", 0))
+            style = styles[style_id] if style_id < len(styles) else b""
+            formula = node.findtext(f"{{{SHEET_MAIN_NS}}}f")
+            digest.update(repr((node.get("r"), data_type, value, formula)).encode())
+            digest.update(style)
+            node.clear()
+        elif node.tag == row_tag:
+            digest.update(f"row {node.get('r')}".encode())
+            node.clear()
+
+
+def sheet_content_hashes(file_path):
+    """SHA-256 per visible sheet, without building any cells.
+
+    Each hash covers the sheet's cells, with the shared strings and the number
+    format and font of the styles they use resolved, and its comments parts. A
+    sheet hash stays the same when another sheet adds strings or styles, and only
+    changes when something that feeds its own records changes.
+    """
+    with zipfile.ZipFile(file_path) as archive:
+        names = set(archive.namelist())
+        shared_strings = []
+        if ARC_SHARED_STRINGS in names:
+            with archive.open(ARC_SHARED_STRINGS) as source:
+                shared_strings = read_string_table(source)
+        styles = _style_contents(archive, names)
+
+        parser = WorkbookParser(archive, ARC_WORKBOOK, keep_links=False)
+        parser.parse()
+
+        hashes = {}
+        for sheet, rel in parser.find_sheets():
+            if "chartsheet" in rel.Type or rel.target not in names:
+                continue
+            if (sheet.state or "visible") != "visible":
+                continue
+            digest = hashlib.sha256()
+            with archive.open(rel.target) as sheet_xml:
+                _sheet_cells_digest(digest, sheet_xml, shared_strings, styles)
+            rels_path = get_rels_path(rel.target)
+            if rels_path in names:
+                for comments_rel in get_dependents(archive, rels_path).find(COMMENTS_NS):
+                    digest.update(archive.read(comments_rel.target))
+            hashes[sheet.name] = digest.hexdigest()
+        return hashes
+
+
+def find_month_rows(sheet, month_abbr, year, month_num):
+    """Find rows whose first column marks the requested month block"""
+    # Updated logic to handle both old format (JAN, MAY, etc.) and new format (NOV-24, DEC-24, JAN-25, etc.)
+    month_rows = []
+
+    for i in range(sheet.n_rows):
+        value = sheet.value(i, 0)
+        cell_value = str(value if value is not None else float("nan")).upper()
+
+        # Check for old format (JAN, MAY, etc.)
+        if cell_value == month_abbr and len(cell_value) == 3:
+            print(f"DEBUG: Found old format match '{cell_value}' at row {i}")
+            month_rows.append(i)
+        # Check for new format (NOV-24, DEC-24, JAN-25, etc.)
+        elif cell_value.startswith(month_abbr) and len(cell_value) == 6 and '-' in cell_value and cell_value[3] == '-':
+            # Extract year from Excel (e.g., "24" from "NOV-24")
+            excel_year_str = cell_value[4:6]
+            try:
+                excel_year = int(excel_year_str)
+                # Convert to full year (24 -> 2024, 25 -> 2025, etc.)
+                excel_full_year = 2000 + excel_year
+                print(f"DEBUG: Found new format '{cell_value}', Excel year: {excel_full_year}, Selected year: {year}")
+
+                # Check if the year matches the selected date year (allow ±1 year flexibility)
+                if excel_full_year == year or excel_full_year == year - 1 or excel_full_year == year + 1:
+                    print(f"DEBUG: Year match (flexible)! Adding row {i}")
+                    month_rows.append(i)
+                else:
+                    print(f"DEBUG: Year too far apart, skipping row {i}")
+            except ValueError:
+                # If year parsing fails, skip this row
+                print(f"DEBUG: Invalid year format in '{cell_value}', skipping row {i}")
+                continue
+        # Check for date format (like "2025-09-01 00:00:00")
+        elif len(cell_value) >= 10 and cell_value.startswith(str(year)) and '-' in cell_value:
+            try:
+                # Parse the date to extract month
+                date_part = cell_value.split(' ')[0]  # Get "2025-09-01" part
+                date_obj = datetime.datetime.strptime(date_part, '%Y-%m-%d')
+                if date_obj.month == month_num:
+                    print(f"DEBUG: Found date format '{cell_value}', month matches! Adding row {i}")
+                    month_rows.append(i)
+                else:
+                    print(f"DEBUG: Date format '{cell_value}' month {date_obj.month} doesn't match {month_num}, skipping row {i}")
+            except ValueError:
+                print(f"DEBUG: Invalid date format '{cell_value}', skipping row {i}")
+                continue
+
+    return month_rows
+
+
+def resolve_punches(status, t1, t2, employee, date_val):
+    """Apply the status rules to the parsed punch-in/punch-out timestamps"""
+    if pd.notna(t1) and pd.notna(t2):
+        pin, pout = t1.strftime("%H:%M"), t2.strftime("%H:%M")
+        if status in ["HF", "PHF", "SHF"]:
+            print(f"DEBUG: {status} status with both times: {employee} on {date_val} - {pin} to {pout}")
+    elif pd.notna(t1) and pd.isna(t2):
+        # Show punches for P, HF, SHF, PHF statuses even when one is missing
+        if status in ["P", "HF", "PHF", "SHF"] or status not in IGNORE_STATUSES:
+            if t1.hour >= 12:
+                pin, pout = "MISSING", t1.strftime("%H:%M")
+            else:
+                pin, pout = t1.strftime("%H:%M"), "MISSING"
+            if status in ["HF", "PHF", "SHF"]:
+                print(f"DEBUG: {status} status with missing time: {employee} on {date_val} - {pin} to {pout}")
+        else:
+            # Ignore missing, hide punches for leave/off
+            pin, pout = "", ""
+    elif pd.isna(t1) and pd.notna(t2):
+        # Show punches for P, HF, SHF, PHF statuses even when one is missing
+        if status in ["P", "HF", "PHF", "SHF"] or status not in IGNORE_STATUSES:
+            if t2.hour >= 12:
+                pin, pout = "⚠️ MISSING", t2.strftime("%H:%M")
+            else:
+                pin, pout = t2.strftime("%H:%M"), "⚠️ MISSING"
+            if status in ["HF", "PHF", "SHF"]:
+                print(f"DEBUG: {status} status with missing time: {employee} on {date_val} - {pin} to {pout}")
+        else:
+            pin, pout = "", ""
+    else:
+        # Both punches missing
+        # Show punches for P, HF, SHF, PHF statuses even when both are missing
+        if status in ["P", "HF", "PHF", "SHF"] or status not in IGNORE_STATUSES:
+            pin, pout = "MISSING", "MISSING"
+            if status in ["HF", "PHF", "SHF"]:
+                print(f"DEBUG: {status} status with both times missing: {employee} on {date_val}")
+        else:
+            pin, pout = "", ""
+    return pin, pout
+
+
+def scan_month_blocks(sheet, end_date):
+    """Find every month block in one scan of the first column.
+
+    Returns {(year, month): row} for the first row of each block. Recognizes the
+    same markers as find_month_rows: old format (JAN), new format (NOV-24) and
+    date headers (2025-09-01 00:00:00). An old-format month carries no year, so it
+    is taken to be the latest such month up to ``end_date``: with an end date in
+    January 2025, JAN is January 2025 and NOV and DEC are in 2024.
+    """
+    blocks = {}
+    for i in range(sheet.n_rows):
+        value = sheet.value(i, 0)
+        cell_value = str(value if value is not None else float("nan")).upper()
+
+        key = None
+        if len(cell_value) == 3 and cell_value in MONTH_NUMBERS:
+            month_num = MONTH_NUMBERS[cell_value]
+            key = (end_date.year if month_num <= end_date.month else end_date.year - 1, month_num)
+        elif len(cell_value) == 6 and cell_value[3] == '-' and cell_value[:3] in MONTH_NUMBERS:
+            try:
+                key = (2000 + int(cell_value[4:6]), MONTH_NUMBERS[cell_value[:3]])
+            except ValueError:
+                print(f"DEBUG: Invalid year format in '{cell_value}', skipping row {i}")
+        elif len(cell_value) >= 10 and '-' in cell_value:
+            try:
+                date_obj = datetime.datetime.strptime(cell_value.split(' ')[0], '%Y-%m-%d')
+                key = (date_obj.year, date_obj.month)
+            except ValueError:
+                pass
+
+        if key is not None and key not in blocks:
+            blocks[key] = i
+    return blocks
+
+
+def build_block_records(sheet, i, year, month_num, days):
+    """Build the records for the given days of the month block starting at row i"""
+    records = []
+
+    for d in days:
+        col = d + 2
+
+        if col >= sheet.n_cols:
+            continue
+
+        date_val = datetime.date(year, month_num, d).strftime('%Y-%m-%d')
+        status_row = i + 2
+        status = ""
+
+        if status_row < sheet.n_rows:
+            s = sheet.value(status_row, col)
+            if s is not None:
+                status = str(s).upper().strip()
+
+        # Comments and RED font color detection (1-based cell positions)
+        has_pout = i + 1 < sheet.n_rows
+        has_status = status_row < sheet.n_rows
+        pin_comment = sheet.comment(i + 1, col + 1)
+        pout_comment = sheet.comment(i + 2, col + 1) if has_pout else ""
+        status_comment = sheet.comment(status_row + 1, col + 1) if has_status else ""
+
+        pin_highlight = sheet.is_red(i + 1, col + 1)
+        pout_highlight = sheet.is_red(i + 2, col + 1) if has_pout else False
+        status_highlight = sheet.is_red(status_row + 1, col + 1) if has_status else False
+
+        # **Rules for special statuses**
+        if status in IGNORE_STATUSES:
+            # Show no punches for off/leave/paid statuses
+            pin, pout = "", ""
+        elif sheet.title.strip() in BLANK_EMPLOYEES:
+            pin, pout = "", ""  # Keep blank for exception employees
+        else:
+            t1 = to_ts(sheet.value(i, col))
+            t2 = to_ts(sheet.value(i + 1, col))
+            pin, pout = resolve_punches(status, t1, t2, sheet.title, date_val)
+
+        records.append({
+            "Employee": sheet.title,
+            "Date": date_val,
+            "Punch-In": pin,
+            "Punch-Out": pout,
+            "Status": status,
+            "pin_comment": pin_comment,
+            "pout_comment": pout_comment,
+            "status_comment": status_comment,
+            "pin_highlight": pin_highlight,
+            "pout_highlight": pout_highlight,
+            "status_highlight": status_highlight,
+            "time_range": sheet.time_range or ""
+        })
+
+    return records
+
+
+def extract_sheet_range_records(sheet, start_date, end_date):
+    """Build the records of every month block between start_date and end_date (inclusive)"""
+    blocks = scan_month_blocks(sheet, end_date)
+    in_range = sorted(key for key in blocks
+                      if (start_date.year, start_date.month) <= key <= (end_date.year, end_date.month))
+    print(f"DEBUG: Found {len(in_range)} month blocks in sheet '{sheet.title}' between {start_date} and {end_date}")
+
+    if not in_range:
+        print(f"DEBUG: Skipping sheet '{sheet.title}' - no month blocks in range")
+        return None
+
+    records = []
+    for year, month_num in in_range:
+        first_day = start_date.day if (year, month_num) == (start_date.year, start_date.month) else 1
+        last_day = (end_date.day if (year, month_num) == (end_date.year, end_date.month)
+                    else calendar.monthrange(year, month_num)[1])
+        records.extend(build_block_records(sheet, blocks[(year, month_num)], year, month_num,
+                                           range(first_day, last_day + 1)))
+    return records
+
+
+def extract_sheet_records(sheet, selected_date, start_date=None):
+    """Build the attendance records for one sheet, or None if the sheet is skipped.
+
+    By default only the month of selected_date is read, up to selected_date.day.
+    With start_date, every month block from start_date through selected_date is read.
+    """
+    if sheet.is_empty():
+        print(f"DEBUG: Skipping sheet '{sheet.title}' - empty data")
+        return None
+
+    if start_date is not None:
+        return extract_sheet_range_records(sheet, start_date, selected_date)
+
+    month_abbr = selected_date.strftime("%b").upper()
+    year = selected_date.year
+    month_num = selected_date.month
+
+    print(f"DEBUG: Looking for month '{month_abbr}' in sheet '{sheet.title}'")
+    month_rows = find_month_rows(sheet, month_abbr, year, month_num)
+    print(f"DEBUG: Found {len(month_rows)} matching month rows: {month_rows}")
+
+    if not month_rows:
+        print(f"DEBUG: Skipping sheet '{sheet.title}' - no matching month rows found")
+        return None
+
+    return build_block_records(sheet, month_rows[0], year, month_num, range(1, selected_date.day + 1))
+
+
+# Header labels for the cumulative leave columns
+LEAVE_LABELS = {
+    "W/O": ["W/O", "W O", "W-0", "W-O"],
+    "PL": ["PL"],
+    "SL": ["SL"],
+    "FL": ["FL"],
+}
+
+
+def extract_sheet_leave_totals(sheet):
+    """Parse cumulative W/O, PL, SL, FL totals from one sheet's value grid.
+    Strategy: find header row containing these labels, then take the last numeric value
+    in each corresponding column as the sheet's cumulative total.
+    Returns None when the sheet has no leave header.
+    """
+    label_lookup = {variant.upper(): key for key, variants in LEAVE_LABELS.items() for variant in variants}
+
+    # Search header rows (first 10 rows) for our labels
+    label_to_col = {}
+    for r in range(min(10, sheet.n_rows)):
+        for c, val in enumerate(sheet.rows[r]):
+            if not isinstance(val, str):
+                continue
+            key = label_lookup.get(val.strip().upper())
+            if key:
+                label_to_col[key] = c
+        # Small optimization: if all found, stop searching
+        if len(label_to_col) == len(LEAVE_LABELS):
+            break
+
+    if not label_to_col:
+        return None
+
+    # Walk from bottom up to locate last numeric value for each label
+    totals = {"W/O": 0, "PL": 0, "SL": 0, "FL": 0}
+    for key, col in label_to_col.items():
+        for r in range(sheet.n_rows - 1, -1, -1):
+            val = sheet.rows[r][col]
+            if isinstance(val, (int, float)):
+                try:
+                    totals[key] = float(val)
+                except Exception:
+                    totals[key] = 0
+                break
+
+    return totals
@@ -0,0 +1,90 @@
+"""
+Time parsing for punch and shift strings
+Matches strings against precompiled patterns for the strptime formats used in
+attendance sheets, and caches results so repeated values are parsed once
+"""
+
+import datetime
+import re
+from functools import lru_cache
+
+# Formats tried for punch cells during ingestion, in order
+PUNCH_FORMATS = (
+    "%H:%M",        # 09:30
+    "%H:%M:%S",     # 09:30:00
+    "%I:%M %p",     # 9:30 AM
+    "%I:%M:%S %p",  # 9:30:00 AM
+    "%H.%M",        # 09.30
+    "%I.%M %p",     # 9.30 AM
+)
+
+# Formats tried for the start of a shift time range (e.g. "08:30 AM to 07:00 PM")
+SHIFT_FORMATS = (
+    "%I:%M %p",     # 8:30 AM
+    "%H:%M",        # 08:30
+    "%I.%M %p",     # 8.30 AM
+    "%H.%M",        # 08.30
+)
+
+# Formats tried for stored punch-in strings when calculating late statistics
+STORED_PUNCH_FORMATS = (
+    "%H:%M:%S",     # 09:30:00
+    "%H:%M",        # 09:30
+    "%I:%M:%S %p",  # 9:30:00 AM
+    "%I:%M %p",     # 9:30 AM
+)
+
+# Same field patterns strptime uses, so a string matches here exactly when strptime accepts it
+_DIRECTIVES = {
+    'H': r"(?P<H>2[0-3]|[0-1]\d|\d)",
+    'I': r"(?P<I>1[0-2]|0[1-9]|[1-9])",
+    'M': r"(?P<M>[0-5]\d|\d)",
+    'S': r"(?P<S>6[0-1]|[0-5]\d|\d)",
+    'p': r"(?P<p>am|pm)",
+}
+
+
+@lru_cache(maxsize=None)
+def _compile_format(fmt):
+    """Build a regex for a strptime time format (whitespace matches any run of whitespace)"""
+    pattern = []
+    i = 0
+    while i < len(fmt):
+        char = fmt[i]
+        if char == '%':
+            pattern.append(_DIRECTIVES[fmt[i + 1]])
+            i += 2
+            continue
+        pattern.append(r"\s+" if char.isspace() else re.escape(char))
+        i += 1
+    return re.compile(''.join(pattern), re.IGNORECASE)
+
+
+def _match_time(pattern, text):
+    match = pattern.fullmatch(text)
+    if not match:
+        return None
+
+    fields = match.groupdict()
+    second = int(fields.get('S') or 0)
+    if second > 59:
+        # strptime matches leap seconds but datetime rejects them
+        return None
+    minute = int(fields['M'])
+    if fields.get('I') is not None:
+        hour = int(fields['I']) % 12
+        if fields['p'].lower() == 'pm':
+            hour += 12
+    else:
+        hour = int(fields['H'])
+    return datetime.time(hour, minute, second)
+
+
+@lru_cache(maxsize=4096)
+def parse_time(text, formats=PUNCH_FORMATS):
+    """Parse a time string with the first matching format, returning a datetime.time or None"""
+    for fmt in formats:
+        parsed = _match_time(_compile_format(fmt), text)
+        if parsed is not None:
+            return parsed
+    return None